@@ -0,0 +1,359 @@
+# trading_dashboard/alerts.py
+
+import argparse
+import json
+import logging
+import queue
+import threading
+import time
+import urllib.request
+from collections import namedtuple, deque
+
+import pandas as pd
+import numpy as np
+
+from streaming import bucket_start
+from resample import interval_to_timedelta
+
+logger = logging.getLogger("trading_dashboard.alerts")
+
+MARKET_TZ = 'America/New_York'
+OPEN, HIGH, LOW, CLOSE, VOLUME = range(5)
+
+Alert = namedtuple('Alert', ['symbol', 'side', 'ts', 'price', 'rsi', 'macd_hist'])
+
+
+# ─── Vectorized running indicators ───────────────────────────────────────────
+class RunningIndicators:
+    """
+    compute_indicators' VWAP, MACD and RSI for many symbols at once, advanced one bar per call.
+    Each symbol has its own slot; symbols without a bar (NaN row) keep their state.
+    """
+
+    def __init__(self, n: int, rsi_period: int = 14, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.rsi_period = rsi_period
+        self._alphas = (2 / (fast + 1), 2 / (slow + 1), 2 / (signal + 1))
+        self.ema_fast = np.full(n, np.nan)
+        self.ema_slow = np.full(n, np.nan)
+        self.signal = np.full(n, np.nan)
+        self.last_close = np.full(n, np.nan)
+        self.gains = np.zeros((n, rsi_period))
+        self.losses = np.zeros((n, rsi_period))
+        self.bars = np.zeros(n, dtype=np.int64)
+        self.cum_pv = np.zeros(n)
+        self.cum_v = np.zeros(n)
+        self.session = np.full(n, -1, dtype=np.int64)
+
+    @staticmethod
+    def _ema(prev, value, alpha):
+        return np.where(np.isnan(prev), value, prev + alpha * (value - prev))
+
+    def step(self, bars: np.ndarray, session_key: int, commit: bool = True) -> dict:
+        """
+        Indicator values of every symbol with `bars` (n x OHLCV) as its next bar. With commit=False
+        the state is left untouched, which evaluates a still-forming bar.
+        Rows are valid where compute_indicators would keep them (no NaN left after warm-up).
+        """
+        has = ~np.isnan(bars[:, CLOSE])
+        close = bars[:, CLOSE]
+        volume = np.nan_to_num(bars[:, VOLUME])
+        a_fast, a_slow, a_signal = self._alphas
+
+        same_session = self.session == session_key
+        cum_pv = np.where(same_session, self.cum_pv, 0.0) + (bars[:, HIGH] + bars[:, LOW] + close) / 3 * volume
+        cum_v = np.where(same_session, self.cum_v, 0.0) + volume
+        ema_fast = self._ema(self.ema_fast, close, a_fast)
+        ema_slow = self._ema(self.ema_slow, close, a_slow)
+        macd = ema_fast - ema_slow
+        signal = self._ema(self.signal, macd, a_signal)
+
+        # Like the batch formula: the first bar's delta counts as no gain and no loss.
+        delta = np.nan_to_num(close - self.last_close)
+        slot = self.bars % self.rsi_period
+        rows = np.arange(len(close))
+        gains, losses = self.gains.copy(), self.losses.copy()
+        gains[rows, slot] = np.maximum(delta, 0)
+        losses[rows, slot] = np.maximum(-delta, 0)
+        n_bars = self.bars + 1
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vwap = cum_pv / cum_v
+            rsi = 100 - 100 / (1 + gains.sum(axis=1) / losses.sum(axis=1))
+        rsi[n_bars < self.rsi_period] = np.nan
+
+        if commit:
+            self.ema_fast = np.where(has, ema_fast, self.ema_fast)
+            self.ema_slow = np.where(has, ema_slow, self.ema_slow)
+            self.signal = np.where(has, signal, self.signal)
+            self.last_close = np.where(has, close, self.last_close)
+            self.gains[has], self.losses[has] = gains[has], losses[has]
+            self.bars = np.where(has, n_bars, self.bars)
+            self.cum_pv = np.where(has, cum_pv, self.cum_pv)
+            self.cum_v = np.where(has, cum_v, self.cum_v)
+            self.session = np.where(has, session_key, self.session)
+
+        valid = has & ~np.isnan(vwap) & ~np.isnan(rsi)
+        return {'close': close, 'vwap': vwap, 'macd': macd, 'signal': signal, 'rsi': rsi, 'valid': valid}
+
+
+class _HigherTimeframe:
+    """A 5m/15m timeframe fed with 1m bars: committed state plus the forming bar, as the live dashboard sees it."""
+
+    def __init__(self, n: int, interval: str, rsi_period: int):
+        self.rule = interval_to_timedelta(interval)
+        self.state = RunningIndicators(n, rsi_period)
+        self.bucket = None
+        self.forming = np.full((n, 5), np.nan)
+        self.last = None  # values at each symbol's last finished bar that compute_indicators would keep
+
+    def add(self, ts: pd.Timestamp, bars: np.ndarray, session_key: int) -> dict:
+        """Folds a 1m bar into the forming bar and returns the trend inputs per symbol."""
+        bucket = bucket_start(ts, self.rule)
+        if bucket != self.bucket:
+            if self.bucket is not None:
+                committed = self.state.step(self.forming, self._session, commit=True)
+                self.last = committed if self.last is None else \
+                    {k: np.where(committed['valid'], v, self.last[k]) for k, v in committed.items()}
+            self.bucket, self._session = bucket, session_key
+            self.forming = np.full_like(self.forming, np.nan)
+
+        has = ~np.isnan(bars[:, CLOSE])
+        forming, started = self.forming, ~np.isnan(self.forming[:, CLOSE])
+        forming[has & ~started] = bars[has & ~started]
+        both = has & started
+        forming[both, HIGH] = np.maximum(forming[both, HIGH], bars[both, HIGH])
+        forming[both, LOW] = np.minimum(forming[both, LOW], bars[both, LOW])
+        forming[both, CLOSE] = bars[both, CLOSE]
+        forming[both, VOLUME] += bars[both, VOLUME]
+
+        values = self.state.step(forming, session_key, commit=False)
+        if self.last is not None:
+            # Without a usable bar in this bucket a symbol sees its last kept one (reindex ffill).
+            values = {k: np.where(values['valid'], v, self.last[k]) for k, v in values.items()}
+        return values
+
+
+def _trend(values: dict):
+    bullish = values['valid'] & (values['close'] > values['vwap']) & (values['macd'] > values['signal'])
+    bearish = values['valid'] & (values['close'] < values['vwap']) & (values['macd'] < values['signal'])
+    return bullish, bearish
+
+
+# ─── Engine ──────────────────────────────────────────────────────────────────
+class AlertEngine:
+    """
+    Evaluates the find_entry_signals conditions for a watchlist as each 1m bar closes. Only the
+    new bar is computed, from running per-symbol state (numpy arrays across the watchlist), so a
+    bar close costs the same whatever the history length. BUY/SELL alerts go to every sink;
+    a (symbol, side, bar) is sent at most once, and a side is muted for `cooldown` seconds
+    of bar time after it fired.
+    """
+
+    def __init__(self, symbols, sinks=(), cooldown: float = 300, rsi_period: int = 14):
+        self.symbols = [symbol.upper() for symbol in symbols]
+        n = len(self.symbols)
+        self.sinks = list(sinks)
+        self.cooldown = pd.Timedelta(seconds=cooldown)
+        self.m1 = RunningIndicators(n, rsi_period)
+        self.m5 = _HigherTimeframe(n, '5m', rsi_period)
+        self.m15 = _HigherTimeframe(n, '15m', rsi_period)
+        self.prev_macd = np.full(n, np.nan)
+        self.prev_signal = np.full(n, np.nan)
+        self.last_ts = None
+        self._last_fired = {}
+        self._sent = deque(maxlen=10000)
+        self._sent_keys = set()
+
+    def on_bars(self, ts: pd.Timestamp, bars: np.ndarray, emit: bool = True) -> list:
+        """
+        Feeds the closed 1m bar at `ts` for every symbol (n x OHLCV, NaN rows for symbols
+        without one) and returns the alerts it triggered. Bars at or before the last one are ignored.
+        """
+        if self.last_ts is not None and ts <= self.last_ts:
+            return []
+        self.last_ts = ts
+        session_key = ts.normalize().value
+
+        m1 = self.m1.step(bars, session_key)
+        bull_5, bear_5 = _trend(self.m5.add(ts, bars, session_key))
+        bull_15, bear_15 = _trend(self.m15.add(ts, bars, session_key))
+
+        # Crossovers against the previous row compute_indicators would have kept.
+        valid = m1['valid']
+        cross_up = (m1['macd'] > m1['signal']) & (self.prev_macd < self.prev_signal)
+        cross_down = (m1['macd'] < m1['signal']) & (self.prev_macd > self.prev_signal)
+        self.prev_macd = np.where(valid, m1['macd'], self.prev_macd)
+        self.prev_signal = np.where(valid, m1['signal'], self.prev_signal)
+
+        rsi = m1['rsi']
+        with np.errstate(invalid='ignore'):
+            buy = valid & bull_15 & bull_5 & cross_up & (rsi > 50) & (rsi < 70)
+            sell = valid & bear_15 & bear_5 & cross_down & (rsi < 50) & (rsi > 30)
+        if not emit:
+            return []
+
+        alerts = []
+        for side, mask in (('BUY', buy), ('SELL', sell)):
+            for i in np.flatnonzero(mask):
+                alert = Alert(self.symbols[i], side, ts, float(m1['close'][i]), float(rsi[i]),
+                              float(m1['macd'][i] - m1['signal'][i]))
+                if self._accept(alert):
+                    alerts.append(alert)
+        for alert in alerts:
+            for sink in self.sinks:
+                try:
+                    sink.send(alert)
+                except Exception:
+                    logger.exception("alert sink %r failed", sink)
+        return alerts
+
+    def _accept(self, alert: Alert) -> bool:
+        key = (alert.symbol, alert.side, alert.ts)
+        if key in self._sent_keys:
+            return False
+        last = self._last_fired.get(alert[:2])
+        if last is not None and alert.ts - last < self.cooldown:
+            return False
+        self._last_fired[alert[:2]] = alert.ts
+        if len(self._sent) == self._sent.maxlen:
+            self._sent_keys.discard(self._sent[0])
+        self._sent.append(key)
+        self._sent_keys.add(key)
+        return True
+
+    def warm_up(self, index: pd.DatetimeIndex, data: np.ndarray):
+        """Runs history (symbols x time x OHLCV, as scanner.StackedBars) through the state without alerting."""
+        for i, ts in enumerate(index):
+            self.on_bars(ts, data[:, i], emit=False)
+
+
+# ─── Sinks ───────────────────────────────────────────────────────────────────
+def alert_record(alert: Alert) -> dict:
+    return {'symbol': alert.symbol, 'side': alert.side, 'ts': alert.ts.isoformat(), 'price': round(alert.price, 4),
+            'rsi': round(alert.rsi, 2), 'macd_hist': round(alert.macd_hist, 6)}
+
+
+class LogSink:
+    """Appends one JSON line per alert."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, alert: Alert):
+        with self._lock, open(self.path, 'a') as f:
+            f.write(json.dumps(alert_record(alert)) + "\n")
+
+
+class QueueSink:
+    """Puts alerts on a local queue.Queue for in-process consumers."""
+
+    def __init__(self, q: queue.Queue = None):
+        self.queue = q if q is not None else queue.Queue()
+
+    def send(self, alert: Alert):
+        self.queue.put(alert)
+
+
+class WebhookSink:
+    """POSTs each alert as JSON from a background thread, so a slow endpoint never delays evaluation."""
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+        self._queue = queue.Queue(maxsize=1000)
+        threading.Thread(target=self._run, name="alert-webhook", daemon=True).start()
+
+    def send(self, alert: Alert):
+        try:
+            self._queue.put_nowait(alert)
+        except queue.Full:
+            logger.warning("webhook queue full; dropped %s", alert)
+
+    def _run(self):
+        while True:
+            alert = self._queue.get()
+            request = urllib.request.Request(self.url, data=json.dumps(alert_record(alert)).encode(),
+                                             headers={'Content-Type': 'application/json'}, method='POST')
+            try:
+                urllib.request.urlopen(request, timeout=self.timeout).close()
+            except OSError as e:
+                logger.warning("webhook %s failed: %s", self.url, e)
+
+
+class StdoutSink:
+    def send(self, alert: Alert):
+        print(json.dumps(alert_record(alert)), flush=True)
+
+
+def sink_from_spec(spec: str):
+    """'stdout', 'log:<path>' or an http(s) webhook URL."""
+    if spec == 'stdout':
+        return StdoutSink()
+    if spec.startswith('log:'):
+        return LogSink(spec[len('log:'):])
+    if spec.startswith(('http://', 'https://')):
+        return WebhookSink(spec)
+    raise ValueError(f"Unknown alert sink: {spec}")
+
+
+# ─── Polling driver ──────────────────────────────────────────────────────────
+def _closed(index: pd.DatetimeIndex, now: pd.Timestamp) -> np.ndarray:
+    return index + pd.Timedelta(minutes=1) <= now
+
+
+def run_polling(engine: AlertEngine, settle_seconds: float = 3.0, stop: threading.Event = None):
+    """
+    Warms up on 5 days of 1m bars, then after every minute boundary downloads today's bars for the
+    whole watchlist in batched requests and feeds the ones that closed since the last evaluation.
+    """
+    from scanner import fetch_stacked
+
+    stop = stop or threading.Event()
+    history = fetch_stacked(engine.symbols, period="5d")
+    closed = _closed(history.index, pd.Timestamp.now(tz=MARKET_TZ))
+    engine.warm_up(history.index[closed], history.data[:, closed])
+    logger.info("warmed up %d symbols on %d bars", len(engine.symbols), int(closed.sum()))
+
+    while not stop.is_set():
+        now = time.time()
+        stop.wait(60 - now % 60 + settle_seconds)
+        if stop.is_set():
+            break
+        latest = fetch_stacked(engine.symbols, period="1d")
+        now = pd.Timestamp.now(tz=MARKET_TZ)
+        for i in np.flatnonzero(_closed(latest.index, now)):
+            ts = latest.index[i]
+            if engine.last_ts is None or ts > engine.last_ts:
+                started = time.perf_counter()
+                alerts = engine.on_bars(ts, latest.data[:, i])
+                logger.info("%s: %d alerts in %.1f ms", ts, len(alerts), (time.perf_counter() - started) * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless multi-timeframe entry alerts for a watchlist.")
+    parser.add_argument("symbols", nargs="*")
+    parser.add_argument("--universe", help="file with one symbol per line")
+    parser.add_argument("--sink", action="append", default=[],
+                        help="stdout, log:<path> or a webhook URL (repeatable; default stdout)")
+    parser.add_argument("--cooldown", type=float, default=300, help="seconds before the same side can fire again")
+    args = parser.parse_args()
+
+    symbols = [s.upper() for s in args.symbols]
+    if args.universe:
+        with open(args.universe) as f:
+            symbols += [line.strip().upper() for line in f if line.strip() and not line.startswith('#')]
+    if not symbols:
+        parser.error("no symbols given")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    sinks = [sink_from_spec(spec) for spec in args.sink or ['stdout']]
+    engine = AlertEngine(symbols, sinks, cooldown=args.cooldown)
+    try:
+        run_polling(engine)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
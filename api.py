@@ -0,0 +1,206 @@
+# trading_dashboard/api.py
+
+import io
+import json
+import logging
+import threading
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+import pandas as pd
+
+import perf
+from bar_store import MARKET_TZ
+from market_data import as_frames
+from research import entry_signal_records
+
+logger = logging.getLogger(__name__)
+
+INTERVALS = ('1m', '5m', '15m')
+CONTENT_TYPES = {'npy': 'application/x-npy', 'arrow': 'application/vnd.apache.arrow.stream'}
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_since(value: str) -> int:
+    """UTC epoch nanoseconds from an integer of epoch ns or an ISO time (naive times are market time)."""
+    if value.lstrip('-').isdigit():
+        return int(value)
+    try:
+        ts = pd.Timestamp(value)
+    except ValueError:
+        raise ApiError(400, f"bad since: {value!r}")
+    return (ts.tz_localize(MARKET_TZ) if ts.tz is None else ts).value
+
+
+def frame_records(df: pd.DataFrame) -> np.ndarray:
+    """A bar frame as a structured array: 'ts' (UTC epoch ns) followed by every column as float64."""
+    records = np.empty(len(df), dtype=[('ts', '<i8')] + [(str(column), '<f8') for column in df.columns])
+    if len(df):
+        records['ts'] = df.index.tz_convert('UTC').asi8
+    for column in df.columns:
+        records[str(column)] = df[column].to_numpy(dtype=np.float64)
+    return records
+
+
+def encode(records: np.ndarray, fmt: str) -> bytes:
+    """The records as a .npy file, or as an Arrow IPC stream with 'ts' as a UTC timestamp column."""
+    if fmt == 'npy':
+        buffer = io.BytesIO()
+        np.save(buffer, records, allow_pickle=False)
+        return buffer.getvalue()
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ApiError(501, "format=arrow needs pyarrow")
+    table = pa.table({name: pa.array(records[name], type=pa.timestamp('ns', tz='UTC')) if name == 'ts'
+                      else records[name] for name in records.dtype.names})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+class SnapshotServer:
+    """
+    Read-only HTTP API over the market data service's cached snapshots, for other tools that
+    want the dashboard's indicators and signals. It never fetches: each snapshot is converted
+    (and its signals found) once, on the first request after it arrives, and every later
+    request is a binary search plus a copy.
+
+        GET /tickers                     JSON: cached tickers, their source, age and last bar times
+        GET /frames/<TICKER>/<interval>  bars with VWAP/EMA/MACD/RSI for 1m, 5m or 15m
+        GET /signals/<TICKER>            entry signals: ts, side (1 buy, -1 sell), price
+
+    `since=<epoch ns or ISO time>` returns only the rows at or after that time, `format=npy`
+    (default) or `arrow` picks the encoding. X-Last-Timestamp holds the newest row's epoch ns,
+    to pass as the next `since`: that row is usually the still-forming bar, so it is sent again
+    (with any revision) and a client replaces its copy of the row with the same `ts`.
+    """
+
+    def __init__(self, service, host: str = '127.0.0.1', port: int = 8765):
+        self.service = service
+        self._lock = threading.Lock()
+        self._converted = {}
+        self._counters = Counter()
+        self._httpd = ThreadingHTTPServer((host, port), _handler_for(self))
+        self._httpd.daemon_threads = True
+        self.address = self._httpd.server_address
+        self._thread = None
+
+    def start(self) -> 'SnapshotServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="snapshot-api", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._counters, 'address': f"{self.address[0]}:{self.address[1]}",
+                    'converted': sorted(self._converted)}
+
+    def handle(self, path: str, query: dict):
+        """(content type, body, extra headers) for a request; raises ApiError."""
+        parts = [part for part in path.split('/') if part]
+        if parts == ['tickers']:
+            return 'application/json', json.dumps(self._tickers()).encode(), {}
+        if len(parts) == 3 and parts[0] == 'frames':
+            if parts[2] not in INTERVALS:
+                raise ApiError(404, f"unknown interval {parts[2]!r}; use one of {', '.join(INTERVALS)}")
+            name = parts[2]
+        elif len(parts) == 2 and parts[0] == 'signals':
+            name = 'signals'
+        else:
+            raise ApiError(404, f"unknown path {path!r}")
+
+        fmt = query.get('format', ['npy'])[-1]
+        if fmt not in CONTENT_TYPES:
+            raise ApiError(400, f"unknown format {fmt!r}; use npy or arrow")
+        snapshot, records = self._records(parts[1].upper(), name)
+        since = parse_since(query['since'][-1]) if 'since' in query else None
+        if since is not None:
+            records = records[int(records['ts'].searchsorted(since, side='left')):]
+        last = int(records['ts'][-1]) if len(records) else since
+        headers = {'X-Fetched-At': f"{snapshot.fetched_at:.3f}"}
+        if last is not None:
+            headers['X-Last-Timestamp'] = str(last)
+        return CONTENT_TYPES[fmt], encode(records, fmt), headers
+
+    def _tickers(self) -> dict:
+        out = {}
+        for ticker in self.service.tickers():
+            snapshot = self.service.peek(ticker)
+            if snapshot is None:
+                continue
+            frames = as_frames(snapshot)
+            out[ticker] = {'source': snapshot.source, 'fetched_at': snapshot.fetched_at,
+                           'last': {interval: None if df.empty else df.index[-1].isoformat()
+                                    for interval, df in zip(INTERVALS, frames)}}
+        return out
+
+    def _records(self, ticker: str, name: str):
+        """The snapshot and its records for `name`, converted once per snapshot."""
+        snapshot = self.service.peek(ticker)
+        if snapshot is None:
+            raise ApiError(404, f"{ticker} is not cached; open it in the dashboard first")
+        with self._lock:
+            cached = self._converted.get(ticker)
+            if cached is None or cached[0] is not snapshot:
+                cached = self._converted[ticker] = (snapshot, {})
+            converted = cached[1]
+            if name not in converted:
+                self._counters['conversions'] += 1
+                with perf.span('api.convert', cache='miss'):
+                    frames = as_frames(snapshot)
+                    if name == 'signals':
+                        converted[name] = entry_signal_records(*frames)
+                    else:
+                        converted[name] = frame_records(frames[INTERVALS.index(name)])
+            return snapshot, converted[name]
+
+
+def _handler_for(server: SnapshotServer):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlsplit(self.path)
+            with perf.span('api.request'):
+                try:
+                    content_type, body, headers = server.handle(url.path, parse_qs(url.query))
+                    status = 200
+                except ApiError as e:
+                    content_type, body, headers, status = 'application/json', json.dumps({'error': str(e)}).encode(), \
+                        {}, e.status
+                except Exception as e:
+                    logger.exception("snapshot API request failed: %s", self.path)
+                    content_type, body, headers, status = 'application/json', json.dumps({'error': str(e)}).encode(), \
+                        {}, 500
+            with server._lock:
+                server._counters['requests'] += 1
+                server._counters['errors'] += status != 200
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug("%s " + format, self.address_string(), *args)
+
+    return Handler
+
+
+def server_from_spec(spec: str, service) -> SnapshotServer:
+    """A server for TRADING_DASHBOARD_API: 'port' (on 127.0.0.1) or 'host:port'."""
+    host, _, port = spec.rpartition(':')
+    return SnapshotServer(service, host or '127.0.0.1', int(port))
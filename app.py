@@ -1,14 +1,31 @@
 # trading_dashboard/app.py
 
-import streamlit as st
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-from indicators import process_all_timeframes
-from utils import display_summary_cards, get_valid_trading_dates
-from strategy import run_strategy_analysis, find_entry_signals
-from datetime import datetime, date, time, timedelta
-import pytz
-from streamlit_autorefresh import st_autorefresh
+import os
+import perf
+
+# Heavy libraries (yfinance, plotly, streamlit_autorefresh) are imported where they are first used,
+# so the layout renders before they load; pandas_market_calendars only loads when the on-disk
+# schedule (market_calendar.TradingCalendar.load) does not cover the dates in use.
+with perf.startup_phase('import.app_modules'):
+    import streamlit as st
+    from market_data import MarketDataService, as_frames
+    from retention import policy_from_env
+    from streaming import StreamIngestor, source_from_spec
+    from api import server_from_spec
+    from utils import display_summary_cards, get_valid_trading_dates, get_market_hours
+    from market_calendar import get_trading_calendar
+    from replay import day_slice
+    from workers import AnalysisPool, analyze
+    from charts import build_figure, OVERLAYS
+    from lazy import LazyFrame
+    from research import ResearchArchive
+    from concurrent.futures import TimeoutError as FuturesTimeout
+    from datetime import datetime, date, timedelta
+    import logging
+    import uuid
+    import pytz
+
+logger = logging.getLogger("trading_dashboard.app")
 
 # ─── Streamlit Page Config & Custom CSS ──────────────────────────────────────
 st.set_page_config(
@@ -89,27 +106,93 @@ def load_css():
 
 load_css()
 
+
+def autorefresh(interval_ms: int, key: str):
+    """Schedules a rerun after interval_ms; the component is imported on first use."""
+    from streamlit_autorefresh import st_autorefresh
+    st_autorefresh(interval=interval_ms, key=key)
+
+
+@st.cache_resource
+def get_market_data_service():
+    """One market data cache and refresher per server process, shared by all sessions."""
+    return MarketDataService(refresh_interval=55, compact=os.environ.get("TRADING_DASHBOARD_COMPACT") == "1",
+                             retention=policy_from_env())
+
+
+@st.cache_resource
+def get_stream_ingestor(_service):
+    """Live bars pushed from TRADING_DASHBOARD_STREAM (e.g. 'yfinance:5', 'wss://...', 'replay:ticks.jsonl'), if set."""
+    spec = os.environ.get("TRADING_DASHBOARD_STREAM")
+    if not spec:
+        return None
+    return StreamIngestor(source_from_spec(spec), _service).start()
+
+
+@st.cache_resource
+def get_snapshot_server(_service):
+    """Read API over the cached snapshots on TRADING_DASHBOARD_API ('8765' or 'host:port'), if set."""
+    spec = os.environ.get("TRADING_DASHBOARD_API")
+    if not spec:
+        return None
+    return server_from_spec(spec, _service).start()
+
+
+@st.cache_resource
+def get_analysis_pool():
+    """Worker processes for the strategy analysis; TRADING_DASHBOARD_WORKERS sets how many (0 = inline)."""
+    workers = os.environ.get("TRADING_DASHBOARD_WORKERS")
+    return AnalysisPool(None if workers is None else int(workers))
+
+
+@st.cache_resource
+def get_research_archive():
+    """The local multi-day archive built with `python research.py` (TRADING_DASHBOARD_RESEARCH_DIR)."""
+    return ResearchArchive()
+
+
+market_data = get_market_data_service()
+analysis_pool = get_analysis_pool()
+stream = get_stream_ingestor(market_data)
+snapshot_server = get_snapshot_server(market_data)
+# Streamed snapshots are cheap to read, so live reruns can follow them closely.
+live_refresh_seconds = 2 if stream is not None else 60
+
 # ─── Initialize Session State for Replay ─────────────────────────────────────
 if 'replay_time' not in st.session_state:
     st.session_state.replay_time = None
 if 'is_playing' not in st.session_state:
     st.session_state.is_playing = False
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 
 # ─── Sidebar Controls ──────────────────────────────────────────────────────────
 st.sidebar.header("Dashboard Controls")
 ticker = st.sidebar.text_input("Ticker Symbol", "SPY").upper()
+research_mode = st.sidebar.toggle("🔬 Research Mode", key="research_mode",
+                                  help="Replay any day of the local research archive, without network access.")
 ny_tz = pytz.timezone("America/New_York")
 today_ny = datetime.now(ny_tz).date()
 
-year_start = date(today_ny.year - 1, today_ny.month, today_ny.day)
-valid_dates = get_valid_trading_dates(start_date=year_start, end_date=today_ny)
-if len(valid_dates) == 0:
-    st.error("Could not retrieve market calendar.");
-    st.stop()
+if research_mode:
+    archive = get_research_archive()
+    valid_dates = archive.days(ticker)
+    if len(valid_dates) == 0:
+        st.error(f"No archived days for {ticker}. Build them with `python research.py build {ticker}`.");
+        st.stop()
+else:
+    year_start = date(today_ny.year - 1, today_ny.month, today_ny.day)
+    valid_dates = get_valid_trading_dates(start_date=year_start, end_date=today_ny)
+    if len(valid_dates) == 0:
+        st.error("Could not retrieve market calendar.");
+        st.stop()
 
 selected_date = st.sidebar.date_input("Select Trading Day", value=valid_dates[-1], min_value=valid_dates[0],
                                       max_value=valid_dates[-1])
-if selected_date not in valid_dates:
+if research_mode and selected_date not in valid_dates:
+    st.error(f"{selected_date} is not in the research archive for {ticker}.");
+    st.stop()
+if not research_mode and not get_trading_calendar(today_ny).is_trading_day(selected_date):
     st.error(f"{selected_date} is not a valid trading day.");
     st.stop()
 
@@ -121,8 +204,11 @@ chart_height = st.sidebar.slider(
 )
 
 chart_type = st.sidebar.radio("Select Chart Type", ('Candlestick', 'Line'))
+overlay_labels = st.sidebar.multiselect("Overlays", list(OVERLAYS),
+                                        help="Extra price indicators, computed only while they are shown.")
 
-market_open_time, market_close_time = time(9, 30), time(16, 0)
+# Real session hours, so early-close days end the time range and replay at the actual close.
+market_open_time, market_close_time = get_market_hours(selected_date)
 market_open_dt = ny_tz.localize(datetime.combine(selected_date, market_open_time))
 market_close_dt = ny_tz.localize(datetime.combine(selected_date, market_close_time))
 
@@ -172,22 +258,43 @@ st.sidebar.header("⚙️ App Status")
 if is_replay_mode and st.session_state.replay_time:
     st.sidebar.info(f"Replay Time: **{st.session_state.replay_time.strftime('%H:%M')}**")
 
-is_live_mode = (selected_date == today_ny and not st.session_state.is_playing)
-if is_replay_mode:
+is_live_mode = (selected_date == today_ny and not st.session_state.is_playing and not research_mode)
+if research_mode and not is_replay_mode:
+    st.sidebar.info(f"Research Mode is ON ({len(valid_dates)} archived days).")
+elif is_replay_mode:
     st.sidebar.info(f"Replay is ON (refreshing every 1s).")
 elif is_live_mode:
-    st.sidebar.success(f"Live Mode is ON (refreshing every 60s).")
+    st.sidebar.success(f"Live Mode is ON (refreshing every {live_refresh_seconds}s).")
 else:
     st.sidebar.warning("Live Mode is OFF (viewing historical data).")
 
 if st.sidebar.button("🔄 Refresh Data Now", use_container_width=True):
-    st.cache_data.clear()
+    market_data.invalidate(ticker)
     st.rerun()
 
+with st.sidebar.expander("Data Service Stats"):
+    st.json(market_data.stats())
+    st.json(analysis_pool.stats())
+    if stream is not None:
+        st.json(stream.stats())
+    if snapshot_server is not None:
+        st.json(snapshot_server.stats())
+
+# The panel is filled at the end of the run, once every stage has been timed.
+perf_panel = st.sidebar.expander("⏱️ Performance")
+with perf_panel:
+    record_timings = st.toggle("Record stage timings", key="perf_record",
+                               help="Times each pipeline stage of this session's reruns. "
+                                    "TRADING_DASHBOARD_PERF=1 times every session and background thread.")
+    run_profiler = st.toggle("Sampling profiler", key="perf_profile", disabled=not record_timings,
+                             help="Samples this run's stack every 5 ms; use it on a slow rerun.")
+perf_spans = perf.begin_trace(record=record_timings)
+profiler = perf.SamplingProfiler().start() if record_timings and run_profiler else None
+
 # ─── Auto-Refresh & Replay Logic ─────────────────────────────────────────────
-refresh_interval = 1000 if st.session_state.is_playing else 60000
+refresh_interval = 1000 if st.session_state.is_playing else live_refresh_seconds * 1000
 if st.session_state.is_playing or is_live_mode:
-    st_autorefresh(interval=refresh_interval, key="main_refresh")
+    autorefresh(refresh_interval, key="main_refresh")
 
 if st.session_state.is_playing and st.session_state.replay_time is not None:
     replay_increment = timedelta(minutes=replay_speed_mins)
@@ -200,45 +307,97 @@ if st.session_state.is_playing and st.session_state.replay_time is not None:
 
 # ─── Main App Body ───────────────────────────────────────────────────────────
 st.title(f"📈 Pro Trading Dashboard – {ticker}")
+perf.mark_startup('layout_shell')
 
 
-@st.cache_data(ttl=55)
-def load_data(ticker_symbol):
-    return process_all_timeframes(ticker_symbol)
+# Each entry pins one version of a ticker's 1m frame, so superseded versions expire after a few minutes.
+@st.cache_resource(max_entries=32, ttl=300)
+def load_lazy_frame(ticker_symbol, data_version, _df_1m):
+    """On-demand indicator nodes over the 1m history, shared by all sessions until the data changes."""
+    return LazyFrame(_df_1m)
 
 
-with st.spinner(f"Fetching market data for {ticker}..."):
-    df_1m, df_5m, df_15m = load_data(ticker)
+if research_mode:
+    # Archived frames already carry their indicators; the day is loaded with two days of warm-up.
+    with perf.span('app.load_data'):
+        df_1m, df_5m, df_15m = archive.load_day(ticker, selected_date, days=valid_dates)
+    messages = []
+else:
+    # A ticker seen before starts from its stored bars; the fetch finishes in the background.
+    with st.spinner(f"Fetching market data for {ticker}..."), perf.span('app.load_data'):
+        snapshot = market_data.get(ticker, stale_ok=True)
+        df_1m, df_5m, df_15m = as_frames(snapshot)
+    messages = snapshot.messages
+    if snapshot.source == 'store' and not df_1m.empty:
+        st.info(f"Showing stored bars up to {df_1m.index[-1]:%b %d %H:%M} while fresh data loads...")
+        autorefresh(1000, key="startup_refresh")
+    if stream is not None and selected_date == today_ny:
+        stream.subscribe(ticker)
+for level, text in messages:
+    getattr(st, level)(text)
 
 if df_1m.empty or df_5m.empty or df_15m.empty:
     st.error(f"Failed to fetch complete data for {ticker}.");
     st.stop()
 
-df_1m_day = df_1m[df_1m.index.date == selected_date]
-df_5m_day = df_5m[df_5m.index.date == selected_date]
-df_15m_day = df_15m[df_15m.index.date == selected_date]
+# The last 1m bar is revised while it is still forming, so its values are part of the version.
+data_version = (df_1m.index[-1], df_1m['Close'].iloc[-1], df_1m['Volume'].iloc[-1], df_5m.index[-1], df_15m.index[-1])
+day_1m, day_5m, day_15m = (day_slice(df, selected_date) for df in (df_1m, df_5m, df_15m))
 
 # MODIFICATION: Logic for panning window during replay
 if is_replay_mode and st.session_state.replay_time is not None:
     analysis_end_time = st.session_state.replay_time
     chart_start_time = st.session_state.replay_time - window_delta
     if chart_start_time < market_open_dt: chart_start_time = market_open_dt
-    df_chart = df_1m_day.loc[chart_start_time:analysis_end_time]
 else:
     analysis_end_time = selected_time_range[1]
-    df_chart = df_1m_day.loc[selected_time_range[0]:selected_time_range[1]]
+    chart_start_time = selected_time_range[0]
 
-analysis_df_1m = df_1m_day.loc[:analysis_end_time]
-analysis_df_5m = df_5m_day.loc[:analysis_end_time]
-analysis_df_15m = df_15m_day.loc[:analysis_end_time]
+cursor = int(day_1m.index.searchsorted(analysis_end_time, side='right'))
+with perf.span('app.window') as s:
+    df_chart = day_1m.iloc[day_1m.index.searchsorted(chart_start_time):cursor]
+    s.set(rows=len(df_chart))
 
 if df_chart.empty:
     st.warning("No data available for the selected time range.");
     st.stop()
 
+# Only the chart overlays are computed on demand. The base columns (VWAP, EMA_50, MACD, RSI) of
+# all three timeframes come with the fetch, eagerly for a new ticker, since every run's signal
+# markers and strategy analysis read the 5m/15m ones as well.
+overlay_columns = []
+if overlay_labels:
+    with perf.span('app.overlays') as s:
+        overlays = load_lazy_frame(ticker, data_version, df_1m).get(
+            [OVERLAYS[label] for label in overlay_labels], df_chart.index[0], df_chart.index[-1])
+        overlays = overlays.drop(columns=df_chart.columns, errors='ignore')
+        df_chart = df_chart.join(overlays)
+        overlay_columns = list(overlays.columns)
+        s.set(rows=len(df_chart))
+
+# The analysis runs in the worker pool; this script only renders finished results. While a
+# newer cursor is computing, the session keeps showing its last result for the same day.
 latest_in_view = df_chart.iloc[-1]
-analysis = run_strategy_analysis(analysis_df_1m, analysis_df_5m, analysis_df_15m)
-buy_signals, sell_signals = find_entry_signals(analysis_df_1m, analysis_df_5m, analysis_df_15m)
+analysis_key = (ticker, selected_date, data_version, cursor)
+analysis_args = ((ticker, selected_date, data_version), day_1m, day_5m, day_15m, selected_date, cursor)
+job = analysis_pool.submit(st.session_state.session_id, analysis_key, analyze, *analysis_args)
+shown = st.session_state.get('analysis_shown')
+has_shown = shown is not None and shown[0] == (ticker, selected_date)
+with perf.span('app.analysis_wait'):
+    try:
+        result = job.result(timeout=0.25 if has_shown else None)
+        st.session_state.analysis_shown = ((ticker, selected_date), result)
+    except FuturesTimeout:
+        result = shown[1]
+        st.caption("Updating analysis...")
+        autorefresh(500, key="analysis_refresh")
+    except Exception:
+        # A failed job (e.g. a worker that died) is dropped, so the next rerun submits it again.
+        logger.exception("analysis job failed for %s", analysis_key)
+        analysis_pool.discard(analysis_key, job)
+        st.error("The strategy analysis failed in the worker pool; see the server log.")
+        result = shown[1] if has_shown else analyze(*analysis_args)
+analysis, buy_signals, sell_signals = result
 
 tab1, tab2 = st.tabs(["📊 Chart & Analysis", "📘 Strategy Guide"])
 
@@ -260,52 +419,19 @@ with tab1:
 
     st.markdown("---")
 
-    fig = make_subplots(rows=4, cols=1, shared_xaxes=True, vertical_spacing=0.02, row_heights=[0.6, 0.1, 0.15, 0.15])
-
-    if chart_type == 'Line':
-        fig.add_trace(go.Scatter(x=df_chart.index, y=df_chart['Close'], name='Close', line=dict(color='#00A0B0')),
-                      row=1, col=1)
-    else:
-        fig.add_trace(
-            go.Candlestick(x=df_chart.index, open=df_chart['Open'], high=df_chart['High'], low=df_chart['Low'],
-                           close=df_chart['Close'], name='Price'), row=1, col=1)
-
-    fig.add_trace(
-        go.Scatter(x=df_chart.index, y=df_chart['VWAP'], name='VWAP', line=dict(color='#F0A800', dash='dash')), row=1,
-        col=1)
-    fig.add_trace(
-        go.Scatter(x=df_chart.index, y=df_chart['EMA_50'], name='EMA 50', line=dict(color='#C71585', width=1)), row=1,
-        col=1)
-    fig.add_trace(go.Scatter(x=buy_signals.index, y=buy_signals['Price'], mode='markers', marker_symbol='triangle-up',
-                             marker_color='#00FE35', marker_size=12, name='Buy Signal'), row=1, col=1)
-    fig.add_trace(
-        go.Scatter(x=sell_signals.index, y=sell_signals['Price'], mode='markers', marker_symbol='triangle-down',
-                   marker_color='#FF3333', marker_size=12, name='Sell Signal'), row=1, col=1)
-
-    volume_colors = ['#26A69A' if row['Close'] >= row['Open'] else '#EF5350' for index, row in df_chart.iterrows()]
-    fig.add_trace(go.Bar(x=df_chart.index, y=df_chart['Volume'], name='Volume', marker_color=volume_colors), row=2,
-                  col=1)
-
-    fig.add_trace(go.Scatter(x=df_chart.index, y=df_chart['RSI'], name='RSI', line=dict(color='#FFD700')), row=3, col=1)
-    fig.add_hline(y=70, line_dash="dash", line_color="red", opacity=0.5, row=3, col=1)
-    fig.add_hline(y=30, line_dash="dash", line_color="green", opacity=0.5, row=3, col=1)
-
-    macd_colors = ['#26A69A' if val >= 0 else '#EF5350' for val in df_chart['MACDh_12_26_9']]
-    fig.add_trace(go.Bar(x=df_chart.index, y=df_chart['MACDh_12_26_9'], name='Histogram', marker_color=macd_colors),
-                  row=4, col=1)
-    fig.add_trace(go.Scatter(x=df_chart.index, y=df_chart['MACD_12_26_9'], name='MACD', line=dict(color='#4472C4')),
-                  row=4, col=1)
-    fig.add_trace(go.Scatter(x=df_chart.index, y=df_chart['MACDs_12_26_9'], name='Signal',
-                             line=dict(color='#ED7D31', dash='dot')), row=4, col=1)
-
+    fig = build_figure(df_chart, buy_signals, sell_signals, chart_type, chart_height, overlays=overlay_columns,
+                       uirevision=f"{ticker}:{selected_date}:{chart_type}", source=df_1m)
     config = {'scrollZoom': True, 'displaylogo': False, 'responsive': True}
-    fig.update_layout(
-        height=chart_height,
-        showlegend=True, template="plotly_dark",
-        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
-        xaxis_rangeslider_visible=False, margin=dict(l=30, r=30, t=30, b=30)
-    )
-    st.plotly_chart(fig, use_container_width=True, config=config)
+    with perf.span('app.plotly_chart', rows=len(df_chart)):
+        st.plotly_chart(fig, use_container_width=True, config=config)
+    perf.mark_startup('first_paint')
+
+    if research_mode:
+        with st.expander("🔬 Archived Entry Signals"):
+            archived_signals = archive.signals(ticker)
+            st.caption(f"{len(archived_signals)} signals over {len(valid_dates)} days")
+            st.dataframe(archived_signals.rename_axis('Time').reset_index(), hide_index=True,
+                         use_container_width=True)
 
 with tab2:
     st.header("📘 Trading Strategy Guide")
@@ -323,4 +449,20 @@ with tab2:
         st.markdown(
             "- **Profit Target:** A key resistance/support level, or when momentum weakens. \n- **Stop Loss:** Below a recent swing low (for buys) or above a swing high (for sells). \n- **Warning Signs:** Exit on RSI divergence or a decisive break of VWAP.")
     with st.expander("⚠️ Common Pitfalls to Avoid"):
-        st.markdown("- **Ignoring Higher Timeframes.** \n- **Trading in Chop.** \n- **Conflicting Indicators.**")
\ No newline at end of file
+        st.markdown("- **Ignoring Higher Timeframes.** \n- **Trading in Chop.** \n- **Conflicting Indicators.**")
+
+# ─── Performance Panel ───────────────────────────────────────────────────────
+if profiler is not None:
+    profiler.stop()
+with perf_panel:
+    st.caption("Cold start (ms since the app was loaded)")
+    st.dataframe(perf.startup_report(), hide_index=True, use_container_width=True)
+if record_timings:
+    with perf_panel:
+        st.dataframe(perf.summarize(perf_spans), hide_index=True, use_container_width=True)
+        st.download_button("Spans (JSON lines)", perf.to_json_lines(perf_spans), file_name="spans.jsonl")
+        st.download_button("Metrics (Prometheus text)", perf.to_prometheus(), file_name="metrics.prom")
+        if profiler is not None:
+            st.caption(f"{sum(profiler.samples.values())} stack samples")
+            st.dataframe(profiler.top(15), hide_index=True, use_container_width=True)
+            st.download_button("Profile (collapsed stacks)", profiler.collapsed(), file_name="profile.folded")
@@ -0,0 +1,240 @@
+# trading_dashboard/backtest.py
+
+import argparse
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import numpy as np
+
+from indicators import IndicatorFrame
+
+# Strategy parameters (the defaults reproduce strategy.find_entry_signals) and exit rules.
+DEFAULT_PARAMS = {
+    'macd_fast': 12, 'macd_slow': 26, 'macd_signal': 9,
+    'rsi_period': 14, 'rsi_method': 'sma', 'rsi_mid': 50, 'rsi_upper': 70, 'rsi_lower': 30,
+    'ema_filter': None,         # EMA length price must be above (buys) / below (sells); None disables
+    'target_r': 2.0,            # take profit at this multiple of the initial risk; None disables
+    'min_risk_pct': 0.0005,     # floor on the initial risk as a fraction of the entry price
+    'exit_on_vwap_break': True,
+    'exit_on_opposite': True,
+    'max_bars': None,           # time stop in 1m bars; positions are always closed at the end of the day
+}
+
+
+def completed_bars(index: pd.DatetimeIndex, index_1m: pd.DatetimeIndex, interval: str) -> np.ndarray:
+    """How many bars of a higher timeframe's (start-labelled) index have closed by each 1m bar's close."""
+    return index.searchsorted(index_1m - (pd.Timedelta(interval) - pd.Timedelta('1min')), side='right')
+
+
+class BacktestData:
+    """Raw 1m/5m/15m bars plus everything that does not depend on the parameters."""
+
+    def __init__(self, df_1m: pd.DataFrame, df_5m: pd.DataFrame, df_15m: pd.DataFrame):
+        self.m1, self.m5, self.m15 = IndicatorFrame(df_1m), IndicatorFrame(df_5m), IndicatorFrame(df_15m)
+        # Number of completed higher-timeframe bars at the close of each 1m bar. A bar labelled t
+        # covers [t, t + interval), so the 5m bar labelled 9:30 is complete after the 9:34 1m bar.
+        self.pos_5m = completed_bars(self.m5.index, self.m1.index, '5min')
+        self.pos_15m = completed_bars(self.m15.index, self.m1.index, '15min')
+        # Last 1m position of each bar's trading day, for the end-of-day exit.
+        days = self.m1.index.normalize().asi8
+        self.day_end = np.searchsorted(days, days, side='right') - 1
+
+
+def _trend(cache: IndicatorFrame, positions: np.ndarray, p: dict):
+    """Bullish/bearish VWAP + MACD condition of a higher timeframe, aligned to the 1m bars."""
+    line, sig, _ = cache.macd(p['macd_fast'], p['macd_slow'], p['macd_signal'])
+    close, vwap = cache.close, cache.vwap()
+    # compute_indicators drops the RSI warm-up rows, so those bars never count as aligned.
+    valid = ~np.isnan(cache.rsi(p['rsi_period'], p['rsi_method']))
+    bullish = (close > vwap) & (line > sig) & valid
+    bearish = (close < vwap) & (line < sig) & valid
+    visible = positions > 0
+    at = np.where(visible, positions - 1, 0)
+    return bullish[at] & visible, bearish[at] & visible
+
+
+def entry_signals(data: BacktestData, p: dict):
+    """Boolean buy/sell arrays over the 1m bars; the find_entry_signals conditions with parameters."""
+    bull_15, bear_15 = _trend(data.m15, data.pos_15m, p)
+    bull_5, bear_5 = _trend(data.m5, data.pos_5m, p)
+
+    m1 = data.m1
+    line, sig, _ = m1.macd(p['macd_fast'], p['macd_slow'], p['macd_signal'])
+    rsi = m1.rsi(p['rsi_period'], p['rsi_method'])
+    valid = ~np.isnan(rsi)
+    prev_line, prev_sig = np.roll(line, 1), np.roll(sig, 1)
+    prev_valid = np.roll(valid, 1)
+    prev_valid[0] = False
+    cross_up = (line > sig) & (prev_line < prev_sig) & prev_valid
+    cross_down = (line < sig) & (prev_line > prev_sig) & prev_valid
+
+    with np.errstate(invalid='ignore'):
+        rsi_buy = (rsi > p['rsi_mid']) & (rsi < p['rsi_upper'])
+        rsi_sell = (rsi < p['rsi_mid']) & (rsi > p['rsi_lower'])
+
+    buy = bull_15 & bull_5 & cross_up & rsi_buy
+    sell = bear_15 & bear_5 & cross_down & rsi_sell
+    if p.get('ema_filter'):
+        ema = m1.ema(p['ema_filter'])
+        buy &= m1.close > ema
+        sell &= m1.close < ema
+    return buy, sell
+
+
+def _first(mask: np.ndarray) -> int:
+    """Index of the first True, or len(mask) when there is none."""
+    return int(mask.argmax()) if mask.any() else len(mask)
+
+
+def simulate_trades(data: BacktestData, buy: np.ndarray, sell: np.ndarray, p: dict) -> pd.DataFrame:
+    """
+    Turns signals into one-at-a-time trades entered at the signal bar's close. The initial stop
+    is the signal bar's low (longs) or high (shorts). When a stop and a target are both touched
+    in the same bar the stop is assumed to fill first.
+    """
+    m1 = data.m1
+    vwap = m1.vwap()
+    trades = []
+    busy_until = -1
+    for s in np.flatnonzero(buy | sell):
+        if s <= busy_until:
+            continue
+        direction = 1 if buy[s] else -1
+        entry = m1.close[s]
+        risk = max(abs(entry - (m1.low[s] if direction == 1 else m1.high[s])), entry * p['min_risk_pct'])
+        stop = entry - direction * risk
+        target = entry + direction * p['target_r'] * risk if p.get('target_r') else None
+
+        start, end = s + 1, data.day_end[s] + 1
+        if p.get('max_bars'):
+            end = min(end, start + p['max_bars'])
+        if start >= end:
+            continue
+
+        lows, highs, closes = m1.low[start:end], m1.high[start:end], m1.close[start:end]
+        adverse, favourable = (lows, highs) if direction == 1 else (highs, lows)
+        candidates = [(_first(direction * (adverse - stop) <= 0), 'stop', None)]
+        if target is not None:
+            candidates.append((_first(direction * (favourable - target) >= 0), 'target', target))
+        if p.get('exit_on_vwap_break'):
+            candidates.append((_first(direction * (closes - vwap[start:end]) < 0), 'vwap', None))
+        if p.get('exit_on_opposite'):
+            candidates.append((_first((sell if direction == 1 else buy)[start:end]), 'opposite', None))
+        # min() keeps the earliest exit and, on ties, the first rule listed (stop before target).
+        offset, reason, price = min(candidates, key=lambda c: c[0])
+        if offset >= end - start:
+            offset, reason, price = end - start - 1, 'time', None
+        if price is None:
+            price = stop if reason == 'stop' else closes[offset]
+
+        exit_at = start + offset
+        trades.append({
+            'entry_time': m1.index[s], 'exit_time': m1.index[exit_at], 'direction': direction,
+            'entry': entry, 'exit': price, 'exit_reason': reason,
+            'pnl': direction * (price - entry), 'return_pct': direction * (price - entry) / entry * 100,
+            'r_multiple': direction * (price - entry) / risk,
+        })
+        busy_until = exit_at
+    return pd.DataFrame(trades)
+
+
+def summarize(trades: pd.DataFrame) -> dict:
+    """P&L, hit rate and drawdown of a trade list (returns are summed, in percent)."""
+    if trades.empty:
+        return {'trades': 0, 'total_return_pct': 0.0, 'hit_rate': np.nan, 'avg_r': np.nan,
+                'profit_factor': np.nan, 'max_drawdown_pct': 0.0}
+    returns = trades['return_pct'].to_numpy()
+    equity = np.cumsum(returns)
+    drawdown = np.maximum.accumulate(np.maximum(equity, 0)) - equity
+    gains, losses = returns[returns > 0].sum(), -returns[returns < 0].sum()
+    return {
+        'trades': len(trades),
+        'total_return_pct': float(equity[-1]),
+        'hit_rate': float((returns > 0).mean()),
+        'avg_r': float(trades['r_multiple'].mean()),
+        'profit_factor': float(gains / losses) if losses > 0 else np.inf,
+        'max_drawdown_pct': float(drawdown.max()),
+    }
+
+
+def run_backtest(data: BacktestData, params: dict = None):
+    """Backtests one parameter set; returns (trades, summary)."""
+    p = {**DEFAULT_PARAMS, **(params or {})}
+    buy, sell = entry_signals(data, p)
+    trades = simulate_trades(data, buy, sell, p)
+    return trades, summarize(trades)
+
+
+def parameter_grid(grid: dict) -> list:
+    """Expands {'name': [values, ...]} into a list of parameter dicts (cartesian product)."""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+_worker_data = None
+
+
+def _init_worker(df_1m, df_5m, df_15m):
+    # Each worker builds its caches once and reuses them for every combination it is given.
+    global _worker_data
+    _worker_data = BacktestData(df_1m, df_5m, df_15m)
+
+
+def _run_chunk(chunk: list) -> list:
+    return [{**params, **run_backtest(_worker_data, params)[1]} for params in chunk]
+
+
+def run_sweep(df_1m: pd.DataFrame, df_5m: pd.DataFrame, df_15m: pd.DataFrame, grid: dict,
+              max_workers: int = None, chunk_size: int = None) -> pd.DataFrame:
+    """
+    Backtests every combination of `grid` across a process pool and returns one summary row per
+    combination, best total return first. Combinations sharing MACD/RSI settings are kept in the
+    same chunk so their indicator arrays are computed once per worker.
+    """
+    combos = parameter_grid(grid)
+    combos.sort(key=lambda c: tuple(str(c.get(k)) for k in ('macd_fast', 'macd_slow', 'rsi_period', 'macd_signal')))
+    max_workers = max_workers or os.cpu_count() or 1
+    chunk_size = chunk_size or max(1, -(-len(combos) // (max_workers * 4)))
+    chunks = [combos[i:i + chunk_size] for i in range(0, len(combos), chunk_size)]
+
+    if max_workers == 1:
+        _init_worker(df_1m, df_5m, df_15m)
+        rows = [row for chunk in chunks for row in _run_chunk(chunk)]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(df_1m, df_5m, df_15m)) as executor:
+            rows = [row for result in executor.map(_run_chunk, chunks) for row in result]
+    return pd.DataFrame(rows).sort_values('total_return_pct', ascending=False, ignore_index=True)
+
+
+def main():
+    from bar_store import get_bar_store
+
+    parser = argparse.ArgumentParser(description="Backtest the multi-timeframe entry signals on locally stored bars.")
+    parser.add_argument("ticker")
+    parser.add_argument("--sweep", action="store_true", help="run the default parameter sweep")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    store = get_bar_store()
+    frames = [store.read(args.ticker, interval) for interval in ("1m", "5m", "15m")]
+    if any(df.empty for df in frames):
+        parser.error(f"no stored 1m/5m/15m bars for {args.ticker}; open it in the dashboard first")
+
+    if args.sweep:
+        grid = {
+            'macd_fast': [8, 12, 16], 'macd_slow': [21, 26, 34], 'macd_signal': [7, 9],
+            'rsi_period': [9, 14], 'rsi_upper': [70, 80], 'ema_filter': [None, 50],
+            'target_r': [1.5, 2.0, 3.0],
+        }
+        print(run_sweep(*frames, grid, max_workers=args.workers).head(20).to_string())
+    else:
+        trades, summary = run_backtest(BacktestData(*frames))
+        print(trades.to_string())
+        print(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# trading_dashboard/bar_store.py
+
+import os
+import re
+import threading
+from datetime import date
+
+import pandas as pd
+import numpy as np
+
+import perf
+
+BAR_STORE_DIR = os.environ.get("TRADING_DASHBOARD_BAR_STORE", ".bar_store")
+MARKET_TZ = 'America/New_York'
+
+# One structured record per bar; timestamps are UTC epoch nanoseconds.
+BAR_DTYPE = np.dtype([('ts', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'),
+                      ('close', '<f8'), ('volume', '<f8')])
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def frame_to_records(df: pd.DataFrame) -> np.ndarray:
+    """Packs the OHLCV columns of a tz-aware bar frame into a BAR_DTYPE array."""
+    records = np.empty(len(df), dtype=BAR_DTYPE)
+    records['ts'] = df.index.tz_convert('UTC').asi8
+    for field, column in zip(BAR_DTYPE.names[1:], OHLCV_COLUMNS):
+        records[field] = df[column].to_numpy(dtype=np.float64)
+    return records
+
+
+def records_to_frame(records: np.ndarray) -> pd.DataFrame:
+    """Unpacks a BAR_DTYPE array into an OHLCV frame indexed in market time."""
+    index = pd.DatetimeIndex(records['ts'].astype('datetime64[ns]')).tz_localize('UTC').tz_convert(MARKET_TZ)
+    data = {column: np.asarray(records[field]) for field, column in zip(BAR_DTYPE.names[1:], OHLCV_COLUMNS)}
+    return pd.DataFrame(data, index=index)
+
+
+class BarStore:
+    """
+    Local columnar store of raw OHLCV bars, one memory-mappable .npy file per
+    ticker/interval/trading date: <root>/<TICKER>/<interval>/<YYYY-MM-DD>.npy
+    """
+
+    def __init__(self, root: str = BAR_STORE_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _dir(self, ticker_symbol: str, interval: str) -> str:
+        return os.path.join(self.root, ticker_symbol.upper(), interval)
+
+    def _path(self, ticker_symbol: str, interval: str, day: date) -> str:
+        return os.path.join(self._dir(ticker_symbol, interval), f"{day.isoformat()}.npy")
+
+    def days(self, ticker_symbol: str, interval: str) -> list:
+        """Trading dates stored for a ticker/interval, oldest first."""
+        directory = self._dir(ticker_symbol, interval)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(date.fromisoformat(name[:-4]) for name in os.listdir(directory) if name.endswith('.npy'))
+
+    def _load_day(self, ticker_symbol: str, interval: str, day: date) -> np.ndarray:
+        return np.load(self._path(ticker_symbol, interval, day), mmap_mode='r')
+
+    def last_timestamp(self, ticker_symbol: str, interval: str):
+        days = self.days(ticker_symbol, interval)
+        if not days:
+            return None
+        records = self._load_day(ticker_symbol, interval, days[-1])
+        if len(records) == 0:
+            return None
+        return pd.Timestamp(int(records['ts'][-1]), tz='UTC').tz_convert(MARKET_TZ)
+
+    def read_days(self, ticker_symbol: str, interval: str, days) -> pd.DataFrame:
+        """Bars of the given stored trading dates, read through memory maps."""
+        days = list(days)
+        if not days:
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+        with perf.span('bar_store.read') as s:
+            df = records_to_frame(np.concatenate([self._load_day(ticker_symbol, interval, d) for d in days]))
+            s.set(rows=len(df))
+        return df
+
+    def read_recent(self, ticker_symbol: str, interval: str, period: str) -> pd.DataFrame:
+        """Bars of the last `period` stored trading dates ('7d' is the last 7 stored sessions)."""
+        return self.read_days(ticker_symbol, interval, self.days(ticker_symbol, interval)[-period_sessions(period):])
+
+    def read(self, ticker_symbol: str, interval: str, start=None, end=None) -> pd.DataFrame:
+        """Reads stored bars between start and end (inclusive, either may be None)."""
+        days = self.days(ticker_symbol, interval)
+        if start is not None:
+            days = [d for d in days if d >= pd.Timestamp(start).date()]
+        if end is not None:
+            days = [d for d in days if d <= pd.Timestamp(end).date()]
+        if not days:
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+
+        with perf.span('bar_store.read') as s:
+            records = np.concatenate([self._load_day(ticker_symbol, interval, d) for d in days])
+            df = records_to_frame(records)
+            if start is not None or end is not None:
+                df = df.loc[start:end]
+            s.set(rows=len(df))
+        return df
+
+    def write(self, ticker_symbol: str, interval: str, df: pd.DataFrame):
+        """Merges bars into the store; a bar with an already stored timestamp replaces the stored one."""
+        if df is None or df.empty:
+            return
+        directory = self._dir(ticker_symbol, interval)
+        os.makedirs(directory, exist_ok=True)
+        new_records = frame_to_records(df)
+        bar_days = df.index.date
+
+        with self._lock:
+            for day in np.unique(bar_days):
+                incoming = new_records[bar_days == day]
+                path = self._path(ticker_symbol, interval, day)
+                if os.path.exists(path):
+                    existing = np.load(path)
+                    stale = np.isin(existing['ts'], incoming['ts'])
+                    incoming = np.concatenate([existing[~stale], incoming])
+                incoming = incoming[np.argsort(incoming['ts'], kind='stable')]
+                # Write then rename so readers never see a half-written file.
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    np.save(f, incoming)
+                os.replace(tmp_path, path)
+
+
+@perf.traced('fetch.tz_convert')
+def _normalize_tz(df: pd.DataFrame) -> pd.DataFrame:
+    if df.index.tz is None:
+        return df.tz_localize(MARKET_TZ, ambiguous='infer')
+    return df.tz_convert(MARKET_TZ)
+
+
+def period_sessions(period: str) -> int:
+    """Trading sessions in a yfinance-style period ('7d' -> 7)."""
+    match = re.fullmatch(r"(\d+)d", period)
+    if match is None or int(match.group(1)) == 0:
+        raise ValueError(f"Unsupported period: {period}")
+    return int(match.group(1))
+
+
+def fetch_bars(client, ticker_symbol: str, period: str, interval: str, store: BarStore = None) -> pd.DataFrame:
+    """
+    Returns the last `period` of raw bars for a ticker/interval.
+    `client` is anything with a yfinance-style `history()` method. With a store, only bars
+    from the last stored timestamp onwards are requested (that bar is refetched, as it may
+    have been the in-progress candle) and merged in; the result is then read back locally,
+    as the last `period` stored trading dates (a '7d' period is 7 sessions, not 7 days).
+    """
+    if store is None:
+        df = client.history(period=period, interval=interval, auto_adjust=True)
+        return df if df.empty else _normalize_tz(df)
+
+    lookback = pd.Timedelta(period)
+    now = pd.Timestamp.now(tz=MARKET_TZ)
+    last_ts = store.last_timestamp(ticker_symbol, interval)
+
+    if last_ts is None or now - last_ts > lookback:
+        new_bars = client.history(period=period, interval=interval, auto_adjust=True)
+    else:
+        new_bars = client.history(start=last_ts, interval=interval, auto_adjust=True)
+
+    if not new_bars.empty:
+        new_bars = _normalize_tz(new_bars)
+        store.write(ticker_symbol, interval, new_bars[OHLCV_COLUMNS])
+
+    return store.read_recent(ticker_symbol, interval, period)
+
+
+_default_store = None
+
+
+def get_bar_store() -> BarStore:
+    """Process-wide store rooted at BAR_STORE_DIR."""
+    global _default_store
+    if _default_store is None:
+        _default_store = BarStore()
+    return _default_store
@@ -0,0 +1,353 @@
+# trading_dashboard/benchmark.py
+
+import argparse
+import copy
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+from datetime import datetime
+
+import pandas as pd
+import numpy as np
+
+from indicators import compute_indicators, compute_indicator_set
+from incremental import IncrementalIndicators
+from resample import resample_ohlcv
+from strategy import run_strategy_analysis, find_entry_signals, compute_strategy_state
+from replay import ReplayTimeline, day_slice
+from charts import build_figure, decimate, _parts_cache
+from backtest import BacktestData, entry_signals, run_backtest, DEFAULT_PARAMS
+from scanner import StackedBars, scan, FIELDS
+from compact import CompactBars
+from alerts import AlertEngine
+from lazy import LazyFrame
+from retention import RetentionPolicy
+
+MARKET_TZ = 'America/New_York'
+SESSION_MINUTES = 390
+
+# setup() builds fresh arguments for each run (untimed); fn(*args) is the measured call.
+Stage = namedtuple('Stage', ['name', 'setup', 'fn', 'rows'])
+
+
+# ─── Synthetic data ──────────────────────────────────────────────────────────
+def synthetic_bars(days: int, interval_minutes: int = 1, seed: int = 0, start: str = '2025-01-02',
+                   price: float = 100.0) -> pd.DataFrame:
+    """
+    Reproducible regular-hours OHLCV bars (9:30-16:00 on weekdays): a random walk in log price
+    with intraday-trending drift and a U-shaped volume profile. Same seed, same bars.
+    """
+    rng = np.random.default_rng(seed)
+    per_day = SESSION_MINUTES // interval_minutes
+    sessions = pd.bdate_range(start, periods=days, tz=MARKET_TZ) + pd.Timedelta(hours=9, minutes=30)
+    offsets = pd.to_timedelta(np.arange(per_day) * interval_minutes, unit='min')
+    index = pd.DatetimeIndex((sessions.asi8[:, None] + offsets.asi8[None, :]).ravel()).tz_localize('UTC') \
+        .tz_convert(MARKET_TZ)
+    n = len(index)
+
+    step = 0.0008 * np.sqrt(interval_minutes)
+    drift = np.repeat(rng.normal(0, step / 4, days), per_day)
+    close = price * np.exp(np.cumsum(rng.normal(0, step, n) + drift))
+    open_ = np.r_[price, close[:-1]] * np.exp(rng.normal(0, step / 4, n))
+    wick = np.abs(rng.normal(0, step / 2, (2, n)))
+    high = np.maximum(open_, close) * (1 + wick[0])
+    low = np.minimum(open_, close) * (1 - wick[1])
+    profile = 1 + 2 * (np.linspace(-1, 1, per_day) ** 2)
+    volume = np.round(rng.lognormal(8, 0.5, n) * np.tile(profile, days) * interval_minutes)
+    return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume}, index=index)
+
+
+def synthetic_timeframes(days: int = 60, seed: int = 0) -> tuple:
+    """1m bars for `days` sessions and the 5m/15m bars resampled from them, as the dashboard derives them."""
+    df_1m = synthetic_bars(days, 1, seed)
+    return df_1m, resample_ohlcv(df_1m, '5m'), resample_ohlcv(df_1m, '15m')
+
+
+def synthetic_universe(n_symbols: int, days: int = 5, seed: int = 0, gap_rate: float = 0.0) -> StackedBars:
+    """`n_symbols` independent 1m series on one grid; `gap_rate` of the bars are blanked as thinly traded."""
+    rng = np.random.default_rng(seed)
+    frames = [synthetic_bars(days, 1, seed + i, price=float(rng.uniform(10, 500))) for i in range(n_symbols)]
+    data = np.stack([frame[FIELDS].to_numpy() for frame in frames])
+    if gap_rate:
+        data[rng.random(data.shape[:2]) < gap_rate] = np.nan
+    return StackedBars([f"SYM{i:04d}" for i in range(n_symbols)], frames[0].index, data)
+
+
+# ─── Measurement ─────────────────────────────────────────────────────────────
+def measure(stage: Stage, repeat: int) -> dict:
+    """Best and median wall time over `repeat` runs, plus the peak traced allocation of one extra run."""
+    times = []
+    for _ in range(repeat):
+        args = stage.setup()
+        started = time.perf_counter()
+        stage.fn(*args)
+        times.append(time.perf_counter() - started)
+
+    args = stage.setup()
+    tracemalloc.start()
+    try:
+        stage.fn(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'seconds': min(times), 'median_seconds': float(np.median(times)), 'peak_mb': peak / 2 ** 20,
+            'rows': stage.rows}
+
+
+def _copies(*frames):
+    # compute_indicators renames and adds columns in place, so every run gets its own input.
+    return lambda: tuple(frame.copy() for frame in frames)
+
+
+def build_stages(quick: bool = False, workers: int = 1) -> list:
+    """The hot paths at dashboard sizes: one 1m day, 7 days of 1m, 60 days of 5m/15m, a 500-ticker scan."""
+    raw_1m, raw_5m, raw_15m = synthetic_timeframes(days=10 if quick else 60)
+    last_day = raw_1m.index[-1].date()
+    week_1m = raw_1m.iloc[-7 * SESSION_MINUTES:]
+    day_1m = day_slice(raw_1m, last_day)
+
+    ind_week = compute_indicators(week_1m.copy())
+    ind_5m, ind_15m = compute_indicators(raw_5m.copy()), compute_indicators(raw_15m.copy())
+    ind_day = day_slice(ind_week, last_day)
+    day_5m, day_15m = day_slice(ind_5m, last_day), day_slice(ind_15m, last_day)
+    universe = synthetic_universe(50 if quick else 500, days=5)
+
+    primed = IncrementalIndicators()
+    primed.update(week_1m)
+    revised_bar = week_1m.iloc[-1:].assign(Close=week_1m['Close'].iloc[-1] * 1.001)
+
+    alert_engine = AlertEngine(universe.symbols)
+    alert_engine.warm_up(universe.index[-390:-1], universe.data[:, -390:-1])
+
+    def full_replay(*args):
+        timeline = ReplayTimeline(*args)
+        return [timeline.analysis_at(cursor) for cursor in range(len(timeline.index) + 1)]
+
+    day_start = ind_day.index[0]
+
+    def fresh_figure(df_chart):
+        _parts_cache.clear()
+        return build_figure(df_chart, *find_entry_signals(df_chart, day_5m, day_15m), 'Candlestick', 800)
+
+    def served_figure(df_chart):
+        # What st.plotly_chart does with the figure before sending it to the browser.
+        import plotly.io as pio
+        return pio.to_json(fresh_figure(df_chart).to_dict(), validate=False)
+
+    none = lambda: ()
+    return [
+        Stage('indicators.day_1m', _copies(day_1m), compute_indicators, len(day_1m)),
+        Stage('indicators.week_1m', _copies(week_1m), compute_indicators, len(week_1m)),
+        Stage('indicators.history_5m', _copies(raw_5m), compute_indicators, len(raw_5m)),
+        Stage('indicators.history_15m', _copies(raw_15m), compute_indicators, len(raw_15m)),
+        Stage('incremental.revise_last_bar', lambda: (revised_bar,), primed.update, 1),
+        Stage('resample.week_1m_to_5m', lambda: (week_1m, '5m'), resample_ohlcv, len(week_1m)),
+        Stage('strategy.analysis_day', lambda: (ind_day, day_5m, day_15m), run_strategy_analysis, len(ind_day)),
+        Stage('strategy.entry_signals_week', lambda: (ind_week, ind_5m, ind_15m), find_entry_signals, len(ind_week)),
+        Stage('strategy.state_week', lambda: (ind_week, ind_5m, ind_15m), compute_strategy_state, len(ind_week)),
+        Stage('replay.timeline_day', lambda: (ind_week, ind_5m, ind_15m, last_day), ReplayTimeline, len(ind_day)),
+        Stage('replay.all_cursors_day', lambda: (ind_week, ind_5m, ind_15m, last_day), full_replay, len(ind_day)),
+        Stage('lazy.overlays_day', lambda: (LazyFrame(ind_week),),
+              lambda lazy: lazy.get(LAZY_SPECS, day_start), len(ind_day)),
+        Stage('charts.figure_day', lambda: (ind_day,), fresh_figure, len(ind_day)),
+        Stage('charts.figure_json_day', lambda: (ind_day,), served_figure, len(ind_day)),
+        Stage('charts.figure_week', lambda: (ind_week,), fresh_figure, len(ind_week)),
+        Stage('backtest.run_history', none, lambda: run_backtest(BacktestData(raw_1m, raw_5m, raw_15m)), len(raw_1m)),
+        Stage('compact.from_frame_week', lambda: (ind_week,), CompactBars.from_frame, len(ind_week)),
+        Stage(f'scanner.scan_{len(universe.symbols)}', none, lambda: scan(universe, max_workers=workers),
+              len(universe.symbols) * len(universe.index)),
+        Stage(f'alerts.bar_close_{len(universe.symbols)}',
+              lambda: (copy.deepcopy(alert_engine), universe.index[-1], universe.data[:, -1]),
+              lambda engine, ts, bars: engine.on_bars(ts, bars), len(universe.symbols)),
+    ]
+
+
+# ─── Correctness checks ──────────────────────────────────────────────────────
+def check_incremental(df_1m: pd.DataFrame) -> tuple:
+    """Chunked incremental updates (with a revised last bar) against compute_indicators on the whole frame."""
+    engine = IncrementalIndicators()
+    for end in range(100, len(df_1m), 377):
+        engine.update(df_1m.iloc[:end].assign(Close=df_1m['Close'].iloc[:end] * np.r_[np.ones(end - 1), 1.01]))
+    engine.update(df_1m)
+    reference = compute_indicators(df_1m.copy())
+    columns = list(reference.columns)
+    if not engine.frame.index.equals(reference.index):
+        return False, "index differs"
+    error = float(np.nanmax(np.abs(engine.frame[columns].to_numpy() - reference[columns].to_numpy())))
+    return error < 1e-8, f"max abs error {error:.2e}"
+
+
+def check_strategy_state(ind_1m, ind_5m, ind_15m, trading_date) -> tuple:
+    """
+    ReplayTimeline.analysis_at (formatted from compute_strategy_state) at every cursor against
+    run_strategy_analysis over each prefix.
+    """
+    timeline = ReplayTimeline(ind_1m, ind_5m, ind_15m, trading_date)
+    mismatches = 0
+    for cursor in range(len(timeline.index) + 1):
+        t = timeline.index[cursor - 1] if cursor else None
+        prefixes = [df.loc[:t] if cursor else df.iloc[:0] for df in (timeline.df_1m, timeline.df_5m, timeline.df_15m)]
+        mismatches += timeline.analysis_at(cursor) != run_strategy_analysis(*prefixes)
+    return mismatches == 0, f"{mismatches} of {len(timeline.index) + 1} cursors differ"
+
+
+def check_backtest_signals(raw_1m, raw_5m, raw_15m) -> tuple:
+    """
+    backtest.entry_signals with the default parameters against find_entry_signals, given 5m/15m
+    frames labelled by their last 1m bar so that only completed bars are aligned.
+    """
+    data = BacktestData(raw_1m, raw_5m, raw_15m)
+    buy, sell = entry_signals(data, DEFAULT_PARAMS)
+    closed_5m, closed_15m = (compute_indicators(df.copy()).shift(freq=pd.Timedelta(interval) - pd.Timedelta('1min'))
+                             for df, interval in ((raw_5m, '5min'), (raw_15m, '15min')))
+    ref_buy, ref_sell = find_entry_signals(compute_indicators(raw_1m.copy()), closed_5m, closed_15m)
+    ok = data.m1.index[buy].equals(ref_buy.index) and data.m1.index[sell].equals(ref_sell.index)
+    return ok, f"{buy.sum()}/{len(ref_buy)} buys, {sell.sum()}/{len(ref_sell)} sells"
+
+
+def check_scanner(universe: StackedBars) -> tuple:
+    """Batched scanner signals against run_strategy_analysis on each symbol's own frames."""
+    table = scan(universe, max_workers=1).set_index('symbol')
+    last_day = universe.index[-1].date()
+    mismatches = 0
+    for i, symbol in enumerate(universe.symbols):
+        raw = pd.DataFrame(universe.data[i], index=universe.index, columns=FIELDS).dropna()
+        frames = [day_slice(compute_indicators(df), last_day)
+                  for df in (raw.copy(), resample_ohlcv(raw, '5m'), resample_ohlcv(raw, '15m'))]
+        mismatches += run_strategy_analysis(*frames)['overall'][0] != table.loc[symbol, 'signal']
+    return mismatches == 0, f"{mismatches} of {len(universe.symbols)} symbols differ"
+
+
+def check_compact(ind_1m: pd.DataFrame) -> tuple:
+    """CompactBars round trip within float32 precision, with zero-copy frames and day views."""
+    bars = CompactBars.from_frame(ind_1m)
+    frame = bars.to_frame()
+    columns = [c for c in frame.columns if c != 'Volume']
+    error = float(np.nanmax(np.abs(frame[columns].to_numpy(np.float64) / ind_1m[columns].to_numpy() - 1)))
+    day = bars.day(ind_1m.index[-1].date())
+    shared = np.shares_memory(frame['Close'].to_numpy(), bars.columns['Close']) and \
+        np.shares_memory(day.columns['Close'], bars.columns['Close'])
+    ok = frame.index.equals(ind_1m.index) and error < 1e-6 and shared and \
+        len(day) == len(day_slice(ind_1m, ind_1m.index[-1].date()))
+    return ok, f"max rel error {error:.1e}, {bars.nbytes / ind_1m.memory_usage().sum():.0%} of the DataFrame size"
+
+
+def check_decimation(ind_1m: pd.DataFrame) -> tuple:
+    """Decimated chart bars keep the window's extremes, total volume and last close."""
+    bars = decimate(ind_1m, 600)
+    ok = (len(bars) <= 600 and bars['High'].max() == ind_1m['High'].max() and bars['Low'].min() == ind_1m['Low'].min()
+          and np.isclose(bars['Volume'].sum(), ind_1m['Volume'].sum()) and bars['Close'].iloc[-1] == ind_1m['Close'].iloc[-1])
+    return ok, f"{len(ind_1m)} -> {len(bars)} points"
+
+
+LAZY_SPECS = [('ema', {'span': 21}), 'bbands', ('vwap', {'k': 1.0}), 'rsi', 'atr']
+
+
+def check_lazy(ind_1m: pd.DataFrame) -> tuple:
+    """Lazy nodes over a late window (computed from the warm-up only) against the registry over all history."""
+    lazy = LazyFrame(ind_1m)
+    window = lazy.get(LAZY_SPECS, ind_1m.index[-1].normalize() + pd.Timedelta(hours=11))
+    reference = compute_indicator_set(ind_1m, LAZY_SPECS).loc[window.index, window.columns]
+    error = float(np.nanmax(np.abs(window.to_numpy() / reference.to_numpy() - 1)))
+    computed_from = min(start for start, _ in lazy._nodes.values())
+    return error < 1e-9, f"max rel error {error:.1e}, {len(ind_1m) - computed_from}/{len(ind_1m)} bars computed"
+
+
+def check_retention() -> tuple:
+    """The default retention policy keeps every session of a fetch: 7 1m sessions, 60 5m/15m ones."""
+    frames = synthetic_timeframes(days=60, seed=3)
+    recent_1m = frames[0].iloc[frames[0].index.searchsorted(np.unique(frames[0].index.normalize())[-7]):]
+    policy = RetentionPolicy()
+    kept = [policy.trim(interval, df) for interval, df in zip(('1m', '5m', '15m'), (recent_1m, *frames[1:]))]
+    ok = all(len(k) == len(df) for k, df in zip(kept, (recent_1m, *frames[1:])))
+    return ok, ", ".join(f"{len(np.unique(k.index.normalize()))} {interval} sessions"
+                         for interval, k in zip(('1m', '5m', '15m'), kept))
+
+
+def run_checks(quick: bool = False) -> dict:
+    raw_1m, raw_5m, raw_15m = synthetic_timeframes(days=5 if quick else 20, seed=1)
+    ind_1m, ind_5m, ind_15m = (compute_indicators(df.copy()) for df in (raw_1m, raw_5m, raw_15m))
+    checks = {
+        'incremental_matches_batch': lambda: check_incremental(raw_1m),
+        'strategy_state_matches_analysis': lambda: check_strategy_state(ind_1m, ind_5m, ind_15m,
+                                                                        ind_1m.index[-1].date()),
+        'backtest_matches_entry_signals': lambda: check_backtest_signals(raw_1m, raw_5m, raw_15m),
+        'scanner_matches_analysis': lambda: check_scanner(synthetic_universe(8 if quick else 24, days=3, seed=2)),
+        'compact_round_trip': lambda: check_compact(ind_1m),
+        'decimation_keeps_extremes': lambda: check_decimation(ind_1m),
+        'lazy_matches_full_history': lambda: check_lazy(ind_1m),
+        'retention_keeps_fetched_sessions': check_retention,
+    }
+    results = {}
+    for name, check in checks.items():
+        ok, detail = check()
+        results[name] = {'ok': bool(ok), 'detail': detail}
+    return results
+
+
+# ─── Reporting ───────────────────────────────────────────────────────────────
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Stages whose best time grew by more than `threshold` times against the baseline run."""
+    regressions = []
+    for name, stage in results['stages'].items():
+        before = baseline.get('stages', {}).get(name)
+        if before and before['seconds'] > 0 and stage['seconds'] / before['seconds'] > threshold:
+            regressions.append((name, before['seconds'], stage['seconds']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the indicator, strategy and chart hot paths on synthetic data.")
+    parser.add_argument("--quick", action="store_true", help="smaller inputs, for a fast smoke run")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", help="run only stages whose name contains this text")
+    parser.add_argument("--workers", type=int, default=1, help="scanner worker processes")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to check for regressions")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown factor reported as a regression")
+    parser.add_argument("--skip-checks", action="store_true")
+    args = parser.parse_args()
+
+    results = {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'), 'quick': args.quick, 'repeat': args.repeat,
+            'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__,
+            'machine': platform.machine(), 'cpus': os.cpu_count(),
+        },
+        'stages': {},
+        'checks': {},
+    }
+
+    for stage in build_stages(args.quick, args.workers):
+        if args.only and args.only not in stage.name:
+            continue
+        timing = measure(stage, args.repeat)
+        results['stages'][stage.name] = timing
+        print(f"{stage.name:<32} {timing['seconds'] * 1000:>10.2f} ms  (median {timing['median_seconds'] * 1000:.2f})"
+              f"  peak {timing['peak_mb']:>8.2f} MB  rows {timing['rows']}")
+
+    if not args.skip_checks:
+        results['checks'] = run_checks(args.quick)
+        for name, check in results['checks'].items():
+            print(f"{'ok  ' if check['ok'] else 'FAIL'} {name}: {check['detail']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    failed = [name for name, check in results['checks'].items() if not check['ok']]
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: {before * 1000:.2f} ms -> {after * 1000:.2f} ms ({after / before:.2f}x)")
+    sys.exit(1 if failed or regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
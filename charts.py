@@ -0,0 +1,211 @@
+# trading_dashboard/charts.py
+
+import threading
+import weakref
+from collections import OrderedDict
+
+import pandas as pd
+import numpy as np
+
+import perf
+
+UP_COLOR, DOWN_COLOR = '#26A69A', '#EF5350'
+
+# Roughly one point per horizontal pixel pair of a wide chart; beyond this, bars are bucketed.
+CHART_MAX_POINTS = 600
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+LINE_COLUMNS = ['VWAP', 'EMA_50', 'RSI', 'MACD_12_26_9', 'MACDs_12_26_9', 'MACDh_12_26_9']
+
+# Optional price-pane overlays: label -> indicator registry spec, computed only while selected.
+OVERLAYS = {
+    'EMA 9': ('ema', {'span': 9}),
+    'EMA 21': ('ema', {'span': 21}),
+    'SMA 20': ('sma', {'period': 20}),
+    'Bollinger Bands (20, 2)': ('bbands', {'period': 20, 'k': 2.0}),
+    'VWAP ±1σ': ('vwap', {'k': 1.0}),
+}
+OVERLAY_COLORS = ['#8FBC8F', '#87CEFA', '#DDA0DD', '#B0B0B0', '#F4A460', '#20B2AA']
+
+
+def decimate(df: pd.DataFrame, max_points: int, line_columns=LINE_COLUMNS) -> pd.DataFrame:
+    """
+    OHLC bucket aggregation down to at most max_points rows: each bucket keeps its first
+    timestamp, first open, max high, min low, last close, summed volume and the indicator
+    values at its last bar (so lines end where the candles end).
+    """
+    n = len(df)
+    if n <= max_points:
+        return df
+    size = -(-n // max_points)
+    starts = np.arange(0, n, size)
+    ends = np.minimum(starts + size, n) - 1
+
+    out = {
+        'Open': df['Open'].to_numpy()[starts],
+        'High': np.maximum.reduceat(df['High'].to_numpy(), starts),
+        'Low': np.minimum.reduceat(df['Low'].to_numpy(), starts),
+        'Close': df['Close'].to_numpy()[ends],
+        'Volume': np.add.reduceat(df['Volume'].to_numpy(), starts),
+    }
+    for column in line_columns:
+        out[column] = df[column].to_numpy()[ends]
+    return pd.DataFrame(out, index=df.index[starts])
+
+
+_parts_cache = OrderedDict()
+_parts_lock = threading.Lock()
+_PARTS_CACHE_SIZE = 64
+
+
+def chart_columns(df_chart: pd.DataFrame, max_points: int = CHART_MAX_POINTS, overlays=(), source=None) -> dict:
+    """
+    Decimated arrays and bar colours for a chart window. With `source`, the frame the window
+    was cut from (e.g. a snapshot's 1m frame; a new fetch or another ticker is another frame),
+    they are memoized on that frame and the window's bounds and last bar (the only bar revised
+    in place between refreshes), so unchanged windows are reused; without it nothing is cached.
+    """
+    last = df_chart.iloc[-1]
+    overlays = tuple(overlays)
+    key = (id(source), df_chart.index[0], df_chart.index[-1], len(df_chart), last['Close'], last['Volume'],
+           max_points, overlays)
+    with perf.span('charts.columns', rows=len(df_chart), cache='hit') as s:
+        with _parts_lock:
+            # The entry holds a weak reference, so a new frame that reuses a freed one's id() misses.
+            entry = _parts_cache.get(key) if source is not None else None
+            if entry is not None and entry[0]() is source:
+                _parts_cache.move_to_end(key)
+                return entry[1]
+
+        s.set(cache='miss')
+        line_columns = LINE_COLUMNS + list(overlays)
+        bars = decimate(df_chart, max_points, line_columns)
+        columns = {column: bars[column].to_numpy() for column in PRICE_COLUMNS + line_columns}
+        columns['x'] = _iso_times(bars.index)
+        columns['volume_colors'] = np.where(columns['Close'] >= columns['Open'], UP_COLOR, DOWN_COLOR)
+        columns['macd_colors'] = np.where(columns['MACDh_12_26_9'] >= 0, UP_COLOR, DOWN_COLOR)
+
+    if source is not None:
+        with _parts_lock:
+            _parts_cache[key] = (weakref.ref(source), columns)
+            while len(_parts_cache) > _PARTS_CACHE_SIZE:
+                _parts_cache.popitem(last=False)
+    return columns
+
+
+_templates = OrderedDict()
+_templates_lock = threading.Lock()
+_TEMPLATE_CACHE_SIZE = 16
+
+
+def _figure_template(chart_type: str, chart_height: int, overlays: tuple):
+    """
+    The 4-row figure without data, as plain (layout, traces) dicts, plus one slot per trace
+    mapping its data attributes to chart column keys. make_subplots, the layout and the
+    RSI guide lines cost far more than the data itself, so they are built once per shape.
+    """
+    key = (chart_type, chart_height, overlays)
+    with _templates_lock:
+        if key in _templates:
+            _templates.move_to_end(key)
+            return _templates[key]
+
+    # plotly is only loaded once a chart is drawn, so startup is not held up by it.
+    with perf.startup_phase('import.plotly'), perf.span('charts.template'):
+        import plotly.graph_objects as go
+        from plotly.subplots import make_subplots
+
+        fig = make_subplots(rows=4, cols=1, shared_xaxes=True, vertical_spacing=0.02,
+                            row_heights=[0.6, 0.1, 0.15, 0.15])
+        slots = []
+
+        def add(trace, row, **columns):
+            fig.add_trace(trace, row=row, col=1)
+            slots.append(columns)
+
+        if chart_type == 'Line':
+            add(go.Scatter(name='Close', line=dict(color='#00A0B0')), 1, x='x', y='Close')
+        else:
+            add(go.Candlestick(name='Price'), 1, x='x', open='Open', high='High', low='Low', close='Close')
+
+        add(go.Scatter(name='VWAP', line=dict(color='#F0A800', dash='dash')), 1, x='x', y='VWAP')
+        add(go.Scatter(name='EMA 50', line=dict(color='#C71585', width=1)), 1, x='x', y='EMA_50')
+        for i, column in enumerate(overlays):
+            add(go.Scatter(name=column, line=dict(color=OVERLAY_COLORS[i % len(OVERLAY_COLORS)], width=1)), 1,
+                x='x', y=column)
+        add(go.Scatter(mode='markers', marker_symbol='triangle-up', marker_color='#00FE35', marker_size=12,
+                       name='Buy Signal'), 1, x='buy_x', y='buy_y')
+        add(go.Scatter(mode='markers', marker_symbol='triangle-down', marker_color='#FF3333', marker_size=12,
+                       name='Sell Signal'), 1, x='sell_x', y='sell_y')
+
+        add(go.Bar(name='Volume'), 2, x='x', y='Volume', marker_color='volume_colors')
+
+        add(go.Scatter(name='RSI', line=dict(color='#FFD700')), 3, x='x', y='RSI')
+        fig.add_hline(y=70, line_dash="dash", line_color="red", opacity=0.5, row=3, col=1)
+        fig.add_hline(y=30, line_dash="dash", line_color="green", opacity=0.5, row=3, col=1)
+
+        add(go.Bar(name='Histogram'), 4, x='x', y='MACDh_12_26_9', marker_color='macd_colors')
+        add(go.Scatter(name='MACD', line=dict(color='#4472C4')), 4, x='x', y='MACD_12_26_9')
+        add(go.Scatter(name='Signal', line=dict(color='#ED7D31', dash='dot')), 4, x='x', y='MACDs_12_26_9')
+
+        fig.update_layout(
+            height=chart_height,
+            showlegend=True, template="plotly_dark",
+            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+            xaxis_rangeslider_visible=False, margin=dict(l=30, r=30, t=30, b=30)
+        )
+        spec = fig.to_dict()
+        template = (spec['layout'], spec['data'], slots)
+
+    with _templates_lock:
+        _templates[key] = template
+        while len(_templates) > _TEMPLATE_CACHE_SIZE:
+            _templates.popitem(last=False)
+    return template
+
+
+def _iso_times(index: pd.DatetimeIndex) -> np.ndarray:
+    """Timestamps as the ISO strings plotly would serialize them to, so the figure needs no conversion."""
+    return np.array([ts.isoformat() for ts in index], dtype=object)
+
+
+def _prices(signals: pd.DataFrame):
+    return signals['Price'].to_numpy() if 'Price' in signals else None
+
+
+@perf.traced('charts.build_figure')
+def build_figure(df_chart: pd.DataFrame, buy_signals: pd.DataFrame, sell_signals: pd.DataFrame,
+                 chart_type: str, chart_height: int, max_points: int = CHART_MAX_POINTS, overlays=(),
+                 uirevision=None, source=None):
+    """
+    Builds the 4-row price/volume/RSI/MACD figure for the chart window; `overlays` are extra price-pane columns.
+    The memoized template gets this window's arrays, so a refresh only pays for the data. A fixed
+    `uirevision` keeps the user's zoom and legend state across refreshes of the same chart;
+    `source` is the frame the window was cut from, which lets chart_columns reuse its arrays.
+    """
+    import plotly.graph_objects as go
+
+    layout, traces, slots = _figure_template(chart_type, chart_height, tuple(overlays))
+    # Only markers inside the window are sent; earlier ones would also stretch the x axis.
+    window_start, window_end = df_chart.index[0], df_chart.index[-1]
+    buy_signals = buy_signals.loc[window_start:window_end] if not buy_signals.empty else buy_signals
+    sell_signals = sell_signals.loc[window_start:window_end] if not sell_signals.empty else sell_signals
+    values = {
+        **chart_columns(df_chart, max_points, overlays, source),
+        'buy_x': _iso_times(buy_signals.index), 'buy_y': _prices(buy_signals),
+        'sell_x': _iso_times(sell_signals.index), 'sell_y': _prices(sell_signals),
+    }
+
+    data = []
+    for trace, slot in zip(traces, slots):
+        trace = dict(trace)
+        for attribute, column in slot.items():
+            if attribute == 'marker_color':
+                trace['marker'] = {**trace.get('marker', {}), 'color': values[column]}
+            elif values[column] is not None:
+                trace[attribute] = values[column]
+        data.append(trace)
+    if uirevision is not None:
+        layout = {**layout, 'uirevision': uirevision}
+    # The template was validated when it was built and the arrays are plain numbers and strings.
+    return go.Figure(data=data, layout=layout, _validate=False)
@@ -0,0 +1,87 @@
+# trading_dashboard/compact.py
+
+from datetime import date
+
+import pandas as pd
+import numpy as np
+
+MARKET_TZ = 'America/New_York'
+NS_PER_MINUTE = 60 * 1_000_000_000
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+INDICATOR_COLUMNS = ['VWAP', 'EMA_50', 'MACD_12_26_9', 'MACDs_12_26_9', 'MACDh_12_26_9', 'RSI']
+
+
+class CompactBars:
+    """
+    Bars in contiguous compact arrays: int64 epoch-minute timestamps, float32 prices and
+    indicators, uint32 volume (about half the size of the float64 DataFrame it replaces).
+    Slices by time or day are views, so handing them out never copies the data.
+    """
+
+    def __init__(self, minutes: np.ndarray, columns: dict, tz: str = MARKET_TZ):
+        self.minutes = minutes
+        self.columns = columns
+        self.tz = tz
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'CompactBars':
+        index = df.index if df.index.tz is not None else df.index.tz_localize(MARKET_TZ)
+        minutes = index.tz_convert('UTC').asi8 // NS_PER_MINUTE
+        columns = {}
+        for column in PRICE_COLUMNS + INDICATOR_COLUMNS:
+            if column in df:
+                columns[column] = np.ascontiguousarray(df[column].to_numpy(dtype=np.float32))
+        if 'Volume' in df:
+            volume = np.clip(np.nan_to_num(df['Volume'].to_numpy(dtype=np.float64)), 0, np.iinfo(np.uint32).max)
+            columns['Volume'] = volume.astype(np.uint32)
+        minutes = np.ascontiguousarray(minutes, dtype=np.int64)
+        # Instances are shared between sessions, so nobody may write through a view.
+        for values in (minutes, *columns.values()):
+            values.flags.writeable = False
+        return cls(minutes, columns, str(index.tz))
+
+    def __len__(self) -> int:
+        return len(self.minutes)
+
+    @property
+    def empty(self) -> bool:
+        return len(self.minutes) == 0
+
+    @property
+    def nbytes(self) -> int:
+        return self.minutes.nbytes + sum(values.nbytes for values in self.columns.values())
+
+    @property
+    def index(self) -> pd.DatetimeIndex:
+        return pd.DatetimeIndex((self.minutes * NS_PER_MINUTE).astype('datetime64[ns]')) \
+            .tz_localize('UTC').tz_convert(self.tz)
+
+    def _minute(self, timestamp) -> int:
+        ts = pd.Timestamp(timestamp)
+        ts = ts.tz_localize(self.tz) if ts.tz is None else ts
+        return ts.value // NS_PER_MINUTE
+
+    def iloc(self, start: int, stop: int) -> 'CompactBars':
+        """Positional slice; every array in the result is a view."""
+        return CompactBars(self.minutes[start:stop], {name: values[start:stop] for name, values in self.columns.items()},
+                           self.tz)
+
+    def slice_time(self, start=None, end=None) -> 'CompactBars':
+        """Bars with start <= timestamp <= end (either bound may be None), as views."""
+        lo = 0 if start is None else int(np.searchsorted(self.minutes, self._minute(start), side='left'))
+        hi = len(self) if end is None else int(np.searchsorted(self.minutes, self._minute(end), side='right'))
+        return self.iloc(lo, hi)
+
+    def day(self, trading_date: date) -> 'CompactBars':
+        """Bars of one trading date (market time), as views."""
+        start = pd.Timestamp(trading_date).tz_localize(self.tz)
+        return self.slice_time(start, start + pd.Timedelta(days=1) - pd.Timedelta(minutes=1))
+
+    def to_frame(self, dtype=None) -> pd.DataFrame:
+        """
+        DataFrame with the usual column names. With dtype=None the columns wrap the compact
+        arrays without copying; pass dtype=np.float64 for full-precision copies.
+        """
+        data = {name: values if dtype is None else values.astype(dtype) for name, values in self.columns.items()}
+        return pd.DataFrame(data, index=self.index, copy=False)
@@ -0,0 +1,185 @@
+# trading_dashboard/fetch_pipeline.py
+
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+
+import pandas as pd
+
+import perf
+from bar_store import fetch_bars, get_bar_store
+from incremental import get_engine
+from resample import stitch, interval_to_timedelta
+
+# (interval, period, display name) for each dashboard timeframe
+TIMEFRAMES = (
+    ("1m", "7d", "1-minute"),
+    ("5m", "60d", "5-minute"),
+    ("15m", "60d", "15-minute"),
+)
+
+FetchResult = namedtuple('FetchResult', ['symbol', 'interval', 'name', 'df', 'error'])
+
+
+class _ThrottledClient:
+    """Wraps a yfinance-style client so history() calls share a global request cap and timeout."""
+
+    def __init__(self, client, semaphore: threading.Semaphore, timeout: float):
+        self._client = client
+        self._semaphore = semaphore
+        self._timeout = timeout
+        self.ticker = client.ticker
+
+    def history(self, **kwargs):
+        with self._semaphore, perf.span('fetch.yfinance') as s:
+            df = self._client.history(timeout=self._timeout, **kwargs)
+            s.set(rows=len(df))
+            return df
+
+
+def _fetch_raw(client, symbol: str, period: str, interval: str) -> pd.DataFrame:
+    try:
+        return fetch_bars(client, symbol, period, interval, store=get_bar_store())
+    except OSError:
+        # Local store not writable; fall back to a full download.
+        return fetch_bars(client, symbol, period, interval)
+
+
+def fetch_timeframe(client, symbol: str, period: str, interval: str) -> pd.DataFrame:
+    """Fetches one timeframe (delta-fetching through the bar store) and returns it with indicators."""
+    df = _fetch_raw(client, symbol, period, interval)
+    if df.empty:
+        return pd.DataFrame()
+    return get_engine(symbol, interval).update(df)
+
+
+def _history_reaches(symbol: str, interval: str, since: pd.Timestamp) -> bool:
+    """True when the stored bars for `interval` already extend into the window starting at `since`."""
+    try:
+        last_ts = get_bar_store().last_timestamp(symbol, interval)
+    except OSError:
+        return False
+    return last_ts is not None and last_ts >= since
+
+
+def fetch_derived_timeframes(client, symbol: str, base, derived) -> list:
+    """
+    Fetches the base timeframe once and builds each derived timeframe from it by resampling,
+    stitched onto the stored history for the older part. Returns one FetchResult per timeframe.
+    `base` is an (interval, period, name) tuple and `derived` a list of them.
+    """
+    base_interval, base_period, base_name = base
+    raw = _fetch_raw(client, symbol, base_period, base_interval)
+    results = [FetchResult(symbol, base_interval, base_name,
+                           pd.DataFrame() if raw.empty else get_engine(symbol, base_interval).update(raw), None)]
+
+    store = get_bar_store()
+    for interval, period, name in derived:
+        if raw.empty:
+            results.append(FetchResult(symbol, interval, name, pd.DataFrame(), None))
+            continue
+        history = store.read_recent(symbol, interval, period)
+        bars = stitch(history, raw, interval)
+        # Only the last stored bucket (possibly still forming when written) and newer ones change.
+        last_stored = history.index[-1] if not history.empty else raw.index[0]
+        store.write(symbol, interval, bars.loc[last_stored:])
+        results.append(FetchResult(symbol, interval, name, get_engine(symbol, interval).update(bars), None))
+    return results
+
+
+def iter_fetch(symbols, timeframes=TIMEFRAMES, max_workers: int = 8, max_requests: int = 4,
+               timeout: float = 10, deadline: float = None, client_factory=None, derive: bool = True):
+    """
+    Fetches every (symbol, timeframe) pair on a bounded thread pool and yields a FetchResult
+    as each one finishes. At most `max_requests` network calls are in flight at once, each
+    with a `timeout`; pairs still unfinished after `deadline` seconds are yielded as errors.
+
+    With `derive`, the first timeframe is the base: every other timeframe whose stored history
+    already overlaps the base window is resampled from the base bars instead of being downloaded.
+    `client_factory` defaults to yfinance.Ticker, imported on first use as it is slow to load.
+    """
+    if client_factory is None:
+        with perf.startup_phase('import.yfinance'):
+            import yfinance as yf
+        client_factory = yf.Ticker
+    semaphore = threading.BoundedSemaphore(max_requests)
+
+    def client_for(symbol):
+        return _ThrottledClient(client_factory(symbol), semaphore, timeout)
+
+    def run(symbol, interval, period, name):
+        return [FetchResult(symbol, interval, name, fetch_timeframe(client_for(symbol), symbol, period, interval), None)]
+
+    def run_derived(symbol, base, derived):
+        return fetch_derived_timeframes(client_for(symbol), symbol, base, derived)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch")
+    futures = {}
+    try:
+        for symbol in symbols:
+            remaining = list(timeframes)
+            if derive and len(timeframes) > 1:
+                base = timeframes[0]
+                base_start = pd.Timestamp.now(tz='America/New_York') - pd.Timedelta(base[1])
+                covered = [tf for tf in timeframes[1:]
+                           if interval_to_timedelta(tf[0]) > interval_to_timedelta(base[0])
+                           and _history_reaches(symbol, tf[0], base_start)]
+                remaining = [tf for tf in timeframes if tf is not base and tf not in covered]
+                futures[executor.submit(run_derived, symbol, base, covered)] = [(symbol,) + base] + \
+                    [(symbol,) + tf for tf in covered]
+            for interval, period, name in remaining:
+                futures[executor.submit(run, symbol, interval, period, name)] = [(symbol, interval, period, name)]
+
+        try:
+            for future in as_completed(futures, timeout=deadline):
+                keys = futures.pop(future)
+                try:
+                    yield from future.result()
+                except Exception as e:
+                    for symbol, interval, period, name in keys:
+                        yield FetchResult(symbol, interval, name, pd.DataFrame(), e)
+        except FuturesTimeout:
+            for future, keys in futures.items():
+                future.cancel()
+                for symbol, interval, period, name in keys:
+                    yield FetchResult(symbol, interval, name, pd.DataFrame(),
+                                      TimeoutError(f"no response within {deadline}s"))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def fetch_all_timeframes(symbol: str, **kwargs):
+    """
+    Fetches the dashboard timeframes for one symbol. Returns (df_1m, df_5m, df_15m, messages),
+    where messages are (level, text) pairs for the caller to show ('error' or 'warning').
+    """
+    frames, messages = {}, []
+    for result in iter_fetch([symbol], **kwargs):
+        if result.error is not None:
+            messages.append(('error', f"Failed to get {result.name} data: {result.error}"))
+        elif result.df.empty:
+            messages.append(('warning', f"No data returned for {result.name} timeframe. "
+                                        f"The API may have limitations for the requested period."))
+        frames[result.interval] = result.df
+    return frames["1m"], frames["5m"], frames["15m"], messages
+
+
+def load_stored_timeframes(symbol: str, timeframes=TIMEFRAMES):
+    """
+    The dashboard timeframes for one symbol from the local bar store only, with no network
+    access: the most recent on-disk snapshot, shown while a fresh fetch runs. Returns
+    (df_1m, df_5m, df_15m, messages) like fetch_all_timeframes, or None if a timeframe has no
+    stored bars. The engines are primed, so the following fetch only processes newer bars.
+    """
+    store = get_bar_store()
+    frames = []
+    for interval, period, name in timeframes:
+        try:
+            last_ts = store.last_timestamp(symbol, interval)
+        except OSError:
+            return None
+        if last_ts is None:
+            return None
+        raw = store.read_recent(symbol, interval, period)
+        frames.append(get_engine(symbol, interval).update(raw))
+    return (*frames, [])
@@ -0,0 +1,278 @@
+# trading_dashboard/incremental.py
+
+import threading
+
+import pandas as pd
+import numpy as np
+
+import perf
+from bar_store import OHLCV_COLUMNS
+from indicators import session_keys, segmented_cumsum
+
+EMA_SPANS = {'ema_50': 50, 'ema_12': 12, 'ema_26': 26}
+SIGNAL_SPAN = 9
+COLUMNS = OHLCV_COLUMNS + ['VWAP', 'EMA_50', 'MACD_12_26_9', 'MACDs_12_26_9', 'MACDh_12_26_9', 'RSI']
+
+# Chunks up to this many bars run the EMA recurrences as plain Python loops; longer ones use pandas' ewm.
+_LOOP_MAX = 64
+_INITIAL_CAPACITY = 1024
+
+
+def _ema(values: np.ndarray, period: int, prev: float) -> np.ndarray:
+    """EMA identical to compute_indicators' calculate_ema, continued from `prev` (NaN: no history)."""
+    alpha = 2 / (period + 1)
+    if len(values) > _LOOP_MAX:
+        # With adjust=False the recursion only depends on the previous output, so prepending it
+        # continues the exact same series.
+        if np.isnan(prev):
+            return pd.Series(values).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+        return pd.Series(np.r_[prev, values]).ewm(alpha=alpha, adjust=False).mean().to_numpy()[1:]
+    out = np.empty(len(values))
+    beta = 1 - alpha
+    for i, x in enumerate(values.tolist()):
+        # A NaN input leaves the EMA where it was; it starts at the first valid value.
+        if x == x:
+            prev = x if prev != prev else (beta * prev + alpha * x) / (beta + alpha)
+        out[i] = prev
+    return out
+
+
+class IncrementalIndicators:
+    """
+    Running indicator state for one ticker/timeframe.
+    Produces the same columns as indicators.compute_indicators (for the OHLCV input columns),
+    but each update only processes bars newer than the last one seen (the last bar may be
+    revised in place, as yfinance keeps updating the in-progress candle). The running state
+    is a handful of scalars; output rows are appended to a growable NumPy buffer and `frame`
+    is a DataFrame view over it, rebuilt only after the buffer changes.
+    """
+
+    def __init__(self, rsi_period: int = 14, vwap_anchor: str = 'session'):
+        self.rsi_period = rsi_period
+        self.vwap_anchor = vwap_anchor
+        self._lock = threading.RLock()
+        self.reset()
+
+    @property
+    def last_timestamp(self):
+        return None if self._state is None else pd.Timestamp(self._state['last_ts'], tz='UTC').tz_convert(self._tz)
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """
+        The indicator rows so far: a view over the buffer, so copy it before modifying it. A
+        revised last bar is rewritten in place, so frames handed out earlier see the revision.
+        """
+        with self._lock:
+            if self._frame is None:
+                if self._n == 0:
+                    self._frame = pd.DataFrame()
+                else:
+                    index = pd.DatetimeIndex(self._ts[:self._n].view('datetime64[ns]'))
+                    self._frame = pd.DataFrame(self._values[:self._n], index=index.tz_localize('UTC').tz_convert(self._tz),
+                                               columns=COLUMNS, copy=False)
+            return self._frame
+
+    def reset(self):
+        with self._lock:
+            self._allocate(_INITIAL_CAPACITY)
+            self._tz = None
+            self._state = None
+            self._state_before_last = None
+            self._last_row_kept = False
+
+    def _allocate(self, capacity: int):
+        # Fresh buffers: frames handed out earlier keep viewing the old ones.
+        self._ts = np.empty(capacity, dtype=np.int64)
+        self._values = np.empty((capacity, len(COLUMNS)))
+        self._n = 0
+        self._frame = None
+
+    def drain(self) -> pd.DataFrame:
+        """
+        Returns the indicator rows produced so far and forgets them while keeping the running
+        state, so a long history can be fed chunk by chunk in bounded memory. Bars fed after a
+        drain must be new ones: the drained last bar can no longer be revised.
+        """
+        with self._lock:
+            frame = self.frame
+            self._allocate(_INITIAL_CAPACITY)
+            self._last_row_kept = False
+            return frame
+
+    def trim(self, start) -> pd.DataFrame:
+        """Forgets indicator rows before `start` (a timestamp), keeping the running state, and returns the frame."""
+        with self._lock:
+            first = int(np.searchsorted(self._ts[:self._n], pd.Timestamp(start).value))
+            if first > 0:
+                # Copied into a new buffer, so the dropped rows' memory is released.
+                ts, values, n = self._ts[first:self._n], self._values[first:self._n], self._n - first
+                self._allocate(max(_INITIAL_CAPACITY, 2 * n))
+                self._ts[:n], self._values[:n], self._n = ts, values, n
+                self._last_row_kept = self._last_row_kept and n > 0
+            return self.frame
+
+    def update(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Feeds raw OHLCV bars (any overlap with earlier calls is skipped) and returns the full indicator frame."""
+        if df is None or df.empty:
+            return self.frame
+        with self._lock, perf.span('indicators.incremental', rows=len(df)):
+            return self._update(df)
+
+    def _update(self, df: pd.DataFrame) -> pd.DataFrame:
+        ts = df.index.tz_convert('UTC').asi8 if df.index.tz is not None else df.index.asi8
+        start = 0
+        if self._state is not None:
+            last_ts = self._state['last_ts']
+            start = int(np.searchsorted(ts, last_ts))
+            if start < len(ts) and ts[start] == last_ts:
+                # The last bar was revised: roll back to the state before it and replay it.
+                self._rollback_last_bar()
+            if start == len(ts):
+                return self.frame
+        else:
+            self._tz = df.index.tz or 'UTC'
+
+        bars = np.column_stack([df[column].to_numpy(dtype=np.float64)[start:] for column in OHLCV_COLUMNS])
+        ts = ts[start:]
+        index = df.index[start:] if len(ts) > 1 else None
+        self._state_before_last = None
+        if len(ts) > 1:
+            self._apply(ts[:-1], bars[:-1], index[:-1])
+        self._state_before_last = self._state
+        self._apply(ts[-1:], bars[-1:], None if index is None else index[-1:])
+        return self.frame
+
+    def _rollback_last_bar(self):
+        if self._last_row_kept:
+            self._n -= 1
+            self._frame = None
+        self._state = self._state_before_last
+        self._state_before_last = None
+
+    def _session_keys(self, ts: np.ndarray, index) -> np.ndarray:
+        """VWAP session keys of the bars; the pandas calendar work only runs when a new session starts."""
+        state = self._state
+        if state is not None and ts[-1] < state['session_end']:
+            return np.full(len(ts), state['session_key'])
+        if index is None:
+            index = pd.DatetimeIndex(ts.view('datetime64[ns]')).tz_localize('UTC').tz_convert(self._tz)
+        return session_keys(index, self.vwap_anchor)
+
+    def _session_end(self, key: int) -> int:
+        """UTC epoch ns at which the session (or week) starting at `key` ends."""
+        # Week keys are Mondays found by subtracting whole days, so they can be an hour off midnight.
+        local_start = (pd.Timestamp(key, tz='UTC').tz_convert(self._tz).tz_localize(None) + pd.Timedelta(hours=12)).normalize()
+        days = 7 if self.vwap_anchor == 'week' else 1
+        return (local_start + pd.Timedelta(days=days)).tz_localize(self._tz).value
+
+    def _apply(self, ts: np.ndarray, bars: np.ndarray, index):
+        """Extends the running state with a chunk of new bars and appends the complete rows."""
+        state = self._state or {}
+        k = len(ts)
+        open_, high, low, close, volume = bars.T
+        out = np.empty((k, len(COLUMNS)))
+        out[:, :5] = bars
+
+        # VWAP: per-session cumulative sums, continuing the running ones while still in the same session
+        keys = self._session_keys(ts, index)
+        pv = (high + low + close) / 3 * volume
+        if k == 1 or keys[0] == keys[-1]:
+            cum_pv, cum_v = np.cumsum(pv), np.cumsum(volume)
+        else:
+            cum_pv, cum_v = segmented_cumsum(pv, keys), segmented_cumsum(volume, keys)
+        if state.get('session_key') == keys[0]:
+            same_session = keys == keys[0]
+            cum_pv[same_session] += state['cum_pv']
+            cum_v[same_session] += state['cum_v']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out[:, 5] = cum_pv / cum_v
+
+        # EMAs and MACD: each recursion continues from its last value
+        nan = np.nan
+        ema_50 = _ema(close, EMA_SPANS['ema_50'], state.get('ema_50', nan))
+        ema_12 = _ema(close, EMA_SPANS['ema_12'], state.get('ema_12', nan))
+        ema_26 = _ema(close, EMA_SPANS['ema_26'], state.get('ema_26', nan))
+        macd = ema_12 - ema_26
+        signal = _ema(macd, SIGNAL_SPAN, state.get('signal', nan))
+        out[:, 6], out[:, 7], out[:, 8], out[:, 9] = ema_50, macd, signal, macd - signal
+
+        # RSI: means over the carried gain/loss window plus the new deltas
+        delta = np.diff(close, prepend=state.get('last_close', nan))
+        gains = np.r_[state.get('gains', ()), np.where(delta > 0, delta, 0)]
+        losses = np.r_[state.get('losses', ()), np.where(delta < 0, -delta, 0)]
+        period = self.rsi_period
+        rsi = np.full(k, nan)
+        if len(gains) >= period:
+            windows = len(gains) - period + 1
+            avg_gain = np.lib.stride_tricks.sliding_window_view(gains, period).sum(axis=1)[-k:] / period
+            avg_loss = np.lib.stride_tricks.sliding_window_view(losses, period).sum(axis=1)[-k:] / period
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rsi[-min(k, windows):] = (100 - 100 / (1 + avg_gain / avg_loss))[-min(k, windows):]
+        out[:, 10] = rsi
+
+        keep = period - 1
+        self._state = {
+            'last_ts': int(ts[-1]),
+            'session_key': int(keys[-1]),
+            'session_end': state['session_end'] if state.get('session_key') == keys[-1]
+            else self._session_end(int(keys[-1])),
+            'cum_pv': float(cum_pv[-1]),
+            'cum_v': float(cum_v[-1]),
+            'ema_50': float(ema_50[-1]),
+            'ema_12': float(ema_12[-1]),
+            'ema_26': float(ema_26[-1]),
+            'signal': float(signal[-1]),
+            'last_close': float(close[-1]),
+            'gains': gains[-keep:] if keep else gains[:0],
+            'losses': losses[-keep:] if keep else losses[:0],
+        }
+
+        # Like compute_indicators' dropna: only complete rows are kept.
+        complete = ~np.isnan(out).any(axis=1)
+        self._last_row_kept = bool(complete[-1])
+        if not complete.all():
+            out, ts = out[complete], ts[complete]
+        if len(ts):
+            self._append(ts, out)
+
+    def _append(self, ts: np.ndarray, rows: np.ndarray):
+        n, end = self._n, self._n + len(ts)
+        if end > len(self._ts):
+            # Grown by doubling, so appending stays amortised O(1) per bar.
+            capacity = max(2 * len(self._ts), end)
+            old_ts, old_values = self._ts[:n], self._values[:n]
+            self._allocate(capacity)
+            self._ts[:n], self._values[:n] = old_ts, old_values
+        self._ts[n:end] = ts
+        self._values[n:end] = rows
+        self._n = end
+        self._frame = None
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(ticker_symbol: str, interval: str) -> IncrementalIndicators:
+    """Returns the process-wide incremental engine for a ticker/timeframe, creating it on first use."""
+    key = (ticker_symbol.upper(), interval)
+    with _engines_lock:
+        if key not in _engines:
+            _engines[key] = IncrementalIndicators()
+        return _engines[key]
+
+
+def ticker_engines(ticker_symbol: str) -> dict:
+    """The existing engines of a ticker, by interval (none are created)."""
+    symbol = ticker_symbol.upper()
+    with _engines_lock:
+        return {interval: engine for (key, interval), engine in _engines.items() if key == symbol}
+
+
+def drop_engines(ticker_symbol: str):
+    """Discards a ticker's engines; the next fetch starts them again from the bars it loads."""
+    symbol = ticker_symbol.upper()
+    with _engines_lock:
+        for key in [key for key in _engines if key[0] == symbol]:
+            del _engines[key]
@@ -2,12 +2,348 @@
 
 import pandas as pd
 import numpy as np
-import yfinance as yf
-import streamlit as st
-import pytz
 
+import perf
 
-def compute_indicators(df: pd.DataFrame) -> pd.DataFrame:
+
+def session_keys(index: pd.DatetimeIndex, anchor: str = 'session') -> np.ndarray:
+    """
+    One integer key per bar identifying its VWAP segment: the trading session (market-time date)
+    or, with anchor='week', the Monday of its week.
+    """
+    days = index.normalize()
+    if anchor == 'session':
+        return days.asi8
+    if anchor == 'week':
+        return (days - pd.to_timedelta(index.dayofweek, unit='D')).asi8
+    raise ValueError(f"Unknown VWAP anchor: {anchor}")
+
+
+def segmented_cumsum(values: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """
+    Cumulative sum along the first axis that restarts wherever the key changes, in one vectorized
+    pass. `values` may be 2-D (time x symbols) to segment many series sharing one time index.
+    """
+    n = len(values)
+    if n == 0:
+        return np.empty(values.shape)
+    is_start = np.empty(n, dtype=bool)
+    is_start[0] = True
+    np.not_equal(keys[1:], keys[:-1], out=is_start[1:])
+    segment_start = np.maximum.accumulate(np.where(is_start, np.arange(n), 0))
+    total = np.cumsum(values, axis=0)
+    return total - (total - values)[segment_start]
+
+
+def anchored_vwap(df: pd.DataFrame, anchor='session') -> pd.Series:
+    """
+    VWAP that resets at every session open (anchor='session'), every week (anchor='week'),
+    or accumulates from a given timestamp (anchor=pd.Timestamp; NaN before it).
+    """
+    high, low = df.get('high', df.get('High')), df.get('low', df.get('Low'))
+    close, volume = df.get('close', df.get('Close')), df.get('volume', df.get('Volume'))
+    typical_price = ((high + low + close) / 3).to_numpy(dtype=float)
+    volume = volume.to_numpy(dtype=float)
+
+    if isinstance(anchor, str):
+        keys = session_keys(df.index, anchor)
+    else:
+        # Bars before a custom anchor share key 0 and are masked out afterwards.
+        keys = (df.index >= pd.Timestamp(anchor)).astype(np.int64)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vwap = segmented_cumsum(typical_price * volume, keys) / segmented_cumsum(volume, keys)
+    if not isinstance(anchor, str):
+        vwap[keys == 0] = np.nan
+    return pd.Series(vwap, index=df.index)
+
+
+# ─── Kernels ─────────────────────────────────────────────────────────────────
+# Plain NumPy in, NumPy out, same length as the input with NaN through the warm-up.
+
+def ema(values: np.ndarray, span: int = None, alpha: float = None) -> np.ndarray:
+    """Recursive EMA seeded with the first value (pandas ewm(adjust=False)), in one compiled pass."""
+    alpha = 2 / (span + 1) if alpha is None else alpha
+    return pd.Series(values, dtype=float).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+
+
+# Running totals restart every this many windows, so rounding drift is bounded by the block.
+_ANCHOR_EVERY = 4096
+
+
+def _window_sums(values: np.ndarray, period: int) -> np.ndarray:
+    """
+    Sum of every full window (len - period + 1 of them) in O(n): differences of a running total
+    re-anchored every _ANCHOR_EVERY windows. A window holding a NaN sums to NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    missing = np.isnan(values)
+    if missing.any():
+        values = np.where(missing, 0.0, values)
+    out = np.empty(len(values) - period + 1)
+    for start in range(0, len(out), _ANCHOR_EVERY):
+        stop = min(start + _ANCHOR_EVERY, len(out))
+        totals = np.cumsum(values[start:stop + period - 1])
+        out[start] = totals[period - 1]
+        out[start + 1:stop] = totals[period:] - totals[:-period]
+    if missing.any():
+        out[_window_sums(missing, period) > 0] = np.nan
+    return out
+
+
+def sma(values: np.ndarray, period: int) -> np.ndarray:
+    """
+    Simple moving average from running totals (O(n)). A window of zeros after any values is
+    still exactly zero, as adding zeros leaves the total unchanged.
+    """
+    out = np.full(len(values), np.nan)
+    if len(values) >= period:
+        out[period - 1:] = _window_sums(values, period) / period
+    return out
+
+
+def rolling_std(values: np.ndarray, period: int, ddof: int = 0) -> np.ndarray:
+    """
+    Per-window standard deviation from running totals of the values and their squares (O(n)),
+    taken about the first value of each block of windows to limit cancellation. Unlike a
+    two-pass formula a flat window gives 0 only up to rounding (negative variances are clipped).
+    """
+    out = np.full(len(values), np.nan)
+    if len(values) > max(period - 1, ddof):
+        values = np.asarray(values, dtype=float)
+        for start in range(0, len(values) - period + 1, _ANCHOR_EVERY):
+            block = values[start:start + _ANCHOR_EVERY + period - 1]
+            finite = block[~np.isnan(block)]
+            centred = block - (finite[0] if len(finite) else 0.0)
+            sums = _window_sums(centred, period)
+            variance = (_window_sums(centred * centred, period) - sums * sums / period) / (period - ddof)
+            out[start + period - 1:start + period - 1 + len(sums)] = np.sqrt(np.maximum(variance, 0.0))
+    return out
+
+
+def wilder(values: np.ndarray, period: int) -> np.ndarray:
+    """Wilder's smoothing: the first `period` values averaged, then an EMA with alpha = 1/period."""
+    out = np.full(len(values), np.nan)
+    if len(values) >= period:
+        seeded = np.array(values[period - 1:], dtype=float)
+        seeded[0] = np.mean(values[:period])
+        out[period - 1:] = ema(seeded, alpha=1 / period)
+    return out
+
+
+def rsi(close: np.ndarray, period: int = 14, method: str = 'sma') -> np.ndarray:
+    """
+    RSI from simple (method='sma', the dashboard's original formula) or Wilder-smoothed
+    (method='wilder') average gains and losses. A window with no losses gives 100.
+    """
+    delta = np.diff(np.asarray(close, dtype=float), prepend=np.nan)
+    # fmax turns the leading NaN into a zero gain and loss, as the original .where(delta > 0, 0) did.
+    gain, loss = np.fmax(delta, 0.0), np.fmax(-delta, 0.0)
+    if method == 'sma':
+        avg_gain, avg_loss = sma(gain, period), sma(loss, period)
+    elif method == 'wilder':
+        # Wilder seeds with the first `period` real changes, so the leading placeholder is skipped.
+        avg_gain = np.concatenate([[np.nan], wilder(gain[1:], period)])
+        avg_loss = np.concatenate([[np.nan], wilder(loss[1:], period)])
+    else:
+        raise ValueError(f"Unknown RSI method: {method}")
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 - 100 / (1 + avg_gain / avg_loss)
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """Bar range extended to the previous close; the first bar uses its high - low."""
+    prev_close = np.concatenate([[np.nan], close[:-1]])
+    return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14) -> np.ndarray:
+    """Average true range with Wilder's smoothing."""
+    return wilder(true_range(high, low, close), period)
+
+
+def bollinger(close: np.ndarray, period: int = 20, k: float = 2.0):
+    """(lower, middle, upper) bands: SMA +/- k population standard deviations."""
+    mid = sma(close, period)
+    width = k * rolling_std(close, period)
+    return mid - width, mid, mid + width
+
+
+def vwap_bands(high: np.ndarray, low: np.ndarray, close: np.ndarray, volume: np.ndarray, keys: np.ndarray,
+               k: float = 1.0):
+    """
+    (vwap, lower, upper): VWAP +/- k volume-weighted standard deviations of the typical price, per
+    segment of `keys`. The variance is taken around each segment's first price rather than zero, so
+    sum(v*p^2)/sum(v) - vwap^2 does not cancel catastrophically at large prices.
+    """
+    typical_price = (high + low + close) / 3
+    if len(typical_price) == 0:
+        empty = np.empty(0)
+        return empty, empty, empty
+    is_start = np.concatenate([[True], keys[1:] != keys[:-1]])
+    shift = typical_price[np.maximum.accumulate(np.where(is_start, np.arange(len(keys)), 0))]
+    centred = typical_price - shift
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cum_volume = segmented_cumsum(volume, keys)
+        mean = segmented_cumsum(centred * volume, keys) / cum_volume
+        variance = segmented_cumsum(centred * centred * volume, keys) / cum_volume - mean * mean
+    std = np.sqrt(np.maximum(variance, 0.0))
+    vwap = mean + shift
+    return vwap, vwap - k * std, vwap + k * std
+
+
+# ─── Memoized indicator frame ────────────────────────────────────────────────
+
+class IndicatorFrame:
+    """
+    OHLCV arrays of one bar frame with every kernel result memoized by its parameters, so an
+    EMA span or RSI period is computed once however many indicators or parameter sets use it
+    (MACD 12/26 and an EMA_12 filter share one EMA_12).
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        def column(name):
+            return (df[name] if name in df else df[name.lower()]).to_numpy(dtype=float)
+        self.index = df.index
+        self.open, self.high, self.low = column('Open'), column('High'), column('Low')
+        self.close, self.volume = column('Close'), column('Volume')
+        self._memo = {}
+
+    def _cached(self, key, compute):
+        if key not in self._memo:
+            self._memo[key] = compute()
+        return self._memo[key]
+
+    def ema(self, span: int) -> np.ndarray:
+        return self._cached(('ema', span), lambda: ema(self.close, span))
+
+    def sma(self, period: int) -> np.ndarray:
+        return self._cached(('sma', period), lambda: sma(self.close, period))
+
+    def macd(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        """(MACD line, signal line, histogram); the line is shared by every signal length."""
+        line = self._cached(('macd', fast, slow), lambda: self.ema(fast) - self.ema(slow))
+        sig = self._cached(('macd_signal', fast, slow, signal), lambda: ema(line, signal))
+        return line, sig, line - sig
+
+    def rsi(self, period: int = 14, method: str = 'sma') -> np.ndarray:
+        return self._cached(('rsi', period, method), lambda: rsi(self.close, period, method))
+
+    def atr(self, period: int = 14) -> np.ndarray:
+        return self._cached(('atr', period), lambda: atr(self.high, self.low, self.close, period))
+
+    def bollinger(self, period: int = 20, k: float = 2.0):
+        return self._cached(('bollinger', period, k), lambda: bollinger(self.close, period, k))
+
+    def _keys(self, anchor):
+        return self._cached(('keys', anchor), lambda: session_keys(self.index, anchor))
+
+    def vwap(self, anchor: str = 'session') -> np.ndarray:
+        def compute():
+            typical_price = (self.high + self.low + self.close) / 3
+            keys = self._keys(anchor)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return segmented_cumsum(typical_price * self.volume, keys) / segmented_cumsum(self.volume, keys)
+        return self._cached(('vwap', anchor), compute)
+
+    def vwap_bands(self, k: float = 1.0, anchor: str = 'session'):
+        """(lower, upper) bands around the anchored VWAP."""
+        return self._cached(('vwap_bands', k, anchor), lambda: vwap_bands(
+            self.high, self.low, self.close, self.volume, self._keys(anchor), k)[1:])
+
+
+# ─── Registry ────────────────────────────────────────────────────────────────
+# name -> function(frame, **params) returning {column: array}; columns follow the pandas_ta names.
+# WARMUP[name](**params) is the number of bars before a value stops depending on older history.
+
+INDICATORS = {}
+WARMUP = {}
+
+
+def ema_warmup(span: int = None, alpha: float = None, tolerance: float = 1e-12) -> int:
+    """Bars after which a recursive average's seed weighs less than `tolerance`."""
+    alpha = 2 / (span + 1) if alpha is None else alpha
+    return int(np.ceil(np.log(tolerance) / np.log1p(-alpha))) if alpha < 1 else 0
+
+
+def register_indicator(name: str, warmup=lambda **params: 0):
+    """Decorator adding a column builder to INDICATORS (and its warm-up to WARMUP) under `name`."""
+    def decorate(func):
+        INDICATORS[name] = func
+        WARMUP[name] = warmup
+        return func
+    return decorate
+
+
+@register_indicator('ema', warmup=lambda span=50: ema_warmup(span))
+def _ema_columns(frame: IndicatorFrame, span: int = 50):
+    return {f'EMA_{span}': frame.ema(span)}
+
+
+@register_indicator('sma', warmup=lambda period=20: period - 1)
+def _sma_columns(frame: IndicatorFrame, period: int = 20):
+    return {f'SMA_{period}': frame.sma(period)}
+
+
+@register_indicator('macd', warmup=lambda fast=12, slow=26, signal=9: ema_warmup(max(fast, slow)) + ema_warmup(signal))
+def _macd_columns(frame: IndicatorFrame, fast: int = 12, slow: int = 26, signal: int = 9):
+    suffix = f'{fast}_{slow}_{signal}'
+    return dict(zip((f'MACD_{suffix}', f'MACDs_{suffix}', f'MACDh_{suffix}'), frame.macd(fast, slow, signal)))
+
+
+@register_indicator('rsi', warmup=lambda period=14, method='wilder':
+                    period + (ema_warmup(alpha=1 / period) if method == 'wilder' else 0))
+def _rsi_columns(frame: IndicatorFrame, period: int = 14, method: str = 'wilder'):
+    name = f'RSI_{period}' if method == 'wilder' else f'RSI_{method.upper()}_{period}'
+    return {name: frame.rsi(period, method)}
+
+
+@register_indicator('atr', warmup=lambda period=14: period + ema_warmup(alpha=1 / period))
+def _atr_columns(frame: IndicatorFrame, period: int = 14):
+    return {f'ATRr_{period}': frame.atr(period)}
+
+
+@register_indicator('bbands', warmup=lambda period=20, k=2.0: period - 1)
+def _bollinger_columns(frame: IndicatorFrame, period: int = 20, k: float = 2.0):
+    suffix = f'{period}_{k:g}'
+    return dict(zip((f'BBL_{suffix}', f'BBM_{suffix}', f'BBU_{suffix}'), frame.bollinger(period, k)))
+
+
+# VWAP restarts every segment, so it needs no bars before the segment that contains the window.
+@register_indicator('vwap')
+def _vwap_columns(frame: IndicatorFrame, anchor: str = 'session', k: float = None):
+    suffix = '' if anchor == 'session' else f'_{anchor[0].upper()}'
+    columns = {f'VWAP{suffix}': frame.vwap(anchor)}
+    if k is not None:
+        columns[f'VWAPL{suffix}_{k:g}'], columns[f'VWAPU{suffix}_{k:g}'] = frame.vwap_bands(k, anchor)
+    return columns
+
+
+def warmup_bars(name: str, params: dict = None) -> int:
+    """Bars of history an indicator needs before the first bar it is asked for."""
+    if name not in INDICATORS:
+        raise ValueError(f"Unknown indicator: {name}")
+    return WARMUP[name](**(params or {}))
+
+
+def compute_indicator_set(df: pd.DataFrame, specs) -> pd.DataFrame:
+    """
+    Indicator columns for a bar frame, e.g. specs=['rsi', ('ema', {'span': 21}), ('bbands', {'k': 2.5})].
+    Shared intermediates are computed once across the whole set. Warm-up rows are kept (NaN).
+    """
+    frame = IndicatorFrame(df)
+    columns = {}
+    for spec in specs:
+        name, params = (spec, {}) if isinstance(spec, str) else spec
+        if name not in INDICATORS:
+            raise ValueError(f"Unknown indicator: {name}")
+        columns.update(INDICATORS[name](frame, **params))
+    return pd.DataFrame(columns, index=df.index)
+
+
+@perf.traced('indicators.compute')
+def compute_indicators(df: pd.DataFrame, vwap_anchor='session', rsi_period: int = 14,
+                       rsi_method: str = 'sma') -> pd.DataFrame:
     """Computes technical indicators for a given dataframe."""
     if df is None or df.empty:
         return pd.DataFrame()
@@ -17,77 +353,34 @@ def compute_indicators(df: pd.DataFrame) -> pd.DataFrame:
               inplace=True, errors='ignore')
 
     try:
-        # Calculate VWAP manually (Volume Weighted Average Price)
-        typical_price = (df['high'] + df['low'] + df['close']) / 3
-        df['VWAP'] = (typical_price * df['volume']).cumsum() / df['volume'].cumsum()
-        
-        # Calculate EMA manually
-        def calculate_ema(prices, period):
-            alpha = 2 / (period + 1)
-            ema = prices.ewm(alpha=alpha, adjust=False).mean()
-            return ema
-        
-        df['EMA_50'] = calculate_ema(df['close'], 50)
-        
-        # Calculate MACD manually
-        ema_12 = calculate_ema(df['close'], 12)
-        ema_26 = calculate_ema(df['close'], 26)
-        df['MACD_12_26_9'] = ema_12 - ema_26
-        df['MACDs_12_26_9'] = calculate_ema(df['MACD_12_26_9'], 9)
-        df['MACDh_12_26_9'] = df['MACD_12_26_9'] - df['MACDs_12_26_9']
-        
-        # Calculate RSI manually
-        def calculate_rsi(prices, period=14):
-            delta = prices.diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-            rs = gain / loss
-            rsi = 100 - (100 / (1 + rs))
-            return rsi
-        
-        df['RSI'] = calculate_rsi(df['close'])
+        frame = IndicatorFrame(df)
+        # VWAP (Volume Weighted Average Price), reset at each session open
+        df['VWAP'] = anchored_vwap(df, vwap_anchor)
+        df['EMA_50'] = frame.ema(50)
+        df['MACD_12_26_9'], df['MACDs_12_26_9'], df['MACDh_12_26_9'] = frame.macd(12, 26, 9)
+        df['RSI'] = frame.rsi(rsi_period, rsi_method)
 
         df.rename(columns={"open": "Open", "high": "High", "low": "Low", "close": "Close", "volume": "Volume"},
                   inplace=True, errors='ignore')
         df.dropna(inplace=True)
     except Exception as e:
+        import streamlit as st  # only the dashboard reaches this; CLI users need not load streamlit
         st.error(f"Error in indicator calculation: {e}")
         return pd.DataFrame()
     return df
 
 
-def _fetch_and_process(ticker: yf.Ticker, period: str, interval: str, name: str) -> pd.DataFrame:
-    """Helper function to fetch, process, and handle errors for one timeframe."""
-    try:
-        df = ticker.history(period=period, interval=interval, auto_adjust=True)
-        if df.empty:
-            st.warning(f"No data returned for {name} timeframe. The API may have limitations for the requested period.")
-            return pd.DataFrame()
-
-        if df.index.tz is None:
-            df = df.tz_localize('America/New_York', ambiguous='infer')
-        else:
-            df = df.tz_convert('America/New_York')
-
-        return compute_indicators(df)
-    except Exception as e:
-        st.error(f"Failed to get {name} data: {e}")
-        return pd.DataFrame()
-
-
 def process_all_timeframes(ticker_symbol: str):
     """
-    Fetches and processes data for 1m, 5m, and 15m timeframes directly
-    using optimized historical periods for each.
+    Fetches and processes data for 1m, 5m, and 15m timeframes concurrently,
+    using optimized historical periods for each (7 days of 1m, 60 days of 5m/15m).
     """
-    ticker = yf.Ticker(ticker_symbol)
-
-    # 1. Fetch 1-minute data (limited to last 7 days by API)
-    df_1m = _fetch_and_process(ticker, period="7d", interval="1m", name="1-minute")
+    import streamlit as st
+    from fetch_pipeline import fetch_all_timeframes  # the fetch layer builds on this module
 
-    # 2. Fetch 5m & 15m data (can go back further, e.g., 60 days)
-    # This provides a long, stable history for calculating slow indicators like EMA(50).
-    df_5m = _fetch_and_process(ticker, period="60d", interval="5m", name="5-minute")
-    df_15m = _fetch_and_process(ticker, period="60d", interval="15m", name="15-minute")
+    df_1m, df_5m, df_15m, messages = fetch_all_timeframes(ticker_symbol)
+    # Streamlit elements can only be created from the script thread, so errors are reported here.
+    for level, text in messages:
+        getattr(st, level)(text)
 
     return df_1m, df_5m, df_15m
\ No newline at end of file
@@ -0,0 +1,84 @@
+# trading_dashboard/lazy.py
+
+import threading
+from collections import Counter
+
+import pandas as pd
+
+import perf
+from indicators import IndicatorFrame, INDICATORS, session_keys, warmup_bars
+
+
+def _spec(spec):
+    """(name, params) for a column name, a registry name, or a (name, params) pair."""
+    return (spec, {}) if isinstance(spec, str) else (spec[0], dict(spec[1]))
+
+
+class LazyFrame:
+    """
+    A bar frame whose indicator columns are nodes computed on first access and memoized.
+
+    Columns already in the frame (the dashboard set the fetch layer computes) are served as they
+    are. Any registry indicator (indicators.INDICATORS) is computed only when asked for, over the
+    requested window plus its warm-up, starting at a session open so anchored VWAPs are exact. A
+    node is recomputed only if a later request reaches further back than it covers, and all nodes
+    starting at the same bar share one IndicatorFrame, so e.g. every EMA span is computed once.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.index = df.index
+        self._nodes = {}
+        self._frames = {}
+        self._lock = threading.Lock()
+        self.counters = Counter()
+
+    def get(self, specs, start=None, end=None) -> pd.DataFrame:
+        """
+        Requested columns for the bars between start and end (inclusive, either may be None).
+        `specs` mixes frame column names ('VWAP') and registry specs ('rsi', ('ema', {'span': 21})).
+        """
+        first = 0 if start is None else int(self.index.searchsorted(start))
+        last = len(self.index) if end is None else int(self.index.searchsorted(end, side='right'))
+        columns = {}
+        for spec in specs:
+            name, params = _spec(spec)
+            if not params and name in self.df.columns:
+                columns[name] = self.df[name].to_numpy()[first:last]
+                continue
+            node_start, arrays = self._node(name, params, first)
+            for column, values in arrays.items():
+                columns[column] = values[first - node_start:last - node_start]
+        return pd.DataFrame(columns, index=self.index[first:last])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.counters, 'nodes': len(self._nodes), 'frames': len(self._frames)}
+
+    def _node(self, name: str, params: dict, first: int):
+        start = self._start_row(first, warmup_bars(name, params), params.get('anchor', 'session'))
+        key = (name, tuple(sorted(params.items())))
+        with self._lock:
+            node = self._nodes.get(key)
+            if node is not None and node[0] <= start:
+                self.counters['hits'] += 1
+                return node
+            self.counters['computed'] += 1
+            with perf.span('lazy.node', rows=len(self.index) - start, cache='miss'):
+                node = (start, INDICATORS[name](self._frame(start), **params))
+            self._nodes[key] = node
+            return node
+
+    def _start_row(self, first: int, warmup: int, anchor: str) -> int:
+        """First bar to compute from: `warmup` bars back, moved to the open of its VWAP segment."""
+        row = max(min(first, len(self.index) - 1) - warmup, 0)
+        if row == 0:
+            return 0
+        keys = session_keys(self.index[row:row + 1], anchor)
+        return int(self.index.searchsorted(pd.Timestamp(int(keys[0]), tz=self.index.tz)))
+
+    def _frame(self, start: int) -> IndicatorFrame:
+        """Shared kernels for nodes starting at `start` (caller holds the lock)."""
+        if start not in self._frames:
+            self._frames[start] = IndicatorFrame(self.df.iloc[start:])
+        return self._frames[start]
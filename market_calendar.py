@@ -0,0 +1,92 @@
+# trading_dashboard/market_calendar.py
+
+import os
+import functools
+from datetime import date, time, timedelta
+
+import pandas as pd
+import numpy as np
+
+import perf
+
+CALENDAR_CACHE_DIR = os.environ.get("TRADING_DASHBOARD_CALENDAR_CACHE", ".calendar_cache")
+MARKET_TZ = 'America/New_York'
+
+
+class TradingCalendar:
+    """
+    An exchange schedule loaded once: O(1) trading-day checks and the real open/close
+    for each session, including early closes.
+    """
+
+    def __init__(self, schedule: pd.DataFrame):
+        opens = schedule['market_open'].dt.tz_convert(MARKET_TZ)
+        closes = schedule['market_close'].dt.tz_convert(MARKET_TZ)
+        self.trading_days = np.array(schedule.index.date)
+        self._sessions = dict(zip(self.trading_days, zip(opens, closes)))
+        regular_close = closes.dt.time.mode().iloc[0] if len(closes) else time(16, 0)
+        self._early_closes = {d for d, (_, close) in self._sessions.items() if close.time() < regular_close}
+
+    @classmethod
+    def load(cls, start_date: date, end_date: date, name: str = 'NYSE', cache_dir: str = CALENDAR_CACHE_DIR):
+        """
+        Builds the calendar from the on-disk schedule if it covers the range, else from
+        pandas_market_calendars. The disk copy spans from the start year through the end of the
+        year after `end_date`, so later days keep hitting it; its 'covers' attribute records the
+        requested dates, as the first and last trading days need not be those dates.
+        """
+        path = os.path.join(cache_dir, f"{name}.pkl")
+        try:
+            schedule = pd.read_pickle(path)
+            covers_start, covers_end = schedule.attrs['covers']
+            if covers_start <= start_date and covers_end >= end_date:
+                return cls(schedule.loc[str(start_date):str(end_date)])
+        except (OSError, ValueError, IndexError, KeyError, TypeError):
+            pass
+
+        import pandas_market_calendars as mcal
+        first, last = date(start_date.year, 1, 1), date(end_date.year + 1, 12, 31)
+        schedule = mcal.get_calendar(name).schedule(start_date=first, end_date=last)
+        schedule.attrs['covers'] = (first, last)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            schedule.to_pickle(tmp_path)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass  # the disk copy only speeds up the next start
+        return cls(schedule.loc[str(start_date):str(end_date)])
+
+    def is_trading_day(self, trading_date: date) -> bool:
+        return trading_date in self._sessions
+
+    def is_early_close(self, trading_date: date) -> bool:
+        return trading_date in self._early_closes
+
+    def session_bounds(self, trading_date: date):
+        """(open, close) as tz-aware market-time timestamps, or None on a non-trading day."""
+        return self._sessions.get(trading_date)
+
+    def market_hours(self, trading_date: date):
+        """(open, close) as datetime.time in market time; regular hours on a non-trading day."""
+        bounds = self._sessions.get(trading_date)
+        if bounds is None:
+            return time(9, 30), time(16, 0)
+        return bounds[0].time(), bounds[1].time()
+
+    def trading_days_between(self, start_date: date, end_date: date) -> np.ndarray:
+        lo = np.searchsorted(self.trading_days, start_date, side='left')
+        hi = np.searchsorted(self.trading_days, end_date, side='right')
+        return self.trading_days[lo:hi]
+
+
+def market_today() -> date:
+    return pd.Timestamp.now(tz=MARKET_TZ).date()
+
+
+@functools.lru_cache(maxsize=4)
+def get_trading_calendar(today: date, name: str = 'NYSE') -> TradingCalendar:
+    """Calendar covering the year before `today` through the next month; memoized per day, persisted on disk."""
+    start = date(today.year - 1, today.month, 1)
+    with perf.startup_phase('calendar.load'):
+        return TradingCalendar.load(start, today + timedelta(days=31), name=name)
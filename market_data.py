@@ -0,0 +1,235 @@
+# trading_dashboard/market_data.py
+
+import threading
+import time
+from collections import namedtuple, Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import perf
+from compact import CompactBars
+from fetch_pipeline import fetch_all_timeframes, load_stored_timeframes
+from incremental import drop_engines
+from retention import RetentionPolicy, frame_bytes
+
+# frames: (df_1m, df_5m, df_15m), as CompactBars in compact mode; messages: (level, text) pairs from the fetch; fetched_at: time.time()
+# source: 'fetch', 'stream', or 'store' (bars read back from the local store while the first fetch runs)
+Snapshot = namedtuple('Snapshot', ['frames', 'messages', 'fetched_at', 'source'], defaults=('fetch',))
+
+
+def as_frames(snapshot: Snapshot) -> tuple:
+    """The snapshot's (df_1m, df_5m, df_15m); compact frames become DataFrames over the shared arrays."""
+    return tuple(frame.to_frame() if isinstance(frame, CompactBars) else frame for frame in snapshot.frames)
+
+
+class MarketDataService:
+    """
+    Process-wide market data cache shared by every Streamlit session.
+    A single background scheduler refreshes each subscribed ticker once per `refresh_interval`;
+    concurrent requests for the same ticker share one in-flight fetch. Sessions only read
+    snapshots. Tickers nobody has read for `idle_timeout` seconds are unsubscribed.
+    With `compact=True` snapshots hold read-only CompactBars instead of float64 DataFrames.
+    `stored_loader` reads a ticker's last stored bars without network access (None disables it).
+    `retention` trims every snapshot (and the ticker's engines) to its rolling windows and, with a
+    memory budget, evicts the least recently read tickers; they reload from the bar store.
+    """
+
+    def __init__(self, refresh_interval: float = 55, idle_timeout: float = 300, max_workers: int = 8,
+                 loader=fetch_all_timeframes, compact: bool = False, stored_loader=load_stored_timeframes,
+                 retention: RetentionPolicy = None):
+        self.refresh_interval = refresh_interval
+        self.idle_timeout = idle_timeout
+        self.compact = compact
+        self.retention = retention
+        self._loader = loader
+        self._stored_loader = stored_loader
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="market-data")
+        self._lock = threading.Lock()
+        self._snapshots = {}
+        self._inflight = {}
+        self._last_read = {}
+        self._counters = Counter()
+        self._stop = threading.Event()
+        self._scheduler = threading.Thread(target=self._run_scheduler, name="market-data-scheduler", daemon=True)
+        self._scheduler.start()
+
+    def get(self, ticker_symbol: str, timeout: float = None, stale_ok: bool = False) -> Snapshot:
+        """
+        Latest snapshot for a ticker (subscribing to it); blocks only when none exists yet.
+        With `stale_ok`, that first request is answered from the local bar store when it has
+        the ticker (source='store'), while the fetch continues in the background.
+        """
+        key = ticker_symbol.upper()
+        with perf.span('market_data.get', cache='hit') as s:
+            with self._lock:
+                self._last_read[key] = time.time()
+                snapshot = self._snapshots.get(key)
+                if snapshot is not None:
+                    self._counters['hits'] += 1
+                    if time.time() - snapshot.fetched_at > self.refresh_interval:
+                        self._counters['stale_reads'] += 1
+                    return snapshot
+                self._counters['misses'] += 1
+                future = None if stale_ok else self._submit(key)
+            s.set(cache='miss')
+            if future is None:
+                # Stored bars go into the engines before the fetch starts, so it continues from them.
+                snapshot = self._load_stored(key)
+                with self._lock:
+                    future = self._submit(key)
+                if snapshot is not None:
+                    return snapshot
+            return future.result(timeout=timeout)
+
+    def peek(self, ticker_symbol: str):
+        """The cached snapshot for a ticker, or None; never fetches and does not keep the ticker subscribed."""
+        with self._lock:
+            return self._snapshots.get(ticker_symbol.upper())
+
+    def tickers(self) -> list:
+        """Tickers that currently have a snapshot."""
+        with self._lock:
+            return sorted(self._snapshots)
+
+    def invalidate(self, ticker_symbol: str):
+        """Drops one ticker's snapshot and starts a refresh; other tickers are untouched."""
+        key = ticker_symbol.upper()
+        with self._lock:
+            self._snapshots.pop(key, None)
+            self._counters['invalidations'] += 1
+            self._submit(key)
+
+    def publish(self, ticker_symbol: str, frames) -> bool:
+        """
+        Replaces a subscribed ticker's frames with streamed ones, without fetching.
+        Returns False (and drops the frames) when nobody is subscribed to the ticker.
+        """
+        key = ticker_symbol.upper()
+        frames = self._retain(key, frames)
+        with self._lock:
+            if key not in self._last_read:
+                return False
+            self._snapshots[key] = Snapshot(frames, [], time.time(), 'stream')
+            self._counters['stream_updates'] += 1
+            self._enforce_budget(key)
+        return True
+
+    def stats(self) -> dict:
+        """Counters plus per-ticker snapshot age in seconds and bytes held, for sizing the refresh pool and budget."""
+        now = time.time()
+        with self._lock:
+            held = self._bytes_held()
+            return {
+                **self._counters,
+                'subscribed': len(self._last_read),
+                'in_flight': len(self._inflight),
+                'age_seconds': {key: round(now - snap.fetched_at, 1) for key, snap in self._snapshots.items()},
+                'bytes': held,
+                'total_bytes': sum(held.values()),
+                'budget_bytes': None if self.retention is None else self.retention.budget_bytes,
+            }
+
+    def close(self):
+        self._stop.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, key: str):
+        """Starts a refresh unless one is already running (caller holds the lock)."""
+        future = self._inflight.get(key)
+        if future is not None:
+            self._counters['deduplicated'] += 1
+            return future
+        future = self._executor.submit(self._refresh, key)
+        self._inflight[key] = future
+        return future
+
+    def _load_stored(self, key: str):
+        """Snapshot from the bar store, kept only if no fetched snapshot arrived meanwhile."""
+        if self._stored_loader is None:
+            return None
+        try:
+            with perf.startup_phase('market_data.stored_snapshot'), perf.span('market_data.stored'):
+                loaded = self._stored_loader(key)
+        except OSError:
+            return None
+        if loaded is None:
+            return None
+        *frames, messages = loaded
+        frames = self._retain(key, frames)
+        with self._lock:
+            snapshot = self._snapshots.setdefault(key, Snapshot(frames, messages, time.time(), 'store'))
+            self._counters['store_reads'] += snapshot.source == 'store'
+            self._enforce_budget(key)
+        return snapshot
+
+    def _refresh(self, key: str) -> Snapshot:
+        try:
+            with perf.startup_phase('market_data.first_fetch'), perf.span('market_data.refresh'):
+                df_1m, df_5m, df_15m, messages = self._loader(key)
+            frames = self._retain(key, (df_1m, df_5m, df_15m))
+            snapshot = Snapshot(frames, messages, time.time())
+            with self._lock:
+                current = self._snapshots.get(key)
+                if current is not None and current.source == 'store' and any(len(frame) == 0 for frame in frames):
+                    # Offline start: keep showing the stored bars, with the fetch errors.
+                    snapshot = current._replace(messages=messages, fetched_at=snapshot.fetched_at)
+                self._snapshots[key] = snapshot
+                self._counters['refreshes'] += 1
+                if messages:
+                    self._counters['refresh_errors'] += 1
+                self._enforce_budget(key)
+            return snapshot
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _retain(self, key: str, frames) -> tuple:
+        """Frames as they are kept in a snapshot: trimmed to the retention windows, compacted in compact mode."""
+        frames = tuple(frames)
+        if self.retention is not None:
+            frames = self.retention.apply(key, frames)
+        if self.compact:
+            frames = tuple(CompactBars.from_frame(frame) for frame in frames)
+        return frames
+
+    def _bytes_held(self) -> dict:
+        """Bytes per ticker, including engine frames a snapshot does not share (caller holds the lock)."""
+        if self.retention is None:
+            return {key: _snapshot_bytes(snap) for key, snap in self._snapshots.items()}
+        return {key: self.retention.ticker_bytes(key, snap.frames) for key, snap in self._snapshots.items()}
+
+    def _enforce_budget(self, keep: str):
+        """Evicts least recently read tickers until the budget holds; `keep` is never evicted (caller holds the lock)."""
+        if self.retention is None or self.retention.budget_bytes is None:
+            return
+        held = self._bytes_held()
+        total = sum(held.values())
+        for key in sorted(held, key=lambda k: self._last_read.get(k, 0)):
+            if total <= self.retention.budget_bytes:
+                break
+            if key == keep:
+                continue
+            total -= held[key]
+            self._evict(key)
+
+    def _evict(self, key: str, counter: str = 'evictions'):
+        """Drops a ticker from memory (caller holds the lock); its bars remain in the bar store."""
+        self._snapshots.pop(key, None)
+        self._last_read.pop(key, None)
+        drop_engines(key)
+        self._counters[counter] += 1
+
+    def _run_scheduler(self):
+        while not self._stop.wait(1.0):
+            now = time.time()
+            with self._lock:
+                for key, last_read in list(self._last_read.items()):
+                    if now - last_read > self.idle_timeout:
+                        self._evict(key, 'idle_evictions')
+                        continue
+                    snapshot = self._snapshots.get(key)
+                    if snapshot is not None and now - snapshot.fetched_at >= self.refresh_interval:
+                        self._submit(key)
+
+
+def _snapshot_bytes(snapshot: Snapshot) -> int:
+    return sum(frame_bytes(frame) for frame in snapshot.frames)
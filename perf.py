@@ -0,0 +1,291 @@
+# trading_dashboard/perf.py
+
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import namedtuple, Counter
+
+logger = logging.getLogger("trading_dashboard.perf")
+
+# One timed pipeline stage. rows: rows processed (None if not meaningful); cache: 'hit', 'miss' or None.
+Span = namedtuple('Span', ['name', 'start', 'seconds', 'rows', 'cache', 'thread'])
+
+ENABLED_BY_ENV = os.environ.get("TRADING_DASHBOARD_PERF") == "1"
+_enabled = ENABLED_BY_ENV
+_trace = contextvars.ContextVar('perf_trace', default=None)
+# Recording switched on for one context only (a Streamlit session's reruns), see begin_trace.
+_recording = contextvars.ContextVar('perf_recording', default=False)
+_active = contextvars.ContextVar('perf_active_span', default=None)
+_totals_lock = threading.Lock()
+_totals = {}
+# Reference point of the startup report: the first import of this module (the app imports it first).
+PROCESS_START = time.perf_counter()
+_startup = {}
+
+
+def enable(on: bool = True):
+    """Turns span recording on or off for the whole process."""
+    global _enabled
+    _enabled = on
+
+
+def is_enabled() -> bool:
+    """True when spans are recorded here: process-wide, or for the current context."""
+    return _enabled or _recording.get()
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, rows=None, cache=None):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class _ActiveSpan:
+    __slots__ = ('name', 'rows', 'cache', '_start', '_token')
+
+    def __init__(self, name, rows, cache):
+        self.name, self.rows, self.cache = name, rows, cache
+
+    def set(self, rows=None, cache=None):
+        if rows is not None:
+            self.rows = rows
+        if cache is not None:
+            self.cache = cache
+
+    def __enter__(self):
+        self._token = _active.set(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self._start
+        _active.reset(self._token)
+        _record(Span(self.name, self._start, seconds, self.rows, self.cache, threading.current_thread().name))
+        return False
+
+
+def span(name: str, rows: int = None, cache: str = None):
+    """
+    Context manager timing one stage. When recording is off this returns a shared no-op
+    object, so instrumented code pays one flag check.
+    """
+    if not (_enabled or _recording.get()):
+        return _NOOP
+    return _ActiveSpan(name, rows, cache)
+
+
+def mark_cache_miss():
+    """Marks the innermost open span as a cache miss; call it at the top of a cached function's body."""
+    active = _active.get()
+    if active is not None:
+        active.cache = 'miss'
+
+
+def traced(name: str, rows_arg: int = 0):
+    """Decorator timing every call as a span; rows are len() of positional argument `rows_arg`."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not (_enabled or _recording.get()):
+                return func(*args, **kwargs)
+            rows = len(args[rows_arg]) if rows_arg is not None and len(args) > rows_arg else None
+            with _ActiveSpan(name, rows, None):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _record(s: Span):
+    with _totals_lock:
+        total = _totals.get(s.name)
+        if total is None:
+            total = _totals[s.name] = Counter()
+        total['count'] += 1
+        total['seconds'] += s.seconds
+        total['rows'] += s.rows or 0
+        if s.cache is not None:
+            total[s.cache] += 1
+    trace = _trace.get()
+    if trace is not None:
+        trace.append(s)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(json.dumps(span_record(s)))
+
+
+# ─── Traces and export ───────────────────────────────────────────────────────
+def begin_trace(record: bool = False) -> list:
+    """
+    Starts collecting this thread's spans (e.g. one Streamlit rerun) into a new list and returns
+    it. With `record`, spans are recorded in this context even while recording is off for the
+    process, so one session can time its reruns without switching it on for every other session.
+    """
+    spans = []
+    _trace.set(spans)
+    _recording.set(record)
+    return spans
+
+
+def span_record(s: Span) -> dict:
+    return {'stage': s.name, 'ms': round(s.seconds * 1000, 3), 'rows': s.rows, 'cache': s.cache, 'thread': s.thread}
+
+
+def summarize(spans: list) -> list:
+    """Per-stage rows in first-seen order: calls, total and max ms, rows, cache hits/misses."""
+    stages = {}
+    for s in spans:
+        row = stages.setdefault(s.name, {'stage': s.name, 'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0,
+                                         'hits': 0, 'misses': 0})
+        ms = s.seconds * 1000
+        row['calls'] += 1
+        row['total_ms'] += ms
+        row['max_ms'] = max(row['max_ms'], ms)
+        row['rows'] += s.rows or 0
+        row['hits'] += s.cache == 'hit'
+        row['misses'] += s.cache == 'miss'
+    for row in stages.values():
+        row['total_ms'], row['max_ms'] = round(row['total_ms'], 2), round(row['max_ms'], 2)
+    return list(stages.values())
+
+
+def to_json_lines(spans: list) -> str:
+    """One JSON object per span, for structured logs."""
+    return "\n".join(json.dumps(span_record(s)) for s in spans)
+
+
+def totals() -> dict:
+    """Process-wide per-stage counters since start (or the last reset)."""
+    with _totals_lock:
+        return {name: dict(total) for name, total in _totals.items()}
+
+
+def reset_totals():
+    with _totals_lock:
+        _totals.clear()
+
+
+def to_prometheus(prefix: str = "trading_dashboard") -> str:
+    """Process-wide totals in the Prometheus text exposition format."""
+    lines = [
+        f"# HELP {prefix}_stage_seconds Wall time spent in each pipeline stage.",
+        f"# TYPE {prefix}_stage_seconds summary",
+    ]
+    stats = totals()
+    for name, total in sorted(stats.items()):
+        lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {total["seconds"]:.6f}')
+        lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {total["count"]}')
+    lines += [f"# HELP {prefix}_stage_rows_total Rows processed by each pipeline stage.",
+              f"# TYPE {prefix}_stage_rows_total counter"]
+    lines += [f'{prefix}_stage_rows_total{{stage="{name}"}} {total["rows"]}' for name, total in sorted(stats.items())]
+    lines += [f"# HELP {prefix}_cache_requests_total Cache lookups by stage and result.",
+              f"# TYPE {prefix}_cache_requests_total counter"]
+    for name, total in sorted(stats.items()):
+        for result in ('hit', 'miss'):
+            if result in total:
+                lines.append(f'{prefix}_cache_requests_total{{stage="{name}",result="{result}"}} {total[result]}')
+    return "\n".join(lines) + "\n"
+
+
+# ─── Startup report ──────────────────────────────────────────────────────────
+# Recorded whether or not spans are enabled; each phase keeps its first (cold) measurement only.
+
+@contextlib.contextmanager
+def startup_phase(name: str):
+    """Times a phase of the first start (imports, calendar, first fetch); later runs are not recorded."""
+    if name in _startup:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _startup.setdefault(name, (start - PROCESS_START, time.perf_counter() - start))
+
+
+def mark_startup(name: str):
+    """Records a startup milestone (e.g. first paint) as a zero-length phase at the current time, and logs it."""
+    if name not in _startup:
+        _startup[name] = (time.perf_counter() - PROCESS_START, 0.0)
+        logger.info("startup %s after %.0f ms: %s", name, _startup[name][0] * 1000, json.dumps(startup_report()))
+
+
+def startup_report() -> list:
+    """Startup phases by start time: offset from process start and duration, in ms."""
+    return [{'phase': name, 'at_ms': round(at * 1000, 1), 'ms': round(seconds * 1000, 1)}
+            for name, (at, seconds) in sorted(_startup.items(), key=lambda item: item[1][0])]
+
+
+# ─── Sampling profiler ───────────────────────────────────────────────────────
+class SamplingProfiler:
+    """
+    Samples one thread's Python stack every `interval` seconds from a helper thread, so a slow
+    rerun can be profiled without tracing every call. Results are collapsed stacks (flamegraph /
+    speedscope input) or a top-functions table.
+    """
+
+    def __init__(self, thread_id: int = None, interval: float = 0.005):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> 'SamplingProfiler':
+        self._thread = threading.Thread(target=self._run, name="perf-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> 'SamplingProfiler':
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[tuple(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        """'outer;inner;leaf count' lines."""
+        return "\n".join(f"{';'.join(stack)} {count}" for stack, count in self.samples.most_common())
+
+    def top(self, n: int = 20) -> list:
+        """Functions by samples spent in them (self) and under them (total)."""
+        own, total = Counter(), Counter()
+        for stack, count in self.samples.items():
+            own[stack[-1]] += count
+            for function in set(stack):
+                total[function] += count
+        n_samples = sum(self.samples.values()) or 1
+        return [{'function': function, 'self_pct': round(100 * count / n_samples, 1),
+                 'total_pct': round(100 * total[function] / n_samples, 1)}
+                for function, count in own.most_common(n)]
@@ -0,0 +1,90 @@
+# trading_dashboard/replay.py
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+import perf
+from strategy import find_entry_signals, compute_strategy_state, analysis_from_state, NO_DATA
+
+
+@perf.traced('replay.day_slice')
+def day_slice(df: pd.DataFrame, trading_date: date) -> pd.DataFrame:
+    """Rows of a time-sorted frame that fall on trading_date, found by binary search instead of per-row dates."""
+    if df.empty:
+        return df
+    start = pd.Timestamp(trading_date).tz_localize(df.index.tz)
+    end = start + pd.Timedelta(days=1)
+    return df.iloc[df.index.searchsorted(start):df.index.searchsorted(end)]
+
+
+class ReplayTimeline:
+    """
+    Everything the dashboard shows for one trading day, each piece computed at most once.
+    A cursor is the number of 1m bars at or before a given time; every tick then
+    reduces to a binary search for the cursor and list/array lookups.
+    """
+
+    @perf.traced('replay.build', rows_arg=1)
+    def __init__(self, df_1m: pd.DataFrame, df_5m: pd.DataFrame, df_15m: pd.DataFrame, trading_date: date):
+        self.trading_date = trading_date
+        self.df_1m = day_slice(df_1m, trading_date)
+        self.df_5m = day_slice(df_5m, trading_date)
+        self.df_15m = day_slice(df_15m, trading_date)
+        self.index = self.df_1m.index
+
+        # Number of 5m/15m bars visible at each 1m bar (same as .loc[:t] on the higher timeframe).
+        self.pos_5m = self.df_5m.index.searchsorted(self.index, side='right')
+        self.pos_15m = self.df_15m.index.searchsorted(self.index, side='right')
+
+        # The strategy state (colour and slope codes) at every 1m bar, in one vectorized pass;
+        # analysis[c] is run_strategy_analysis over the first c 1m bars, formatted from those
+        # codes the first time cursor c is shown.
+        state = compute_strategy_state(self.df_1m, self.df_5m, self.df_15m, self.pos_5m, self.pos_15m)
+        self._state = {column: state[column].to_numpy() for column in state.columns}
+        self.analysis = [None] * (len(self.index) + 1)
+
+        # Signals only look backwards, so the full-day result truncated at a cursor equals
+        # the result over that prefix. Store the cursor at which each signal appears.
+        self.buy_signals, self.sell_signals = find_entry_signals(self.df_1m, self.df_5m, self.df_15m,
+                                                                   self.pos_5m, self.pos_15m)
+        self._buy_cursor = self._cursors(self.buy_signals)
+        self._sell_cursor = self._cursors(self.sell_signals)
+
+    def _cursors(self, signals: pd.DataFrame) -> np.ndarray:
+        # A day without bars (e.g. today before the open) has no signals, and no time index to search.
+        if signals.empty:
+            return np.empty(0, dtype=np.intp)
+        return self.index.searchsorted(signals.index, side='right')
+
+    def cursor(self, timestamp) -> int:
+        """Number of 1m bars at or before timestamp."""
+        return int(self.index.searchsorted(timestamp, side='right'))
+
+    def analysis_at(self, cursor: int) -> dict:
+        # Sessions share timelines; a race only computes the same result twice.
+        if self.analysis[cursor] is None:
+            if cursor == 0:
+                self.analysis[cursor] = analysis_from_state({'overall': NO_DATA}, None, None, None)
+            else:
+                codes = {column: int(values[cursor - 1]) for column, values in self._state.items()}
+                n_5m, n_15m = self._visible(self.pos_5m, cursor), self._visible(self.pos_15m, cursor)
+                self.analysis[cursor] = analysis_from_state(
+                    codes, self.df_1m.iloc[cursor - 1],
+                    self.df_5m.iloc[n_5m - 1] if n_5m else None, self.df_15m.iloc[n_15m - 1] if n_15m else None)
+        return self.analysis[cursor]
+
+    @staticmethod
+    def _visible(positions, cursor: int) -> int:
+        return int(positions[cursor - 1]) if cursor > 0 else 0
+
+    def signals_at(self, cursor: int):
+        """Buy and sell signals that have fired within the first `cursor` bars."""
+        n_buy = int(self._buy_cursor.searchsorted(cursor, side='right'))
+        n_sell = int(self._sell_cursor.searchsorted(cursor, side='right'))
+        return self.buy_signals.iloc[:n_buy], self.sell_signals.iloc[:n_sell]
+
+    def window(self, start, end) -> pd.DataFrame:
+        """1m bars between start and end, inclusive."""
+        return self.df_1m.iloc[self.index.searchsorted(start):self.cursor(end)]
@@ -0,0 +1,58 @@
+# trading_dashboard/resample.py
+
+import re
+
+import pandas as pd
+
+MARKET_OPEN_OFFSET = pd.Timedelta(hours=9, minutes=30)
+OHLCV_AGG = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+
+_INTERVAL_UNITS = {'m': 'min', 'h': 'h', 'd': 'D'}
+
+
+def interval_to_timedelta(interval: str) -> pd.Timedelta:
+    """Converts a yfinance-style interval ('1m', '5m', '1h', ...) to a Timedelta."""
+    match = re.fullmatch(r"(\d+)([mhd])", interval)
+    if match is None:
+        raise ValueError(f"Unsupported interval: {interval}")
+    return pd.Timedelta(f"{match.group(1)}{_INTERVAL_UNITS[match.group(2)]}")
+
+
+def resample_ohlcv(df: pd.DataFrame, interval: str) -> pd.DataFrame:
+    """
+    Aggregates bars into a higher timeframe in one vectorized pass.
+    Buckets are labelled by their start and anchored at each day's 9:30 open in local market
+    time, matching yfinance (e.g. hourly bars at 9:30, 10:30, ...), so intervals that do not
+    divide the day (2h) keep the same edges across DST changes. Buckets with no bars are dropped.
+    """
+    if df is None or df.empty:
+        return pd.DataFrame(columns=list(OHLCV_AGG))
+    rule = interval_to_timedelta(interval).value
+    index = df.index
+    local = index.tz_localize(None) if index.tz is not None else index
+    wall = local.asi8
+    opens = local.normalize().asi8 + MARKET_OPEN_OFFSET.value
+    labels = opens + (wall - opens) // rule * rule
+    # Each bucket's start as an absolute time, taken from its first bar's UTC offset.
+    bars = df[list(OHLCV_AGG)].assign(_start=index.asi8 - (wall - labels))
+    resampled = bars.groupby(labels).agg({**OHLCV_AGG, '_start': 'first'})
+    starts = pd.DatetimeIndex(resampled.pop('_start').to_numpy().view('datetime64[ns]'))
+    resampled.index = starts.tz_localize('UTC').tz_convert(index.tz) if index.tz is not None else starts
+    return resampled.dropna(subset=['Open'])
+
+
+def stitch(history: pd.DataFrame, base: pd.DataFrame, interval: str) -> pd.DataFrame:
+    """
+    Builds `interval` bars from the finer `base` series and appends them to `history`,
+    which supplies the bars older than the base window. The first derived bucket is
+    dropped when `base` starts partway through it.
+    """
+    derived = resample_ohlcv(base, interval)
+    if not derived.empty:
+        derived = derived[derived.index >= base.index[0]]
+    if derived.empty:
+        return history
+    if history is None or history.empty:
+        return derived
+    older = history.loc[history.index < derived.index[0], list(OHLCV_AGG)]
+    return pd.concat([older, derived])
@@ -0,0 +1,236 @@
+# trading_dashboard/research.py
+
+import argparse
+import bisect
+import os
+from datetime import date
+
+import pandas as pd
+import numpy as np
+
+import perf
+from bar_store import BarStore, get_bar_store, MARKET_TZ, OHLCV_COLUMNS
+from incremental import IncrementalIndicators
+from resample import resample_ohlcv
+from strategy import find_entry_signals
+
+RESEARCH_DIR = os.environ.get("TRADING_DASHBOARD_RESEARCH_DIR", ".research")
+INTERVALS = ('1m', '5m', '15m')
+INDICATOR_COLUMNS = ['VWAP', 'EMA_50', 'MACD_12_26_9', 'MACDs_12_26_9', 'MACDh_12_26_9', 'RSI']
+
+# One bar with its indicators; timestamps are UTC epoch nanoseconds, as in the bar store.
+FRAME_DTYPE = np.dtype([('ts', '<i8')] + [(column, '<f8') for column in OHLCV_COLUMNS + INDICATOR_COLUMNS])
+# One entry signal: side is 1 for a buy, -1 for a sell; price is the chart marker price.
+SIGNAL_DTYPE = np.dtype([('ts', '<i8'), ('side', 'i1'), ('price', '<f8')])
+
+_TIME_COLUMNS = ('timestamp', 'datetime', 'date', 'time')
+
+
+def read_bar_file(path: str, tz: str = MARKET_TZ) -> pd.DataFrame:
+    """
+    1m OHLCV bars from a CSV or Parquet file. Columns are matched case-insensitively; the time
+    is the index or a timestamp/datetime/date/time column. Naive times are taken to be in `tz`.
+    """
+    if path.endswith(('.parquet', '.pq')):
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path)
+    columns = {c.lower(): c for c in df.columns}
+    time_column = next((columns[name] for name in _TIME_COLUMNS if name in columns), None)
+    if time_column is not None:
+        df = df.set_index(time_column)
+    missing = [c for c in OHLCV_COLUMNS if c.lower() not in columns]
+    if missing:
+        raise ValueError(f"{path}: missing columns {missing}")
+    df = df[[columns[c.lower()] for c in OHLCV_COLUMNS]]
+    df.columns = OHLCV_COLUMNS
+    index = pd.DatetimeIndex(pd.to_datetime(df.index, utc=False))
+    index = index.tz_localize(tz, ambiguous='infer') if index.tz is None else index
+    df.index = index.tz_convert(MARKET_TZ)
+    return df[~df.index.duplicated(keep='last')].sort_index()
+
+
+def entry_signal_records(df_1m: pd.DataFrame, df_5m: pd.DataFrame, df_15m: pd.DataFrame) -> np.ndarray:
+    """Entry signals of each day in the frames as SIGNAL_DTYPE records, found on that day's bars as the replay does."""
+    out = []
+    if df_1m.empty:
+        return np.empty(0, dtype=SIGNAL_DTYPE)
+    for day in np.unique(df_1m.index.normalize()):
+        end = day + pd.Timedelta(days=1)
+        day_frames = [df.iloc[df.index.searchsorted(day):df.index.searchsorted(end)] for df in (df_1m, df_5m, df_15m)]
+        for side, signals in zip((1, -1), find_entry_signals(*day_frames)):
+            if signals.empty:
+                continue
+            records = np.empty(len(signals), dtype=SIGNAL_DTYPE)
+            records['ts'] = signals.index.tz_convert('UTC').asi8
+            records['side'] = side
+            records['price'] = signals['Price'].to_numpy()
+            out.append(records)
+    if not out:
+        return np.empty(0, dtype=SIGNAL_DTYPE)
+    out = np.concatenate(out)
+    return out[np.argsort(out['ts'], kind='stable')]
+
+
+def _frame_to_records(df: pd.DataFrame) -> np.ndarray:
+    records = np.empty(len(df), dtype=FRAME_DTYPE)
+    records['ts'] = df.index.tz_convert('UTC').asi8
+    for column in FRAME_DTYPE.names[1:]:
+        records[column] = df[column].to_numpy(dtype=np.float64)
+    return records
+
+
+def _records_to_frame(records: np.ndarray) -> pd.DataFrame:
+    index = pd.DatetimeIndex(records['ts'].astype('datetime64[ns]')).tz_localize('UTC').tz_convert(MARKET_TZ)
+    return pd.DataFrame({column: np.asarray(records[column]) for column in FRAME_DTYPE.names[1:]}, index=index)
+
+
+class ResearchArchive:
+    """
+    Months of 1m history for offline replay and signal review. Raw 1m bars live in a BarStore
+    under <root>/bars; `build` runs the indicator engines over them chunk by chunk (state carried
+    between chunks, so memory is bounded by the chunk) and writes one memory-mappable .npy file
+    of bars plus indicators per ticker/interval/trading date under <root>/frames, and every
+    entry signal to <root>/frames/<TICKER>/signals.npy. Loading a day then reads a few files.
+    """
+
+    def __init__(self, root: str = RESEARCH_DIR):
+        self.root = root
+        self.bars = BarStore(os.path.join(root, 'bars'))
+
+    def _dir(self, ticker_symbol: str, interval: str = None) -> str:
+        parts = [self.root, 'frames', ticker_symbol.upper()] + ([interval] if interval else [])
+        return os.path.join(*parts)
+
+    def _path(self, ticker_symbol: str, interval: str, day: date) -> str:
+        return os.path.join(self._dir(ticker_symbol, interval), f"{day.isoformat()}.npy")
+
+    # ─── Import ──────────────────────────────────────────────────────────────
+    def import_bars(self, ticker_symbol: str, df_1m: pd.DataFrame) -> int:
+        """Merges 1m OHLCV bars into the archive (a bar with a stored timestamp replaces it)."""
+        if df_1m.empty:
+            return 0
+        self.bars.write(ticker_symbol, '1m', df_1m[OHLCV_COLUMNS])
+        return len(df_1m)
+
+    def import_store(self, ticker_symbol: str, store: BarStore = None) -> int:
+        """Copies the 1m days the dashboard's bar store has accumulated into the archive."""
+        store = store or get_bar_store()
+        days = store.days(ticker_symbol, '1m')
+        rows = 0
+        for i in range(0, len(days), 20):
+            rows += self.import_bars(ticker_symbol, store.read_days(ticker_symbol, '1m', days[i:i + 20]))
+        return rows
+
+    # ─── Build ───────────────────────────────────────────────────────────────
+    def build(self, ticker_symbol: str, chunk_days: int = 20, progress=None) -> dict:
+        """
+        (Re)computes the indicator frames and signals for every archived day, oldest first.
+        5m/15m bars are resampled from each chunk of whole days. `progress(done, total)` is
+        called after each chunk.
+        """
+        days = self.bars.days(ticker_symbol, '1m')
+        engines = {interval: IncrementalIndicators() for interval in INTERVALS}
+        signals = []
+        for i in range(0, len(days), chunk_days):
+            chunk = days[i:i + chunk_days]
+            with perf.span('research.chunk') as s:
+                raw = self.bars.read_days(ticker_symbol, '1m', chunk)
+                frames = {}
+                for interval in INTERVALS:
+                    bars = raw if interval == '1m' else resample_ohlcv(raw, interval)
+                    engines[interval].update(bars)
+                    frames[interval] = engines[interval].drain()
+                    self._write_days(ticker_symbol, interval, frames[interval])
+                signals.append(entry_signal_records(*(frames[interval] for interval in INTERVALS)))
+                s.set(rows=len(raw))
+            if progress is not None:
+                progress(min(i + chunk_days, len(days)), len(days))
+
+        signals = np.concatenate(signals) if signals else np.empty(0, dtype=SIGNAL_DTYPE)
+        os.makedirs(self._dir(ticker_symbol), exist_ok=True)
+        np.save(os.path.join(self._dir(ticker_symbol), 'signals.npy'), signals)
+        return {'days': len(days), 'signals': len(signals)}
+
+    def _write_days(self, ticker_symbol: str, interval: str, df: pd.DataFrame):
+        if df.empty:
+            return
+        os.makedirs(self._dir(ticker_symbol, interval), exist_ok=True)
+        records = _frame_to_records(df)
+        bar_days = df.index.normalize()
+        starts = np.flatnonzero(np.r_[True, bar_days[1:] != bar_days[:-1]])
+        for start, end in zip(starts, np.r_[starts[1:], len(df)]):
+            path = self._path(ticker_symbol, interval, bar_days[start].date())
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.save(f, records[start:end])
+            os.replace(tmp_path, path)
+
+    # ─── Read ────────────────────────────────────────────────────────────────
+    def days(self, ticker_symbol: str) -> list:
+        """Trading dates with built frames for every interval, oldest first."""
+        per_interval = []
+        for interval in INTERVALS:
+            directory = self._dir(ticker_symbol, interval)
+            names = os.listdir(directory) if os.path.isdir(directory) else []
+            per_interval.append({date.fromisoformat(name[:-4]) for name in names if name.endswith('.npy')})
+        return sorted(set.intersection(*per_interval))
+
+    @perf.traced('research.load_day', rows_arg=None)
+    def load_day(self, ticker_symbol: str, day: date, warm_days: int = 2, days: list = None):
+        """
+        (df_1m, df_5m, df_15m) for an archived day with its indicators, preceded by up to
+        `warm_days` earlier archived days (for overlay warm-up); each file is memory-mapped.
+        """
+        days = days if days is not None else self.days(ticker_symbol)
+        end = bisect.bisect_right(days, day)
+        chosen = days[max(0, end - 1 - warm_days):end]
+        frames = []
+        for interval in INTERVALS:
+            records = [np.load(self._path(ticker_symbol, interval, d), mmap_mode='r') for d in chosen]
+            frames.append(_records_to_frame(np.concatenate(records)) if records else
+                          pd.DataFrame(columns=OHLCV_COLUMNS + INDICATOR_COLUMNS))
+        return tuple(frames)
+
+    def signals(self, ticker_symbol: str) -> pd.DataFrame:
+        """Every archived entry signal: side ('BUY'/'SELL') and marker price, indexed by time."""
+        path = os.path.join(self._dir(ticker_symbol), 'signals.npy')
+        records = np.load(path) if os.path.exists(path) else np.empty(0, dtype=SIGNAL_DTYPE)
+        index = pd.DatetimeIndex(records['ts'].astype('datetime64[ns]')).tz_localize('UTC').tz_convert(MARKET_TZ)
+        return pd.DataFrame({'side': np.where(records['side'] > 0, 'BUY', 'SELL'), 'price': records['price']},
+                            index=index)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and inspect the local research archive of 1m bars.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_cmd = commands.add_parser("import", help="import 1m bars from CSV/Parquet files")
+    import_cmd.add_argument("ticker")
+    import_cmd.add_argument("files", nargs="+")
+    import_cmd.add_argument("--tz", default=MARKET_TZ, help="time zone of naive timestamps")
+    store_cmd = commands.add_parser("import-store", help="copy the dashboard's stored 1m bars")
+    store_cmd.add_argument("ticker")
+    build_cmd = commands.add_parser("build", help="compute indicator frames and signals")
+    build_cmd.add_argument("ticker")
+    build_cmd.add_argument("--chunk-days", type=int, default=20)
+    signals_cmd = commands.add_parser("signals", help="list archived entry signals")
+    signals_cmd.add_argument("ticker")
+    args = parser.parse_args()
+
+    archive = ResearchArchive()
+    ticker = args.ticker.upper()
+    if args.command == "import":
+        for path in args.files:
+            print(f"{path}: {archive.import_bars(ticker, read_bar_file(path, args.tz))} bars")
+    elif args.command == "import-store":
+        print(f"{archive.import_store(ticker)} bars")
+    elif args.command == "build":
+        summary = archive.build(ticker, args.chunk_days,
+                                progress=lambda done, total: print(f"\r{done}/{total} days", end="", flush=True))
+        print(f"\n{summary['days']} days, {summary['signals']} signals")
+    else:
+        print(archive.signals(ticker).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# trading_dashboard/retention.py
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from bar_store import period_sessions
+from charts import OVERLAYS
+from compact import CompactBars
+from fetch_pipeline import TIMEFRAMES
+from incremental import ticker_engines
+from indicators import warmup_bars
+
+# By default each timeframe keeps the span it is fetched with, counted in sessions like the fetch.
+DEFAULT_WINDOWS = {interval: period for interval, period, name in TIMEFRAMES}
+
+
+def overlay_warmup() -> int:
+    """Bars the chart overlays need before the first bar they are drawn for."""
+    return max((warmup_bars(name, params) for name, params in OVERLAYS.values()), default=0)
+
+
+def frame_bytes(frame) -> int:
+    if isinstance(frame, CompactBars):
+        return frame.nbytes
+    return int(frame.memory_usage(deep=True).sum())
+
+
+class RetentionPolicy:
+    """
+    How much per-ticker data a long-running server keeps in memory. Each timeframe keeps the
+    last `windows` sessions ('7d' is the 7 most recent trading dates, as in read_recent) plus
+    `warmup` older bars, so indicators computed on demand over the window (chart overlays)
+    start settled; older bars stay in the bar store and are read back from there when needed. `budget_bytes` caps the total held for
+    all tickers; the market data service evicts the least recently read tickers beyond it.
+    """
+
+    def __init__(self, windows: dict = None, warmup: int = None, budget_bytes: int = None):
+        self.windows = {interval: period_sessions(span) for interval, span in {**DEFAULT_WINDOWS, **(windows or {})}.items()}
+        self.warmup = overlay_warmup() if warmup is None else warmup
+        self.budget_bytes = budget_bytes
+
+    def first_row(self, interval: str, index: pd.Index) -> int:
+        """Position of the oldest bar to keep in a time index."""
+        sessions = self.windows.get(interval)
+        if sessions is None or len(index) == 0:
+            return 0
+        days = index.normalize().asi8
+        starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+        if len(starts) <= sessions:
+            return 0
+        return max(int(starts[-sessions]) - self.warmup, 0)
+
+    def trim(self, interval: str, frame):
+        """The frame without the bars older than the retention window (the frame itself if none are)."""
+        first = self.first_row(interval, frame.index)
+        if first == 0:
+            return frame
+        if isinstance(frame, CompactBars):
+            return frame.iloc(first, len(frame))
+        # A copy, so the dropped rows' memory is released rather than kept alive by a view.
+        return frame.iloc[first:].copy()
+
+    def apply(self, ticker_symbol: str, frames, intervals=tuple(DEFAULT_WINDOWS)) -> tuple:
+        """
+        Trims a ticker's (df_1m, df_5m, df_15m) and its incremental engines to the windows.
+        A frame that is an engine's own frame is trimmed once and shared, not copied twice.
+        """
+        engines = ticker_engines(ticker_symbol)
+        out = []
+        for interval, frame in zip(intervals, frames):
+            engine = engines.get(interval)
+            if engine is not None and engine.frame is frame and not frame.empty:
+                out.append(engine.trim(frame.index[self.first_row(interval, frame.index)]))
+                continue
+            out.append(self.trim(interval, frame))
+            if engine is not None and not engine.frame.empty:
+                engine.trim(engine.frame.index[self.first_row(interval, engine.frame.index)])
+        return tuple(out)
+
+    def ticker_bytes(self, ticker_symbol: str, frames) -> int:
+        """Bytes held for a ticker: its snapshot frames plus any engine frames they do not share."""
+        held = {id(frame): frame for frame in frames}
+        for engine in ticker_engines(ticker_symbol).values():
+            held.setdefault(id(engine.frame), engine.frame)
+        return sum(frame_bytes(frame) for frame in held.values())
+
+
+def policy_from_env() -> RetentionPolicy:
+    """
+    The policy set by TRADING_DASHBOARD_RETENTION (e.g. '1m=2d,5m=20d'; unset timeframes keep
+    their fetch span) and TRADING_DASHBOARD_MEMORY_MB (no budget when unset).
+    """
+    spec = os.environ.get("TRADING_DASHBOARD_RETENTION", "")
+    windows = dict(item.strip().split("=", 1) for item in spec.split(",") if item.strip())
+    budget_mb = os.environ.get("TRADING_DASHBOARD_MEMORY_MB")
+    return RetentionPolicy(windows, budget_bytes=None if not budget_mb else int(float(budget_mb) * 2 ** 20))
@@ -0,0 +1,205 @@
+# trading_dashboard/scanner.py
+
+import argparse
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import numpy as np
+
+from indicators import session_keys, segmented_cumsum
+from resample import interval_to_timedelta, MARKET_OPEN_OFFSET
+from strategy import vwap_slope_class, trend_color, entry_color, GREEN, RED, WHITE
+
+FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+MARKET_TZ = 'America/New_York'
+
+# data has shape (symbols, time, field) with FIELDS order; missing bars are NaN.
+StackedBars = namedtuple('StackedBars', ['symbols', 'index', 'data'])
+
+
+def fetch_stacked(symbols, period: str = "5d", interval: str = "1m", batch_size: int = 100) -> StackedBars:
+    """Downloads bars for many symbols with batched yfinance requests into one stacked array."""
+    import yfinance as yf
+
+    per_field = {field: [] for field in FIELDS}
+    for start in range(0, len(symbols), batch_size):
+        batch = list(symbols[start:start + batch_size])
+        raw = yf.download(batch, period=period, interval=interval, group_by='column', auto_adjust=True,
+                          threads=True, progress=False)
+        if raw.empty:
+            continue
+        for field in FIELDS:
+            per_field[field].append(raw[field].reindex(columns=batch))
+
+    if not per_field['Close']:
+        return StackedBars(list(symbols), pd.DatetimeIndex([], tz=MARKET_TZ), np.empty((len(symbols), 0, 5)))
+    frames = {field: pd.concat(parts, axis=1).reindex(columns=list(symbols)) for field, parts in per_field.items()}
+    index = frames['Close'].index
+    index = index.tz_localize('UTC') if index.tz is None else index
+    data = np.stack([frames[field].to_numpy(dtype=float).T for field in FIELDS], axis=2)
+    return StackedBars(list(symbols), index.tz_convert(MARKET_TZ), data)
+
+
+def merge_stacked(old: StackedBars, new: StackedBars) -> StackedBars:
+    """Replaces everything from the first bar of `new` onwards (same symbol order) with `new`."""
+    if new.index.empty:
+        return old
+    keep = old.index.searchsorted(new.index[0])
+    return StackedBars(old.symbols, old.index[:keep].append(new.index),
+                       np.concatenate([old.data[:, :keep], new.data], axis=1))
+
+
+def _field_frames(index: pd.DatetimeIndex, data: np.ndarray) -> dict:
+    """One (time x symbols) frame per field, so pandas kernels run over every symbol at once."""
+    return {field: pd.DataFrame(data[:, :, i].T, index=index) for i, field in enumerate(FIELDS)}
+
+
+def resample_fields(fields: dict, interval: str) -> dict:
+    """Batch OHLCV resampling of every symbol, with the same 9:30-anchored buckets as resample.py."""
+    rule = interval_to_timedelta(interval)
+    how = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+    out = {}
+    for field, frame in fields.items():
+        resampled = frame.resample(rule, origin='start_day', offset=MARKET_OPEN_OFFSET % rule,
+                                   label='left', closed='left')
+        out[field] = getattr(resampled, how[field])(min_count=1) if field == 'Volume' \
+            else getattr(resampled, how[field])()
+    occupied = out['Close'].notna().any(axis=1)
+    return {field: frame[occupied] for field, frame in out.items()}
+
+
+def batch_indicators(fields: dict) -> dict:
+    """
+    compute_indicators for every symbol at once on (time x symbols) frames.
+    EMAs skip a symbol's missing bars and VWAP treats them as zero volume; RSI windows count
+    grid rows, so it only matches the per-symbol value when the symbol has no gaps inside the window.
+    """
+    close = fields['Close']
+
+    def ema(frame, period):
+        return frame.ewm(alpha=2 / (period + 1), adjust=False, ignore_na=True).mean()
+
+    typical_price = ((fields['High'] + fields['Low'] + close) / 3).to_numpy()
+    volume = np.nan_to_num(fields['Volume'].to_numpy())
+    keys = session_keys(close.index)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vwap = segmented_cumsum(np.nan_to_num(typical_price) * volume, keys) / segmented_cumsum(volume, keys)
+
+    macd = ema(close, 12) - ema(close, 26)
+    signal = ema(macd, 9)
+    delta = close.diff()
+    gain = delta.where(delta > 0, 0).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+
+    # Rows where a symbol has no bar carry no value, so "latest" always means its own last bar.
+    missing = close.isna()
+    return {
+        'Close': close,
+        'VWAP': pd.DataFrame(vwap, index=close.index, columns=close.columns).mask(missing),
+        'MACD_12_26_9': macd.mask(missing),
+        'MACDs_12_26_9': signal.mask(missing),
+        'MACDh_12_26_9': (macd - signal).mask(missing),
+        'RSI': (100 - (100 / (1 + gain / loss))).mask(missing),
+    }
+
+
+def _latest(indicators: dict, symbols) -> tuple:
+    """Latest row per symbol as a (symbols x columns) frame, plus the VWAP slope class over its last 5 bars."""
+    latest = pd.DataFrame({name: frame.ffill().iloc[-1].to_numpy() for name, frame in indicators.items()},
+                          index=symbols)
+    # Slope over each symbol's own last 5 bars of the current session, as the dashboard sees its day
+    # frame: a stable sort on "has a bar" moves every symbol's missing rows to the top of its column.
+    vwap = indicators['VWAP']
+    session = vwap[vwap.index.normalize() == vwap.index[-1].normalize()].to_numpy()
+    packed = np.take_along_axis(session, np.argsort(~np.isnan(session), axis=0, kind='stable'), axis=0)
+    return latest, vwap_slope_class(packed)[-1]
+
+
+def scan_chunk(symbols, index: pd.DatetimeIndex, data: np.ndarray) -> pd.DataFrame:
+    """Multi-timeframe alignment and score for a chunk of symbols (runs in a worker process)."""
+    fields_1m = _field_frames(index, data)
+    ind_1m = batch_indicators(fields_1m)
+    ind_5m = batch_indicators(resample_fields(fields_1m, '5m'))
+    ind_15m = batch_indicators(resample_fields(fields_1m, '15m'))
+
+    latest_1m, _ = _latest(ind_1m, symbols)
+    latest_5m, slope_5m = _latest(ind_5m, symbols)
+    latest_15m, slope_15m = _latest(ind_15m, symbols)
+
+    bias = trend_color(latest_15m, slope_15m)
+    confirm = trend_color(latest_5m, slope_5m)
+    entry = entry_color(latest_1m)
+
+    signal = np.full(len(symbols), 'HOLD', dtype=object)
+    signal[(bias == GREEN) & (confirm == GREEN) & (entry == GREEN)] = 'BULLISH'
+    signal[(bias == RED) & (confirm == RED) & (entry == RED)] = 'BEARISH'
+
+    # Score: timeframes agreeing (-3..3, no read counts 0) plus RSI distance from 50 as a tie-breaker.
+    votes = sum(np.where(color == WHITE, 0, color).astype(int) for color in (bias, confirm, entry))
+    rsi = latest_1m['RSI'].to_numpy()
+    score = votes + np.nan_to_num((rsi - 50) / 50)
+
+    return pd.DataFrame({
+        'symbol': symbols, 'signal': signal, 'score': score.round(3),
+        'price': latest_1m['Close'].to_numpy(), 'vwap': latest_1m['VWAP'].to_numpy(),
+        'rsi': rsi, 'macd_hist': latest_1m['MACDh_12_26_9'].to_numpy(),
+        'bias_15m': bias, 'confirm_5m': confirm, 'entry_1m': entry,
+    })
+
+
+def scan(bars: StackedBars, max_workers: int = None, chunk_size: int = 64) -> pd.DataFrame:
+    """
+    Ranks a universe by live signal alignment: BULLISH symbols by descending score, then
+    BEARISH by ascending score, then the rest. Symbol chunks are scored on a process pool.
+    """
+    chunks = [(bars.symbols[i:i + chunk_size], bars.index, bars.data[i:i + chunk_size])
+              for i in range(0, len(bars.symbols), chunk_size)]
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(chunks) == 1:
+        results = [scan_chunk(*chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(scan_chunk, *zip(*chunks)))
+    table = pd.concat(results, ignore_index=True)
+
+    order = table['signal'].map({'BULLISH': 0, 'BEARISH': 1, 'HOLD': 2})
+    rank = np.where(table['signal'] == 'BEARISH', table['score'], -table['score'].abs())
+    return table.assign(_order=order, _rank=rank).sort_values(['_order', '_rank']) \
+        .drop(columns=['_order', '_rank']).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank a universe of symbols by multi-timeframe signal alignment.")
+    parser.add_argument("symbols", nargs="*", help="symbols to scan (or use --universe)")
+    parser.add_argument("--universe", help="file with one symbol per line")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--watch", type=int, default=0, help="rescan every N seconds (only new bars are fetched)")
+    args = parser.parse_args()
+
+    symbols = [s.upper() for s in args.symbols]
+    if args.universe:
+        with open(args.universe) as f:
+            symbols += [line.strip().upper() for line in f if line.strip() and not line.startswith('#')]
+    if not symbols:
+        parser.error("no symbols given")
+
+    bars = fetch_stacked(symbols)
+    while True:
+        started = time.time()
+        table = scan(bars, max_workers=args.workers)
+        aligned = table[table['signal'] != 'HOLD']
+        print(f"\n{pd.Timestamp.now(tz=MARKET_TZ):%H:%M:%S}  {len(aligned)} aligned of {len(table)} "
+              f"({time.time() - started:.1f}s)")
+        print(aligned.head(args.top).to_string(index=False))
+        if not args.watch:
+            break
+        time.sleep(max(0.0, args.watch - (time.time() - started)))
+        bars = merge_stacked(bars, fetch_stacked(symbols, period="1d"))
+
+
+if __name__ == "__main__":
+    main()
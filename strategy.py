@@ -3,6 +3,8 @@
 import pandas as pd
 import numpy as np
 
+import perf
+
 
 def get_vwap_status(price, vwap, vwap_series):
     """
@@ -22,7 +24,13 @@ def get_vwap_status(price, vwap, vwap_series):
             slope = "Falling"
         else:
             slope = "Flat"
+    return vwap_status_for_slope(price, vwap, slope)
+
 
+def vwap_status_for_slope(price, vwap, slope):
+    """get_vwap_status with the VWAP slope ('Rising', 'Falling' or 'Flat') already known."""
+    if vwap is None or pd.isna(vwap):
+        return "Not Available", "⚪", "N/A"
     if price > vwap and slope == "Rising":
         return "Bullish Bias", "🟢", slope
     elif price < vwap and slope == "Falling":
@@ -57,6 +65,7 @@ def get_rsi_status(rsi):
         return f"Bearish Momentum ({rsi:.1f})", "🔴"
 
 
+@perf.traced('strategy.analysis')
 def run_strategy_analysis(df_1m, df_5m, df_15m):
     """Runs the full multi-timeframe analysis and returns a results dictionary."""
     results = {
@@ -68,7 +77,7 @@ def run_strategy_analysis(df_1m, df_5m, df_15m):
     }
 
     if df_1m.empty or df_5m.empty or df_15m.empty:
-        results['overall'] = ('Error', '❌', 'Not enough data for all timeframes.')
+        results['overall'] = OVERALL_RESULTS[NO_DATA]
         return results
 
     latest_1m, latest_5m, latest_15m = df_1m.iloc[-1], df_5m.iloc[-1], df_15m.iloc[-1]
@@ -96,40 +105,45 @@ def run_strategy_analysis(df_1m, df_5m, df_15m):
     bias_emoji, confirm_emoji, entry_emoji = results['15m']['bias'][1], results['5m']['confirm'][1], \
     results['1m']['entry'][1]
     if bias_emoji == '🟢' and confirm_emoji == '🟢' and entry_emoji == '🟢':
-        results['overall'] = ('BULLISH', '🟢', 'All timeframes aligned for a bullish entry signal.')
+        results['overall'] = OVERALL_RESULTS[BULLISH]
     elif bias_emoji == '🔴' and confirm_emoji == '🔴' and entry_emoji == '🔴':
-        results['overall'] = ('BEARISH', '🔴', 'All timeframes aligned for a bearish entry signal.')
+        results['overall'] = OVERALL_RESULTS[BEARISH]
     else:
-        results['overall'] = ('HOLD', '🟡', 'Timeframes are not in full alignment. Wait for a clearer signal.')
+        results['overall'] = OVERALL_RESULTS[HOLD]
 
     return results
 
 
-def find_entry_signals(df_1m, df_5m, df_15m):
+@perf.traced('strategy.entry_signals')
+def find_entry_signals(df_1m, df_5m, df_15m, pos_5m=None, pos_15m=None):
     """
     Analyzes historical data to find all points where a trade entry signal occurred.
     Uses a vectorized approach for efficiency.
     Returns two dataframes: one for buy signals, one for sell signals.
+    pos_5m/pos_15m are the number of 5m/15m bars visible at each 1m bar, if the caller has them.
     """
     if df_1m.empty or df_5m.empty or df_15m.empty:
         return pd.DataFrame(), pd.DataFrame()
 
-    # 1. Align all timeframes to the 1-minute index for row-by-row comparison
-    df_5m_aligned = df_5m.reindex(df_1m.index, method='ffill')
-    df_15m_aligned = df_15m.reindex(df_1m.index, method='ffill')
+    # 1. Align all timeframes to the 1-minute index: the last higher-timeframe bar at or before
+    #    each minute (what reindex(method='ffill') gives), as binary searches and array gathers
+    if pos_5m is None:
+        pos_5m = df_5m.index.searchsorted(df_1m.index, side='right')
+    if pos_15m is None:
+        pos_15m = df_15m.index.searchsorted(df_1m.index, side='right')
+
+    def trend(df, positions):
+        close, vwap = df['Close'].to_numpy(), df['VWAP'].to_numpy()
+        macd, signal = df['MACD_12_26_9'].to_numpy(), df['MACDs_12_26_9'].to_numpy()
+        return (_gather((close > vwap) & (macd > signal), positions, False),
+                _gather((close < vwap) & (macd < signal), positions, False))
 
     # 2. Define conditions for each timeframe based on the strategy
     # 15-Minute Bullish Bias
-    is_15m_bullish = (df_15m_aligned['Close'] > df_15m_aligned['VWAP']) & (
-                df_15m_aligned['MACD_12_26_9'] > df_15m_aligned['MACDs_12_26_9'])
-    is_15m_bearish = (df_15m_aligned['Close'] < df_15m_aligned['VWAP']) & (
-                df_15m_aligned['MACD_12_26_9'] < df_15m_aligned['MACDs_12_26_9'])
+    is_15m_bullish, is_15m_bearish = trend(df_15m, pos_15m)
 
     # 5-Minute Bullish Confirmation
-    is_5m_bullish = (df_5m_aligned['Close'] > df_5m_aligned['VWAP']) & (
-                df_5m_aligned['MACD_12_26_9'] > df_5m_aligned['MACDs_12_26_9'])
-    is_5m_bearish = (df_5m_aligned['Close'] < df_5m_aligned['VWAP']) & (
-                df_5m_aligned['MACD_12_26_9'] < df_5m_aligned['MACDs_12_26_9'])
+    is_5m_bullish, is_5m_bearish = trend(df_5m, pos_5m)
 
     # 1-Minute Entry Trigger: A MACD crossover event
     macd_cross_up = (df_1m['MACD_12_26_9'] > df_1m['MACDs_12_26_9']) & (
@@ -154,4 +168,159 @@ def find_entry_signals(df_1m, df_5m, df_15m):
     buy_signals = pd.DataFrame({'Price': buy_points['Low'] * 0.998}, index=buy_points.index)
     sell_signals = pd.DataFrame({'Price': sell_points['High'] * 1.002}, index=sell_points.index)
 
-    return buy_signals, sell_signals
\ No newline at end of file
+    return buy_signals, sell_signals
+
+
+# ─── Vectorized full-history strategy state ──────────────────────────────────
+# Emoji colours and slope classes as int8 codes, so every bar's state fits in a few bytes.
+GREEN, RED, YELLOW, WHITE = 1, -1, 0, 2
+RISING, FALLING, FLAT = 1, -1, 0
+BULLISH, BEARISH, HOLD, NO_DATA = 1, -1, 0, 2
+EMOJI = {GREEN: '🟢', RED: '🔴', YELLOW: '🟡', WHITE: '⚪'}
+SLOPE_NAMES = {RISING: 'Rising', FALLING: 'Falling', FLAT: 'Flat'}
+OVERALL_RESULTS = {
+    BULLISH: ('BULLISH', '🟢', 'All timeframes aligned for a bullish entry signal.'),
+    BEARISH: ('BEARISH', '🔴', 'All timeframes aligned for a bearish entry signal.'),
+    HOLD: ('HOLD', '🟡', 'Timeframes are not in full alignment. Wait for a clearer signal.'),
+    NO_DATA: ('Error', '❌', 'Not enough data for all timeframes.'),
+}
+
+# Closed-form least-squares slope over the last 5 points (x = 0..4), same as np.polyfit(range(5), y, 1)[0].
+_SLOPE_WEIGHTS = np.array([-2, -1, 0, 1, 2]) / 10
+
+
+def vwap_slope_class(vwap) -> np.ndarray:
+    """
+    Rising/Falling/Flat code for every bar, from the slope of the trailing 5 VWAP values.
+    Accepts a Series or a (time x symbols) array; bars with fewer than 5 values are Flat.
+    """
+    values = np.asarray(vwap, dtype=float)
+    slope = np.full(values.shape, np.nan)
+    if len(values) >= 5:
+        windows = np.lib.stride_tricks.sliding_window_view(values, 5, axis=0)
+        slope[4:] = windows @ _SLOPE_WEIGHTS
+    classes = np.full(values.shape, FLAT, dtype=np.int8)
+    classes[slope > 0.001] = RISING
+    classes[slope < -0.001] = FALLING
+    return classes
+
+
+def _vwap_color(df: pd.DataFrame, slope: np.ndarray) -> np.ndarray:
+    price, vwap = df['Close'].to_numpy(dtype=float), df['VWAP'].to_numpy(dtype=float)
+    with np.errstate(invalid='ignore'):
+        color = np.select(
+            [np.isnan(vwap),
+             (price > vwap) & (slope == RISING),
+             (price < vwap) & (slope == FALLING),
+             np.abs(price - vwap) / price < 0.001],
+            [WHITE, GREEN, RED, YELLOW], default=WHITE)
+    return color.astype(np.int8)
+
+
+def _macd_color(df: pd.DataFrame) -> np.ndarray:
+    macd, signal = df['MACD_12_26_9'].to_numpy(dtype=float), df['MACDs_12_26_9'].to_numpy(dtype=float)
+    hist = df['MACDh_12_26_9'].to_numpy(dtype=float)
+    color = np.select([np.isnan(macd), (macd > signal) & (hist > 0), (macd < signal) & (hist < 0)],
+                      [WHITE, GREEN, RED], default=YELLOW)
+    return color.astype(np.int8)
+
+
+def _rsi_color(df: pd.DataFrame) -> np.ndarray:
+    rsi = df['RSI'].to_numpy(dtype=float)
+    color = np.select([np.isnan(rsi), rsi > 70, rsi < 30, rsi > 50], [WHITE, RED, GREEN, GREEN], default=RED)
+    return color.astype(np.int8)
+
+
+def trend_color(df: pd.DataFrame, slope: np.ndarray) -> np.ndarray:
+    """15m bias / 5m confirmation colour per row: VWAP colour, or the MACD colour when VWAP gives no read (⚪)."""
+    vwap_color = _vwap_color(df, slope)
+    return np.where(vwap_color != WHITE, vwap_color, _macd_color(df)).astype(np.int8)
+
+
+def entry_color(df: pd.DataFrame) -> np.ndarray:
+    """1m entry colour per row: MACD colour, or the RSI colour when MACD is unavailable."""
+    macd_color = _macd_color(df)
+    return np.where(macd_color != WHITE, macd_color, _rsi_color(df)).astype(np.int8)
+
+
+def _gather(values: np.ndarray, positions: np.ndarray, missing) -> np.ndarray:
+    """values[positions - 1], with `missing` where no bar is visible yet (position 0)."""
+    out = np.full(len(positions), missing, dtype=values.dtype)
+    visible = positions > 0
+    out[visible] = values[positions[visible] - 1]
+    return out
+
+
+@perf.traced('strategy.state')
+def compute_strategy_state(df_1m: pd.DataFrame, df_5m: pd.DataFrame, df_15m: pd.DataFrame,
+                           pos_5m=None, pos_15m=None) -> pd.DataFrame:
+    """
+    Vectorized run_strategy_analysis for every 1m bar in one pass.
+    Row t holds the colour codes run_strategy_analysis would report with data up to t:
+    15m bias, 5m confirmation, 1m entry, the three VWAP slope classes and the overall alignment.
+    Like run_strategy_analysis, slopes use the trailing 5 bars of the frames passed in.
+    pos_5m/pos_15m are the number of 5m/15m bars visible at each 1m bar, if the caller has them.
+    """
+    n = len(df_1m)
+    state = pd.DataFrame({
+        'bias_15m': np.full(n, WHITE, dtype=np.int8),
+        'confirm_5m': np.full(n, WHITE, dtype=np.int8),
+        'entry_1m': np.full(n, WHITE, dtype=np.int8),
+        'vwap_slope_1m': np.full(n, FLAT, dtype=np.int8),
+        'vwap_slope_5m': np.full(n, FLAT, dtype=np.int8),
+        'vwap_slope_15m': np.full(n, FLAT, dtype=np.int8),
+        'overall': np.full(n, NO_DATA, dtype=np.int8),
+    }, index=df_1m.index)
+    if df_1m.empty or df_5m.empty or df_15m.empty:
+        return state
+
+    # Number of higher-timeframe bars visible at each 1m bar (equivalent to .loc[:t]).
+    if pos_5m is None:
+        pos_5m = df_5m.index.searchsorted(df_1m.index, side='right')
+    if pos_15m is None:
+        pos_15m = df_15m.index.searchsorted(df_1m.index, side='right')
+
+    slope_5m, slope_15m = vwap_slope_class(df_5m['VWAP']), vwap_slope_class(df_15m['VWAP'])
+    bias = _gather(trend_color(df_15m, slope_15m), pos_15m, WHITE)
+    confirm = _gather(trend_color(df_5m, slope_5m), pos_5m, WHITE)
+    entry = entry_color(df_1m)
+
+    overall = np.full(n, HOLD, dtype=np.int8)
+    overall[(bias == GREEN) & (confirm == GREEN) & (entry == GREEN)] = BULLISH
+    overall[(bias == RED) & (confirm == RED) & (entry == RED)] = BEARISH
+    overall[(pos_5m == 0) | (pos_15m == 0)] = NO_DATA
+
+    state['bias_15m'] = bias
+    state['confirm_5m'] = confirm
+    state['entry_1m'] = entry
+    state['vwap_slope_1m'] = vwap_slope_class(df_1m['VWAP'])
+    state['vwap_slope_5m'] = _gather(slope_5m, pos_5m, FLAT)
+    state['vwap_slope_15m'] = _gather(slope_15m, pos_15m, FLAT)
+    state['overall'] = overall
+    return state
+
+
+def analysis_from_state(state: dict, latest_1m, latest_5m, latest_15m) -> dict:
+    """
+    run_strategy_analysis's result at one bar, from that bar's compute_strategy_state codes
+    (a dict of column -> code) and the latest 1m/5m/15m rows visible at it: the colours and
+    slopes come from the codes, so only the status texts are formatted here.
+    """
+    results = {
+        '15m': {'bias': ('', '', '')},
+        '5m': {'confirm': ('', '', '')},
+        '1m': {'entry': ('', ''), 'vwap': ('', '', '')},
+        'checklist': {},
+        'overall': OVERALL_RESULTS[state['overall']],
+    }
+    if state['overall'] == NO_DATA:
+        return results
+
+    results['1m']['vwap'] = vwap_status_for_slope(latest_1m['Close'], latest_1m['VWAP'],
+                                                  SLOPE_NAMES[state['vwap_slope_1m']])
+    for frame, latest, key, color in (('15m', latest_15m, 'bias', 'bias_15m'), ('5m', latest_5m, 'confirm', 'confirm_5m')):
+        status = vwap_status_for_slope(latest['Close'], latest['VWAP'], SLOPE_NAMES[state[f'vwap_slope_{frame}']])[0]
+        results[frame][key] = (status, EMOJI[state[color]])
+    macd1_status = get_macd_status(latest_1m['MACD_12_26_9'], latest_1m['MACDs_12_26_9'], latest_1m['MACDh_12_26_9'])[0]
+    results['1m']['entry'] = (f"{macd1_status} & {get_rsi_status(latest_1m['RSI'])[0]}", EMOJI[state['entry_1m']])
+    return results
@@ -0,0 +1,472 @@
+# trading_dashboard/streaming.py
+
+import json
+import logging
+import socket
+import threading
+import time
+from collections import namedtuple, Counter
+
+import pandas as pd
+
+from bar_store import fetch_bars, get_bar_store, OHLCV_COLUMNS
+from incremental import get_engine
+from resample import interval_to_timedelta, MARKET_OPEN_OFFSET
+
+logger = logging.getLogger("trading_dashboard.streaming")
+
+MARKET_TZ = 'America/New_York'
+INTERVALS = ('1m', '5m', '15m')
+
+# A trade or quote print. ts: tz-aware timestamp; size may be 0 for quotes.
+Tick = namedtuple('Tick', ['symbol', 'ts', 'price', 'size'])
+# A whole 1m bar as some feeds (and the yfinance poller) deliver it; a repeated ts revises the bar.
+Bar = namedtuple('Bar', ['symbol', 'ts', 'open', 'high', 'low', 'close', 'volume'])
+
+
+def _timestamp(value) -> pd.Timestamp:
+    """Epoch seconds/milliseconds or an ISO string as a market-time timestamp."""
+    if isinstance(value, (int, float)):
+        ts = pd.Timestamp(value, unit='ms' if value > 1e11 else 's', tz='UTC')
+    else:
+        ts = pd.Timestamp(value)
+        ts = ts.tz_localize(MARKET_TZ) if ts.tz is None else ts
+    return ts.tz_convert(MARKET_TZ)
+
+
+def parse_json_ticks(message) -> list:
+    """Default wire format: a JSON object or list of objects with symbol, ts, price and optional size."""
+    payload = json.loads(message)
+    items = payload if isinstance(payload, list) else [payload]
+    return [Tick(str(item['symbol']).upper(), _timestamp(item['ts']), float(item['price']),
+                 float(item.get('size', 0))) for item in items if 'price' in item]
+
+
+# ─── Sources ─────────────────────────────────────────────────────────────────
+class QuoteSource:
+    """
+    A live feed. events() yields Tick and/or Bar events until close() is called;
+    subscribe() may be called at any time, from any thread.
+    """
+
+    def __init__(self):
+        self.symbols = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def subscribe(self, symbols):
+        with self._lock:
+            self.symbols.update(symbol.upper() for symbol in symbols)
+
+    def events(self):
+        raise NotImplementedError
+
+    def close(self):
+        self._stop.set()
+
+
+class YFinancePoller(QuoteSource):
+    """
+    Polls today's 1m bars every `poll_seconds` and yields those at or after the last one seen
+    (on a symbol's first poll, only the last two: its history has just been loaded).
+    """
+
+    def __init__(self, poll_seconds: float = 5.0, client_factory=None):
+        super().__init__()
+        self.poll_seconds = poll_seconds
+        self._client_factory = client_factory
+        self._last_seen = {}
+
+    def events(self):
+        if self._client_factory is None:
+            import yfinance as yf
+            self._client_factory = yf.Ticker
+        while not self._stop.is_set():
+            with self._lock:
+                symbols = sorted(self.symbols)
+            for symbol in symbols:
+                try:
+                    df = fetch_bars(self._client_factory(symbol), symbol, "1d", "1m")
+                except Exception as e:
+                    logger.warning("poll of %s failed: %s", symbol, e)
+                    continue
+                last_seen = self._last_seen.get(symbol)
+                df = df.iloc[-2:] if last_seen is None else df.loc[last_seen:]
+                for row in df.itertuples():
+                    yield Bar(symbol, row.Index, row.Open, row.High, row.Low, row.Close, row.Volume)
+                if not df.empty:
+                    self._last_seen[symbol] = df.index[-1]
+            self._stop.wait(self.poll_seconds)
+
+
+class WebSocketSource(QuoteSource):
+    """
+    Ticks from a websocket quote feed (needs the `websockets` package). `subscribe_message(symbols)`
+    builds the subscription payload and `parse(message)` turns one message into ticks; the defaults
+    speak {"subscribe": [...]} and parse_json_ticks. Reconnects after `reconnect_seconds`.
+    """
+
+    def __init__(self, url: str, subscribe_message=None, parse=parse_json_ticks, reconnect_seconds: float = 2.0):
+        super().__init__()
+        self.url = url
+        self._subscribe_message = subscribe_message or (lambda symbols: json.dumps({'subscribe': sorted(symbols)}))
+        self._parse = parse
+        self.reconnect_seconds = reconnect_seconds
+        self._connection = None
+
+    def subscribe(self, symbols):
+        symbols = {symbol.upper() for symbol in symbols}
+        with self._lock:
+            new = symbols - self.symbols
+            self.symbols |= new
+            connection = self._connection
+        if new and connection is not None:
+            try:
+                connection.send(self._subscribe_message(new))
+            except Exception:
+                pass  # the reconnect resubscribes everything
+
+    def events(self):
+        from websockets.sync.client import connect
+
+        while not self._stop.is_set():
+            try:
+                with connect(self.url) as connection:
+                    with self._lock:
+                        self._connection = connection
+                        symbols = set(self.symbols)
+                    if symbols:
+                        connection.send(self._subscribe_message(symbols))
+                    while not self._stop.is_set():
+                        try:
+                            message = connection.recv(timeout=1.0)
+                        except TimeoutError:
+                            continue
+                        yield from self._parse(message)
+            except Exception as e:
+                logger.warning("websocket %s: %s", self.url, e)
+            finally:
+                with self._lock:
+                    self._connection = None
+            self._stop.wait(self.reconnect_seconds)
+
+    def close(self):
+        super().close()
+        with self._lock:
+            connection = self._connection
+        if connection is not None:
+            connection.close()
+
+
+class LineSocketSource(QuoteSource):
+    """Newline-delimited messages over plain TCP (e.g. a local replay server), parsed like the websocket feed."""
+
+    def __init__(self, host: str, port: int, parse=parse_json_ticks, reconnect_seconds: float = 2.0):
+        super().__init__()
+        self.address = (host, port)
+        self._parse = parse
+        self.reconnect_seconds = reconnect_seconds
+
+    def events(self):
+        while not self._stop.is_set():
+            try:
+                with socket.create_connection(self.address, timeout=1.0) as sock:
+                    buffer = b""
+                    while not self._stop.is_set():
+                        try:
+                            data = sock.recv(65536)
+                        except socket.timeout:
+                            continue
+                        if not data:
+                            break
+                        *lines, buffer = (buffer + data).split(b"\n")
+                        for line in lines:
+                            if line.strip():
+                                yield from self._parse(line)
+            except OSError as e:
+                logger.warning("socket %s:%s: %s", *self.address, e)
+            self._stop.wait(self.reconnect_seconds)
+
+
+class ReplaySource(QuoteSource):
+    """
+    Replays recorded events, paced by their timestamps divided by `speed` (None: as fast as possible).
+    A stand-in feed for tests and for demoing live mode outside market hours.
+    """
+
+    def __init__(self, events, speed: float = None):
+        super().__init__()
+        self._events = events
+        self.speed = speed
+
+    @classmethod
+    def from_file(cls, path: str, speed: float = None) -> 'ReplaySource':
+        """JSON lines in the parse_json_ticks format, or a CSV with symbol, ts, price[, size] columns."""
+        if path.endswith('.csv'):
+            df = pd.read_csv(path)
+            events = [Tick(str(row.symbol).upper(), _timestamp(row.ts), float(row.price),
+                           float(getattr(row, 'size', 0))) for row in df.itertuples()]
+        else:
+            with open(path) as f:
+                events = [tick for line in f if line.strip() for tick in parse_json_ticks(line)]
+        return cls(events, speed)
+
+    @classmethod
+    def from_frame(cls, symbol: str, df: pd.DataFrame, speed: float = None) -> 'ReplaySource':
+        """Bars of an OHLCV frame as 1m Bar events."""
+        return cls([Bar(symbol.upper(), row.Index, row.Open, row.High, row.Low, row.Close, row.Volume)
+                    for row in df.itertuples()], speed)
+
+    def events(self):
+        previous = None
+        for event in self._events:
+            if self._stop.is_set():
+                return
+            if self.speed and previous is not None:
+                self._stop.wait(max(0.0, (event.ts - previous).total_seconds() / self.speed))
+            previous = event.ts
+            yield event
+
+
+def source_from_spec(spec: str) -> QuoteSource:
+    """'yfinance[:seconds]', 'ws://...'/'wss://...', 'tcp://host:port' or 'replay:<path>[@speed]'."""
+    if spec.startswith('yfinance'):
+        _, _, seconds = spec.partition(':')
+        return YFinancePoller(float(seconds or 5))
+    if spec.startswith(('ws://', 'wss://')):
+        return WebSocketSource(spec)
+    if spec.startswith('tcp://'):
+        host, _, port = spec[len('tcp://'):].rpartition(':')
+        return LineSocketSource(host, int(port))
+    if spec.startswith('replay:'):
+        path, _, speed = spec[len('replay:'):].partition('@')
+        return ReplaySource.from_file(path, float(speed) if speed else None)
+    raise ValueError(f"Unknown stream source: {spec}")
+
+
+# ─── Aggregation ─────────────────────────────────────────────────────────────
+def bucket_start(ts: pd.Timestamp, rule: pd.Timedelta) -> pd.Timestamp:
+    """Start of the bar containing ts, with the 9:30-anchored buckets of resample.resample_ohlcv."""
+    day = ts.normalize()
+    offset = MARKET_OPEN_OFFSET % rule
+    return day + offset + ((ts - day - offset) // rule) * rule
+
+
+def _merge(into: list, bar: list) -> list:
+    """OHLCV of two consecutive bars as one: [ts, open, high, low, close, volume]."""
+    return [into[0], into[1], max(into[2], bar[2]), min(into[3], bar[3]), bar[4], into[5] + bar[5]]
+
+
+class BarAggregator:
+    """
+    Forming bars of one symbol for every interval, built from ticks and/or 1m bar updates.
+    Each event returns {interval: [closed bar, ...] + [current bar]} for the intervals it changed;
+    bars are [ts, open, high, low, close, volume] lists.
+    """
+
+    def __init__(self, intervals=INTERVALS):
+        self.rules = {interval: interval_to_timedelta(interval) for interval in intervals}
+        self.current = {}
+        self._completed = {}  # derived interval -> merged finished 1m bars of its forming bucket
+        self.late = 0
+
+    def seed(self, df_1m: pd.DataFrame):
+        """Starts from the latest known 1m bars, so streaming into a half-finished bar extends it."""
+        if df_1m.empty:
+            return
+        rows = [[ts, *values] for ts, values in zip(df_1m.index[-30:], df_1m[OHLCV_COLUMNS].to_numpy()[-30:])]
+        last = rows[-1]
+        self.current['1m'] = last
+        for interval, rule in self.rules.items():
+            if interval == '1m':
+                continue
+            start = bucket_start(last[0], rule)
+            completed = None
+            for row in rows[:-1]:
+                if bucket_start(row[0], rule) == start:
+                    completed = row if completed is None else _merge(completed, row)
+            self._completed[interval] = completed
+            self.current[interval] = [start] + last[1:] if completed is None else _merge([start] + completed[1:], last)
+
+    def add_tick(self, tick: Tick) -> dict:
+        minute = tick.ts.floor('min')
+        current = self.current.get('1m')
+        if current is not None and minute == current[0]:
+            bar = [minute, current[1], max(current[2], tick.price), min(current[3], tick.price), tick.price,
+                   current[5] + tick.size]
+        else:
+            bar = [minute, tick.price, tick.price, tick.price, tick.price, tick.size]
+        return self._set_minute(bar)
+
+    def add_bar(self, bar: Bar) -> dict:
+        return self._set_minute([bar.ts, bar.open, bar.high, bar.low, bar.close, bar.volume])
+
+    def _set_minute(self, bar: list) -> dict:
+        current = self.current.get('1m')
+        if current is not None and bar[0] < current[0]:
+            self.late += 1
+            return {}
+        changes = {'1m': [bar]}
+        finished = current if current is not None and bar[0] > current[0] else None
+        if finished is not None:
+            changes['1m'].insert(0, finished)
+        self.current['1m'] = bar
+
+        for interval, rule in self.rules.items():
+            if interval == '1m':
+                continue
+            start = bucket_start(bar[0], rule)
+            forming = self.current.get(interval)
+            completed = self._completed.get(interval)
+            if finished is not None and forming is not None and bucket_start(finished[0], rule) == forming[0]:
+                completed = finished if completed is None else _merge(completed, finished)
+            closed = []
+            if forming is not None and start > forming[0]:
+                closed, completed = [forming], None
+            self._completed[interval] = completed
+            self.current[interval] = [start] + bar[1:] if completed is None else _merge([start] + completed[1:], bar)
+            changes[interval] = closed + [self.current[interval]]
+        return changes
+
+
+# ─── Ingestion ───────────────────────────────────────────────────────────────
+def _bars_frame(bars) -> pd.DataFrame:
+    return pd.DataFrame([bar[1:] for bar in bars], index=pd.DatetimeIndex([bar[0] for bar in bars]),
+                        columns=OHLCV_COLUMNS)
+
+
+class StreamIngestor:
+    """
+    Runs a QuoteSource on a background thread and aggregates its events into 1m/5m/15m bars.
+    Changed bars go through the incremental indicator engines (only the new/revised last bar
+    is computed) and the result is published to the market data service at most every
+    `publish_interval` seconds per symbol, without refetching history. Finished bars are
+    written to the bar store.
+    """
+
+    def __init__(self, source: QuoteSource, service, publish_interval: float = 0.5, store=None):
+        self.source = source
+        self.service = service
+        self.publish_interval = publish_interval
+        self._store = store
+        self._lock = threading.Lock()
+        self._symbols = set()
+        self._aggregators = {}
+        self._pending = {}
+        self._last_publish = {}
+        self._publish_locks = {}
+        self._counters = Counter()
+        self._last_event_at = None
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self) -> 'StreamIngestor':
+        for target, name in ((self._run, "stream-ingest"), (self._run_flusher, "stream-flush")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def close(self):
+        self._stop.set()
+        self.source.close()
+
+    def subscribe(self, ticker_symbol: str):
+        """Streams a ticker. Its history must already be loaded (service.get) so the engines have state."""
+        key = ticker_symbol.upper()
+        with self._lock:
+            if key in self._symbols:
+                return
+            self._symbols.add(key)
+        self.source.subscribe([key])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._counters,
+                'streaming': sorted(self._symbols),
+                'late_events': sum(aggregator.late for aggregator in self._aggregators.values()),
+                'last_event_age': None if self._last_event_at is None else round(time.time() - self._last_event_at, 1),
+            }
+
+    def _run(self):
+        try:
+            for event in self.source.events():
+                self._on_event(event)
+                if self._stop.is_set():
+                    break
+        except Exception:
+            logger.exception("stream source failed")
+        self._flush_all()
+
+    def _run_flusher(self):
+        # Pending bars of symbols whose feed went quiet still get published.
+        while not self._stop.wait(self.publish_interval):
+            self._flush_all()
+
+    def _on_event(self, event):
+        with self._lock:
+            if event.symbol not in self._symbols:
+                return
+            self._last_event_at = time.time()
+            self._counters['ticks' if isinstance(event, Tick) else 'bars'] += 1
+            aggregator = self._aggregators.get(event.symbol)
+            if aggregator is None:
+                aggregator = self._aggregators[event.symbol] = BarAggregator()
+                aggregator.seed(get_engine(event.symbol, '1m').frame)
+            changes = aggregator.add_tick(event) if isinstance(event, Tick) else aggregator.add_bar(event)
+            pending = self._pending.setdefault(event.symbol, {})
+            for interval, bars in changes.items():
+                rows = pending.setdefault(interval, {})
+                for bar in bars:
+                    rows[bar[0]] = bar
+            due = time.time() - self._last_publish.get(event.symbol, 0.0) >= self.publish_interval
+        if due:
+            self._publish(event.symbol)
+
+    def _flush_all(self):
+        with self._lock:
+            symbols = [symbol for symbol, pending in self._pending.items() if pending]
+        for symbol in symbols:
+            self._publish(symbol)
+
+    def _publish(self, symbol: str):
+        with self._lock:
+            publish_lock = self._publish_locks.setdefault(symbol, threading.Lock())
+        # Both the ingest and the flusher thread publish: holding the symbol's lock from taking
+        # its pending bars until the frames are published keeps an older revision from being
+        # published after a newer one.
+        with publish_lock:
+            engines = [get_engine(symbol, interval) for interval in INTERVALS]
+            with self._lock:
+                self._last_publish[symbol] = time.time()
+                if any(engine.last_timestamp is None for engine in engines):
+                    # No history yet: publishing a few streamed bars would replace it, so they
+                    # stay pending until the first fetch has primed the engines.
+                    return
+                pending = self._pending.pop(symbol, {})
+            if pending:
+                self._publish_pending(symbol, engines, pending)
+
+    def _publish_pending(self, symbol: str, engines: list, pending: dict):
+        frames = []
+        for interval, engine in zip(INTERVALS, engines):
+            rows = pending.get(interval)
+            if rows:
+                bars = _bars_frame(sorted(rows.values()))
+                frames.append(engine.update(bars))
+                self._write_finished(symbol, interval, bars)
+            else:
+                frames.append(engine.frame)
+        if self.service.publish(symbol, frames):
+            with self._lock:
+                self._counters['publishes'] += 1
+
+    def _write_finished(self, symbol: str, interval: str, bars: pd.DataFrame):
+        finished = bars.iloc[:-1]
+        if finished.empty:
+            return
+        try:
+            (self._store or get_bar_store()).write(symbol, interval, finished)
+        except OSError:
+            pass  # the store only saves refetching these bars later
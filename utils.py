@@ -2,22 +2,18 @@
 
 import streamlit as st
 import pandas as pd
-import pandas_market_calendars as mcal
 from datetime import date
-from time import time
+from market_calendar import get_trading_calendar, market_today
+
+
+def get_market_hours(trading_date: date):
+    """Get market open/close times for a given date (early closes included)."""
+    return get_trading_calendar(market_today()).market_hours(trading_date)
 
-# utils.py (add this function)
-def get_market_hours(trading_date):
-    """Get market open/close times for a given date"""
-    # Implement logic to get actual market hours from calendar
-    # This is a placeholder implementation
-    return time(9, 30), time(16, 0)
 
-# get_valid_trading_dates function remains unchanged
 def get_valid_trading_dates(start_date: date, end_date: date) -> pd.DatetimeIndex:
-    nyse = mcal.get_calendar('NYSE')
-    schedule = nyse.schedule(start_date=start_date, end_date=end_date)
-    return schedule.index.date
+    """Trading dates between start_date and end_date, served from the memoized calendar."""
+    return get_trading_calendar(market_today()).trading_days_between(start_date, end_date)
 
 
 def display_summary_cards(latest_data: pd.Series, analysis_results: dict):
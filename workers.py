@@ -0,0 +1,167 @@
+# trading_dashboard/workers.py
+
+import contextlib
+import os
+import sys
+import threading
+import types
+from collections import namedtuple, Counter, OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+
+import perf
+from replay import ReplayTimeline
+
+AnalysisResult = namedtuple('AnalysisResult', ['analysis', 'buy_signals', 'sell_signals'])
+
+# Timelines built in this process (a worker, or the app itself when running inline), newest last.
+_timelines = OrderedDict()
+_MAX_TIMELINES = 8
+
+
+def _mp_context():
+    """Workers fork from a server that has already imported this module (spawned where there is none)."""
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload([__name__])
+    return context
+
+
+@contextlib.contextmanager
+def _detached_main():
+    """
+    Hides the caller's __main__ while workers start. Under Streamlit it is the app script,
+    which every new worker would otherwise re-run before taking its first job.
+    """
+    main = sys.modules['__main__']
+    sys.modules['__main__'] = types.ModuleType('__main__')
+    try:
+        yield
+    finally:
+        sys.modules['__main__'] = main
+
+
+def analyze(frames_key, df_1m, df_5m, df_15m, trading_date, cursor: int) -> AnalysisResult:
+    """
+    Strategy analysis and the entry signals fired within the first `cursor` 1m bars of a day.
+    Runs in a worker process; the day's timeline is kept per `frames_key` (ticker, date, data
+    version), so replay ticks on the same data only run the analysis for the new cursor.
+    """
+    timeline = _timelines.get(frames_key)
+    if timeline is None:
+        timeline = _timelines[frames_key] = ReplayTimeline(df_1m, df_5m, df_15m, trading_date)
+        while len(_timelines) > _MAX_TIMELINES:
+            _timelines.popitem(last=False)
+    _timelines.move_to_end(frames_key)
+    return AnalysisResult(timeline.analysis_at(cursor), *timeline.signals_at(cursor))
+
+
+class AnalysisPool:
+    """
+    Process pool for the dashboard's analysis jobs, shared by every Streamlit session.
+    Jobs are keyed (e.g. by ticker, date, data version and cursor): a key already queued or
+    running is shared instead of resubmitted, and the last `max_results` finished results are
+    served from memory. Each session has one current job; submitting a new one cancels its
+    previous job if it has not started and no other session is waiting for it (a running job
+    finishes, and its result is cached). `max_workers` defaults to the core count; 0 runs
+    every job inline in the caller.
+    """
+
+    def __init__(self, max_workers: int = None, max_results: int = 256):
+        self.max_workers = (os.cpu_count() or 1) if max_workers is None else max_workers
+        self.max_results = max_results
+        self._executor = self._new_executor() if self.max_workers > 0 else None
+        self._lock = threading.RLock()
+        self._jobs = {}
+        self._results = OrderedDict()
+        self._waiters = Counter()
+        self._sessions = {}
+        self._counters = Counter()
+
+    def submit(self, session_id, key, fn, *args) -> Future:
+        """Future for fn(*args) under `key`, made the session's current job. `fn` must be picklable."""
+        with perf.span('workers.submit', cache='hit') as s, self._lock:
+            previous = self._sessions.get(session_id)
+            if previous != key:
+                self._sessions[session_id] = key
+                self._waiters[key] += 1
+                if previous is not None:
+                    self._release(previous)
+            if key in self._results:
+                self._counters['hits'] += 1
+                self._results.move_to_end(key)
+                future = Future()
+                future.set_result(self._results[key])
+                return future
+            future = self._jobs.get(key)
+            if future is not None:
+                self._counters['coalesced'] += 1
+                return future
+            s.set(cache='miss')
+            self._counters['submitted'] += 1
+            if self._executor is None:
+                future = Future()
+            else:
+                # Worker processes are started on demand, inside submit().
+                with _detached_main():
+                    try:
+                        future = self._executor.submit(fn, *args)
+                    except BrokenProcessPool:
+                        # A worker died and took the pool down with it: start a new one.
+                        self._counters['restarts'] += 1
+                        self._executor.shutdown(wait=False, cancel_futures=True)
+                        self._executor = self._new_executor()
+                        future = self._executor.submit(fn, *args)
+            self._jobs[key] = future
+        future.add_done_callback(lambda done: self._finish(key, done))
+        if self._executor is None and future.set_running_or_notify_cancel():
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+        return future
+
+    def discard(self, key, future: Future = None):
+        """Forgets a failed job (only `future`, if given), so the next submit of `key` runs it again."""
+        with self._lock:
+            if future is None or self._jobs.get(key) is future:
+                self._jobs.pop(key, None)
+            self._results.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._counters, 'workers': self.max_workers, 'queued_or_running': len(self._jobs),
+                    'results': len(self._results), 'sessions': len(self._sessions)}
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=_mp_context())
+
+    def _release(self, key):
+        """Drops one waiter from a job, cancelling it if nobody waits and it has not started (caller holds the lock)."""
+        self._waiters[key] -= 1
+        if self._waiters[key] > 0:
+            return
+        del self._waiters[key]
+        future = self._jobs.get(key)
+        if future is not None and future.cancel():
+            self._counters['cancelled'] += 1
+
+    def _finish(self, key, future: Future):
+        with self._lock:
+            if self._jobs.get(key) is future:
+                del self._jobs[key]
+            if future.cancelled():
+                return
+            if future.exception() is not None:
+                self._counters['errors'] += 1
+                return
+            self._counters['completed'] += 1
+            self._results[key] = future.result()
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)